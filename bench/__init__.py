@@ -0,0 +1,4 @@
+"""
+Offline benchmarks and stress checks for the libcloud meta-adapter. Each module can be run directly, e.g.
+`python -m bench.adapters`.
+"""
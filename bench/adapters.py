@@ -0,0 +1,135 @@
+"""
+Offline benchmark of every adapter's endpoints, against the stub provider drivers in `bench.stubs`.
+
+Each run starts with empty caches and walks an account through its catalog (cold, then cached), credential verification,
+key creation, lookup and deletion (for adapters which store keys), and server creation, lookup and cancellation. For
+each endpoint it reports the provider calls made, the median wall time, and the peak memory allocated while handling it.
+
+    python -m bench.adapters [--adapters vultr,gce] [--latency 20] [--runs 5]
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bench import stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters import get_adapter
+
+PUBLIC_KEY = 'ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQC7bench bench@nanobox'
+
+
+def endpoints(adapter_id):
+    """Returns the `(name, method, path, body)` requests making up one run against an adapter."""
+    adapter = get_adapter(adapter_id)
+    stores_keys = adapter.server_ssh_auth_method == 'key' and adapter.server_ssh_key_method == 'reference'
+    server = {
+        'name': 'bench-app-1',
+        'region': adapter.get_default_region(),
+        'size': adapter.get_default_size(),
+        'ssh_key': 'bench-key' if stores_keys else PUBLIC_KEY,
+    }
+
+    requests = [
+        ('catalog (cold)', 'GET', '/%s/catalog' % (adapter_id), None),
+        ('catalog (cached)', 'GET', '/%s/catalog' % (adapter_id), None),
+        ('verify', 'POST', '/%s/verify' % (adapter_id), None),
+    ]
+
+    if stores_keys:
+        requests += [
+            ('key create', 'POST', '/%s/keys' % (adapter_id), {'id': 'bench-key', 'key': PUBLIC_KEY}),
+            ('key query', 'GET', '/%s/keys/bench-key' % (adapter_id), None),
+        ]
+
+    requests += [('server create', 'POST', '/%s/servers' % (adapter_id), server)]
+
+    return requests
+
+
+def credentials(adapter_id):
+    """Returns request headers with a value for each of an adapter's credential fields."""
+    adapter = get_adapter(adapter_id)
+
+    return {'Auth-%s' % (field): 'bench-%s' % (field.lower()) for field, _ in adapter.auth_credential_fields}
+
+
+def run(client, adapter_id, trace=False):
+    """Runs every endpoint once for a fresh account, returning `{name: (status, provider calls by driver method, seconds,
+    peak bytes)}`. Peak memory is only measured when tracing, as tracing slows everything else down."""
+    stubs.reset()
+    headers = credentials(adapter_id)
+    results = {}
+
+    def call(name, method, path, body=None):
+        if trace:
+            tracemalloc.start()
+
+        try:
+            started = time.perf_counter()
+            response = client.open(path, method=method, headers=headers, json=body)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            response.close()
+            peak = tracemalloc.get_traced_memory()[1] if trace else None
+        finally:
+            if trace:
+                tracemalloc.stop()
+
+        results[name] = (response.status_code, provider_calls(response.headers.get('X-Provider-Methods', '')),
+                         elapsed, peak)
+        return response
+
+    for name, method, path, body in endpoints(adapter_id):
+        response = call(name, method, path, body)
+
+        if name == 'server create' and response.status_code == 201:
+            server_path = '/%s/servers/%s' % (adapter_id, response.get_json()['id'])
+            call('server query', 'GET', server_path)
+            call('server cancel', 'DELETE', server_path)
+
+    if 'key create' in results:
+        call('key delete', 'DELETE', '/%s/keys/bench-key' % (adapter_id))
+
+    return results
+
+
+def provider_calls(methods) -> dict:
+    """Parses the calls per driver method out of an `X-Provider-Methods` header, e.g. `list_sizes=2/0.041,
+    list_locations=1/0.020`."""
+    return {name: int(value.split('/', 1)[0])
+            for name, _, value in (item.partition('=') for item in methods.split(', ') if '=' in item)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--adapters', default=','.join(sorted(stubs.DRIVERS)),
+                        help='comma-separated adapter ids (default: all)')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='simulated provider latency per driver call, in milliseconds')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    failures = 0
+
+    with stubs.installed(latency=args.latency / 1000):
+        print('%-10s %-17s %6s %6s %10s %10s' % ('adapter', 'endpoint', 'status', 'calls', 'median ms', 'peak KB'))
+
+        for adapter_id in args.adapters.split(','):
+            runs = [run(client, adapter_id) for _ in range(args.runs)]
+            traced = run(client, adapter_id, trace=True)
+
+            for name, (status, calls, _, _) in runs[0].items():
+                seconds = statistics.median(result[name][2] for result in runs if name in result)
+                failures += status >= 400
+
+                print('%-10s %-17s %6d %6d %10.2f %10.0f' % (adapter_id, name, status, sum(calls.values()),
+                                                             seconds * 1000, traced[name][3] / 1024))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
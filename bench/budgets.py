@@ -0,0 +1,88 @@
+"""
+Provider call budgets for every adapter's endpoints, checked against the stub provider drivers in `bench.stubs`.
+
+Runs the same endpoints as `bench.adapters`, for a fresh account per adapter, and compares the calls each endpoint makes
+to each driver method with the budgets in bench/budgets.json. The test suite enforces the same budgets
+(tests/test_call_budgets.py); this script also reports endpoints coming in under budget, so the budgets can be tightened
+with `--update` once an improvement lands. It exits nonzero if any endpoint fails, or calls a method more often than its
+budget allows (methods missing from a budget are allowed no calls).
+
+    python -m bench.budgets [--adapters vultr,gce] [--update]
+"""
+import argparse
+import json
+import os
+import sys
+
+from bench import adapters, stubs
+from nanobox_libcloud import app
+
+BUDGETS = os.path.join(os.path.dirname(__file__), 'budgets.json')
+
+
+def check(results, budgets) -> tuple:
+    """Compares one adapter's run with its budgets, returning `(regressions, savings)` as lists of messages."""
+    regressions, savings = [], []
+
+    for name, (status, calls, _, _) in results.items():
+        budget = budgets.get(name, {})
+
+        if status >= 400:
+            regressions.append('%s answered %d' % (name, status))
+
+        for method in sorted(set(calls) | set(budget)):
+            made, allowed = calls.get(method, 0), budget.get(method, 0)
+
+            if made > allowed:
+                regressions.append('%s called %s %d times, budget %d' % (name, method, made, allowed))
+            elif made < allowed:
+                savings.append('%s called %s %d times, budget %d' % (name, method, made, allowed))
+
+    for name in sorted(set(budgets) - set(results)):
+        regressions.append('%s was not run' % (name))
+
+    return regressions, savings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--adapters', default=','.join(sorted(stubs.DRIVERS)),
+                        help='comma-separated adapter ids (default: all)')
+    parser.add_argument('--update', action='store_true', help="rewrite the budgets to the calls made by this run")
+    args = parser.parse_args()
+
+    with open(BUDGETS) as fp:
+        budgets = json.load(fp)
+
+    client = app.test_client()
+    failed = False
+
+    with stubs.installed(latency=0):
+        for adapter_id in args.adapters.split(','):
+            results = adapters.run(client, adapter_id)
+
+            if args.update:
+                budgets[adapter_id] = {name: calls for name, (_, calls, _, _) in results.items()}
+                continue
+
+            regressions, savings = check(results, budgets.get(adapter_id, {}))
+            failed = failed or bool(regressions)
+
+            for message in regressions:
+                print('FAIL %s: %s' % (adapter_id, message))
+            for message in savings:
+                print('under %s: %s' % (adapter_id, message))
+            if not regressions:
+                print('OK   %s: %d endpoints within budget' % (adapter_id, len(results)))
+
+    if args.update:
+        with open(BUDGETS, 'w') as fp:
+            json.dump(budgets, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+        print('Budgets for %s written to %s' % (args.adapters, BUDGETS))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+Realistically sized, synthetic data shared by the benchmarks.
+"""
+import random
+
+
+def catalog(regions=40, plans=6, specs=25, seed=0):
+    """Returns a catalog shaped like the one /catalog serves for GCE or Azure ARM: regions x plans x specs."""
+    rng = random.Random(seed)
+    result = []
+
+    for r in range(regions):
+        region = {'id': 'region-%d' % r, 'name': 'Region %d' % r, 'plans': []}
+
+        for p in range(plans):
+            plan = {'id': 'plan-%d' % p, 'name': 'Plan %d' % p, 'specs': []}
+
+            for s in range(specs):
+                hourly = rng.uniform(0.005, 4.0)
+                plan['specs'].append({
+                    'id': 'size-%d-%d' % (p, s),
+                    'name': 'Size %d-%d' % (p, s),
+                    'ram': 512 * (s + 1),
+                    'cpu': float(1 + s // 2),
+                    'disk': 20 * (s + 1),
+                    'transfer': 'unlimited' if s % 3 else 1000 * (s + 1),
+                    'dollars_per_hr': '%0.3f' % hourly,
+                    'dollars_per_mo': '%0.2f' % (hourly * 720),
+                })
+
+            region['plans'].append(plan)
+
+        result.append(region)
+
+    return result
@@ -0,0 +1,401 @@
+"""
+Record and replay of the HTTP traffic between the adapters and provider APIs.
+
+`record` runs an adapter's catalog, server create, query and cancel endpoints (plus key create and delete, for adapters
+which store keys) against the real provider, capturing every HTTP exchange libcloud makes, with credentials scrubbed,
+along with each endpoint's response. `--stand-in` records Vultr against the local stand-in API from `bench.provider`
+instead, needing no account; such recordings only check the record and replay machinery, and are no baseline for the
+provider, so they have to be written somewhere other than bench/fixtures. `replay` serves the recorded exchanges back in
+order with no network, runs the same endpoints, and fails if any answers differently from the recording - for the
+catalog, if its JSON differs at all. The test suite replays every fixture in bench/fixtures the same way.
+
+    python -m bench.fixtures record vultr --header Auth-Api-Key=... [--region 1] [--size 201] [--out vultr.json]
+    python -m bench.fixtures replay bench/fixtures/vultr.json [--runs 5]
+
+Replays use placeholder credentials unless given `--header`s. Drivers which sign requests locally (GCE's service
+account JWTs, Azure Classic's management certificate) need real-looking ones.
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from unittest import mock
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from libcloud.http import LibcloudConnection
+from requests.structures import CaseInsensitiveDict
+
+from bench import provider, stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters import get_adapter
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+PUBLIC_KEY = 'ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQC7fixture fixture@nanobox'
+REDACTED = 'REDACTED'
+
+# Headers, and query, form and JSON fields, whose values are credentials
+SECRET_HEADERS = {'authorization', 'proxy-authorization', 'cookie', 'set-cookie', 'api-key', 'x-api-key',
+                  'x-auth-token', 'x-ovh-application', 'x-ovh-consumer', 'x-ovh-signature'}
+SECRET_FIELDS = re.compile(r'(?i)secret|token|passw|assertion|signature|credential|api[-_]?key|^key$|^client_id$')
+
+# Headers describing the encoding of the body on the wire, which no longer apply once it has been decoded
+WIRE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+class Scrubber(object):
+    """
+    Removes credentials from recorded exchanges: the values of known secret headers and fields, and anywhere the
+    credentials a request was made with appear verbatim, such as in URLs.
+    """
+
+    def __init__(self, secrets=()):
+        self.secrets = sorted({secret for secret in secrets if len(secret) >= 4}, key=len, reverse=True)
+
+    def text(self, text: str) -> str:
+        for secret in self.secrets:
+            text = text.replace(secret, REDACTED)
+
+        return text
+
+    def url(self, url: str) -> str:
+        """Returns the path and query of a URL, scrubbed."""
+        parts = urlsplit(url)
+        query = urlencode([(name, REDACTED if SECRET_FIELDS.search(name) else value)
+                           for name, value in parse_qsl(parts.query, keep_blank_values=True)])
+
+        return self.text(parts.path + ('?' + query if query else ''))
+
+    def headers(self, headers) -> dict:
+        return {name: REDACTED if name.lower() in SECRET_HEADERS else self.text(str(value))
+                for name, value in (headers or {}).items()}
+
+    def body(self, body) -> dict:
+        """Returns a scrubbed body, as text if it is any, else base64."""
+        if body is None:
+            return {'text': None}
+
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            return {'base64': base64.b64encode(body).decode('ascii')}
+
+        try:
+            return {'json': self.data(json.loads(text))}
+        except ValueError:
+            pass
+
+        if '=' in text and '\n' not in text:
+            fields = parse_qsl(text, keep_blank_values=True)
+            if fields:
+                return {'text': self.text(urlencode([(name, REDACTED if SECRET_FIELDS.search(name) else value)
+                                                     for name, value in fields]))}
+
+        return {'text': self.text(text)}
+
+    def data(self, data):
+        """Scrubs parsed JSON."""
+        if isinstance(data, dict):
+            return {name: REDACTED if SECRET_FIELDS.search(name) and isinstance(value, str) else self.data(value)
+                    for name, value in data.items()}
+        if isinstance(data, list):
+            return [self.data(item) for item in data]
+        if isinstance(data, str):
+            return self.text(data)
+
+        return data
+
+
+class Recorder(object):
+    """
+    Captures the HTTP exchanges libcloud makes while installed.
+    """
+
+    def __init__(self, scrubber: Scrubber):
+        self.scrubber = scrubber
+        self.exchanges = []
+
+    @contextlib.contextmanager
+    def installed(self):
+        recorder = self
+        request, prepared_request = LibcloudConnection.request, LibcloudConnection.prepared_request
+
+        def recorded(send):
+            def call(self, method, url, body=None, headers=None, raw=False, stream=False):
+                send(self, method, url, body, headers, raw, stream)
+                recorder.record(method, url, body, headers, self.response)
+
+            return call
+
+        with mock.patch.object(LibcloudConnection, 'request', recorded(request)),\
+                mock.patch.object(LibcloudConnection, 'prepared_request', recorded(prepared_request)):
+            yield self
+
+    def record(self, method, url, body, headers, response: requests.Response):
+        self.exchanges.append({
+            'method': method.upper(),
+            'url': self.scrubber.url(url),
+            'request': {'headers': self.scrubber.headers(headers), 'body': self.scrubber.body(body)},
+            'status': response.status_code,
+            'headers': self.scrubber.headers({name: value for name, value in response.headers.items()
+                                              if name.lower() not in WIRE_HEADERS}),
+            'body': self.scrubber.body(response.content),
+        })
+
+
+class Player(object):
+    """
+    Answers libcloud's HTTP requests with recorded exchanges while installed, never touching the network. Exchanges are
+    matched by method, path and query, and served in the order they were recorded; the last one for each request is
+    served again if it is repeated more often than when recording.
+    """
+
+    def __init__(self, exchanges, scrubber: Scrubber):
+        self.scrubber = scrubber
+        self.queues = {}
+        self.misses = []
+
+        for exchange in exchanges:
+            self.queues.setdefault((exchange['method'], exchange['url']), []).append(exchange)
+
+        self._positions = {key: 0 for key in self.queues}
+
+    @contextlib.contextmanager
+    def installed(self):
+        player = self
+
+        def replayed(self, method, url, body=None, headers=None, raw=False, stream=False):
+            self.response = player.answer(method, url)
+
+        with mock.patch.object(LibcloudConnection, 'request', replayed),\
+                mock.patch.object(LibcloudConnection, 'prepared_request', replayed):
+            yield self
+
+    def answer(self, method, url) -> requests.Response:
+        key = (method.upper(), self.scrubber.url(url))
+        queue = self.queues.get(key)
+
+        if not queue:
+            self.misses.append('%s %s' % key)
+            raise requests.exceptions.ConnectionError('No recorded exchange for %s %s' % key)
+
+        position = self._positions[key]
+        self._positions[key] = min(position + 1, len(queue) - 1)
+
+        return _response(queue[position], url)
+
+
+def _response(exchange, url) -> requests.Response:
+    response = requests.Response()
+    response.status_code = exchange['status']
+    response.headers = CaseInsensitiveDict(exchange['headers'])
+    response.url = url
+    response.encoding = 'utf-8'
+
+    body = exchange['body']
+    if 'json' in body:
+        response._content = json.dumps(body['json']).encode('utf-8')
+    elif 'base64' in body:
+        response._content = base64.b64decode(body['base64'])
+    else:
+        response._content = (body['text'] or '').encode('utf-8')
+
+    return response
+
+
+def scenario(adapter_id, region=None, size=None, ssh_key=None, name='fixture-app-1'):
+    """Returns the `(step, method, path, body)` requests recorded for an adapter, with `{server}` standing for the id of
+    the server the create step returns."""
+    adapter = get_adapter(adapter_id)
+    stores_keys = adapter.server_ssh_auth_method == 'key' and adapter.server_ssh_key_method == 'reference'
+
+    steps = [('catalog', 'GET', '/%s/catalog' % (adapter_id), None)]
+
+    if stores_keys:
+        steps.append(('key create', 'POST', '/%s/keys' % (adapter_id), {'id': 'fixture-key', 'key': PUBLIC_KEY}))
+
+    steps += [
+        ('server create', 'POST', '/%s/servers' % (adapter_id), {
+            'name': name,
+            'region': region or adapter.get_default_region(),
+            'size': size or adapter.get_default_size(),
+            'ssh_key': ssh_key or ('fixture-key' if stores_keys else PUBLIC_KEY),
+        }),
+        ('server query', 'GET', '/%s/servers/{server}' % (adapter_id), None),
+        ('server cancel', 'DELETE', '/%s/servers/{server}' % (adapter_id), None),
+    ]
+
+    if stores_keys:
+        steps.append(('key delete', 'DELETE', '/%s/keys/fixture-key' % (adapter_id), None))
+
+    return steps
+
+
+def play(steps, headers):
+    """Runs the steps through the app, returning `(step, method, path, body, status, response, seconds)` for each."""
+    client = app.test_client()
+    server = ''
+    results = []
+
+    for step, method, template, body in steps:
+        path = template.replace('{server}', server)
+
+        started = time.perf_counter()
+        response = client.open(path, method=method, headers=headers, json=body)
+        data = response.get_data()
+        elapsed = time.perf_counter() - started
+
+        try:
+            parsed = json.loads(data.decode('utf-8')) if data else None
+        except ValueError:
+            parsed = data.decode('utf-8', 'replace')
+
+        if step == 'server create' and response.status_code == 201:
+            server = parsed['id']
+
+        results.append((step, method, path, body, response.status_code, parsed, elapsed))
+
+    return results
+
+
+def capture(adapter_id, headers, region=None, size=None, ssh_key=None, stand_in=False) -> tuple:
+    """Runs the recorded steps for an adapter, returning `(fixture, results)`: the fixture to save, and the `play`
+    results of each step."""
+    headers = dict(headers)
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(stubs.offline())
+        steps = scenario(adapter_id, region, size, ssh_key)
+
+        if stand_in:
+            if adapter_id != 'vultr':
+                raise ValueError('The stand-in API only serves Vultr')
+
+            server = provider.serve(provider.ProviderAPI(), port=0)
+            stack.callback(server.shutdown)
+            driver = provider.local_driver('http://127.0.0.1:%d' % (server.server_address[1]))
+            stack.enter_context(mock.patch('nanobox_libcloud.adapters.vultr.Vultr._get_driver_class',
+                                           lambda self: driver))
+            headers.setdefault('Auth-Api-Key', 'stand-in-account')
+
+        scrubber = Scrubber(headers.values())
+        recorder = Recorder(scrubber)
+        stack.enter_context(recorder.installed())
+        results = play(steps, headers)
+
+    # Step bodies are the app's own inputs, with credentials only in the headers, so only secret values are scrubbed
+    # from them: their `key` fields are public keys which replay has to send as recorded
+    fixture = {
+        'adapter': adapter_id,
+        'headers': sorted(headers),
+        'recorded': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'steps': [{'step': step, 'method': method, 'path': scrubber.text(template),
+                   'body': json.loads(scrubber.text(json.dumps(body))), 'status': status,
+                   'response': scrubber.data(response)}
+                  for (_, _, template, _), (step, method, _, body, status, response, _) in zip(steps, results)],
+        'exchanges': recorder.exchanges,
+    }
+
+    return fixture, results
+
+
+def check(fixture, headers=None, runs=1) -> tuple:
+    """Replays a fixture, returning `(runs, failures)`: the `play` results of each run, and a message for every step
+    which answered differently from the recording and every request which wasn't recorded."""
+    replay_headers = {name: 'replay-%s' % (name.lower()) for name in fixture['headers']}
+    replay_headers.update(headers or {})
+    scrubber = Scrubber(replay_headers.values())
+
+    steps = [(step['step'], step['method'], step['path'], step['body']) for step in fixture['steps']]
+
+    results, failures = [], []
+    for _ in range(runs):
+        player = Player(fixture['exchanges'], scrubber)
+        with stubs.offline(), player.installed():
+            results.append(play(steps, replay_headers))
+
+        for (step, _, _, _, status, response, _), expected in zip(results[-1], fixture['steps']):
+            if status != expected['status'] or scrubber.data(response) != expected['response']:
+                failures.append('%s answered %d, recorded %d%s' % (
+                    step, status, expected['status'], ' (response differs)' if status == expected['status'] else ''))
+        failures += ['unrecorded request: %s' % (miss) for miss in player.misses]
+
+    return results, sorted(set(failures))
+
+
+def record(args):
+    out = args.out or os.path.join(FIXTURES, '%s.json' % (args.adapter))
+    if args.stand_in and os.path.abspath(os.path.dirname(out)) == os.path.abspath(FIXTURES):
+        raise SystemExit('Recordings of the stand-in API are no baseline for the provider; pass an --out elsewhere')
+
+    try:
+        fixture, results = capture(args.adapter, dict(header.split('=', 1) for header in args.header), args.region,
+                                   args.size, args.ssh_key, args.stand_in)
+    except ValueError as err:
+        raise SystemExit(str(err))
+
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as fp:
+        json.dump(fixture, fp, indent=1, sort_keys=True)
+        fp.write('\n')
+
+    for step, method, path, _, status, _, elapsed in results:
+        print('%-14s %-6s %-40s %4d %8.1f ms' % (step, method, path, status, elapsed * 1000))
+    print('%d exchanges recorded to %s' % (len(fixture['exchanges']), out))
+
+    return 0 if all(status < 400 for _, _, _, _, status, _, _ in results) else 1
+
+
+def replay(args):
+    with open(args.fixture) as fp:
+        fixture = json.load(fp)
+
+    runs, failures = check(fixture, dict(header.split('=', 1) for header in args.header), args.runs)
+
+    print('%-14s %-6s %4s %10s' % ('step', 'method', 'code', 'median ms'))
+    for i, (step, method, _, _, status, _, _) in enumerate(runs[0]):
+        print('%-14s %-6s %4d %10.2f' % (step, method, status, statistics.median(run[i][6] for run in runs) * 1000))
+
+    for failure in failures:
+        print('FAIL: %s' % (failure))
+    if not failures:
+        print('OK: %d steps match the recording from %s' % (len(fixture['steps']), fixture['recorded']))
+
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    recording = commands.add_parser('record', help='record an adapter talking to its provider')
+    recording.add_argument('adapter')
+    recording.add_argument('--header', action='append', default=[], help='credential header, as Name=value')
+    recording.add_argument('--region', help="region to create the server in (default: the adapter's default)")
+    recording.add_argument('--size', help="size of server to create (default: the adapter's default)")
+    recording.add_argument('--ssh-key', help='SSH key (name, or public key) to create the server with')
+    recording.add_argument('--stand-in', action='store_true',
+                           help='record Vultr against the local stand-in API, to check record and replay themselves')
+    recording.add_argument('--out', help='fixture file to write (default: bench/fixtures/<adapter>.json)')
+
+    replaying = commands.add_parser('replay', help='replay a recording and check the responses match')
+    replaying.add_argument('fixture')
+    replaying.add_argument('--header', action='append', default=[], help='credential header, as Name=value')
+    replaying.add_argument('--runs', type=int, default=1)
+
+    args = parser.parse_args()
+
+    return record(args) if args.command == 'record' else replay(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Import-time benchmark for the adapter registry.
+
+Starts fresh interpreters which import the app and then load a number of adapters, and reports the median wall time
+and peak resident memory of each scenario: nothing loaded yet, one provider allow-listed through ENABLED_ADAPTERS, and
+every adapter imported eagerly as before lazy loading.
+
+    python -m bench.imports [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+PROBE = """
+import json, resource, time
+started = time.perf_counter()
+import nanobox_libcloud
+from nanobox_libcloud import adapters
+for adapter_id in %r:
+    adapters.get_adapter_class(adapter_id)
+print(json.dumps({
+    'seconds': time.perf_counter() - started,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'loaded': sorted(adapters.AdapterBase.registry),
+}))
+"""
+
+SCENARIOS = [
+    ('lazy, nothing loaded', {}, []),
+    ('ENABLED_ADAPTERS=vultr, vultr loaded', {'ENABLED_ADAPTERS': 'vultr'}, ['vultr']),
+    ('lazy, gce loaded', {}, ['gce']),
+    ('eager, all loaded', {}, ['azure', 'azure_arm', 'gce', 'ovh', 'packet', 'scaleway', 'vultr']),
+]
+
+
+def measure(env, load):
+    result = subprocess.run([sys.executable, '-c', PROBE % (load,)], env=dict(os.environ, **env),
+                            stdout=subprocess.PIPE, check=True)
+    return json.loads(result.stdout.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print('%-40s %10s %12s  %s' % ('scenario', 'import ms', 'max rss MB', 'registered'))
+    for name, env, load in SCENARIOS:
+        runs = [measure(env, load) for _ in range(args.runs)]
+        print('%-40s %10.1f %12.1f  %s' % (
+            name,
+            statistics.median(run['seconds'] for run in runs) * 1000,
+            statistics.median(run['max_rss_kb'] for run in runs) / 1024,
+            ','.join(runs[-1]['loaded']) or '-',
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""
+End-to-end load test of the app under gunicorn, against a local stand-in provider API.
+
+Starts the stand-in Vultr API from `bench.provider` and the app under gunicorn with etc/gunicorn.py (via
+`bench.loadapp`), then drives a weighted mix of catalog, verify, server create, query and cancel requests at it from many
+concurrent clients, spread over several accounts. Reports the throughput and latency percentiles of each kind of
+request, so worker model and caching changes can be compared on the same seed and settings without cloud accounts.
+
+    python -m bench.load [--duration 30] [--clients 32] [--accounts 8] [--mix catalog=40,verify=15,create=15,...]
+                         [--latency 50] [--jitter 20] [--error-rate 0.01] [--throttle 200]
+                         [--workers 2] [--worker-class gthread] [--threads 16] [--seed 1] [--json]
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUBLIC_KEY = 'ssh-rsa AAAAB3NzaC1yc2EAAAADAQABAAABAQC7load load@nanobox'
+OPERATIONS = ('catalog', 'verify', 'create', 'query', 'cancel')
+
+
+class Client(object):
+    """
+    One simulated client, sending requests for a single account over a kept-alive connection.
+    """
+
+    def __init__(self, port, account, rng):
+        self.port = port
+        self.headers = {'Auth-Api-Key': account, 'Content-Type': 'application/json'}
+        self.rng = rng
+        self.servers = []
+        self.created = 0
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """Sends a request, reconnecting once if the kept-alive connection was closed, and returns its status and
+        parsed body."""
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=300)
+
+            try:
+                self.connection.request(method, path, json.dumps(body) if body is not None else None, self.headers)
+                response = self.connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+                continue
+
+            try:
+                return response.status, json.loads(data.decode('utf-8')) if data else None
+            except ValueError:
+                return response.status, None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def run(self, operation):
+        """Performs an operation, returning the name it was recorded under and its status. Queries and cancels turn into
+        creates while the client has no servers."""
+        if operation in ('query', 'cancel') and not self.servers:
+            operation = 'create'
+
+        if operation == 'catalog':
+            status, _ = self.request('GET', '/vultr/catalog')
+        elif operation == 'verify':
+            status, _ = self.request('POST', '/vultr/verify')
+        elif operation == 'create':
+            self.created += 1
+            status, body = self.request('POST', '/vultr/servers', {
+                'name': 'load-%s-%d' % (self.rng.getrandbits(32), self.created),
+                'region': str(self.rng.randint(1, 15)),
+                'size': self.rng.choice(['201', '202', '203']),
+                'ssh_key': 'load-key',
+            })
+            if status == 201 and body:
+                self.servers.append(body['id'])
+        elif operation == 'query':
+            status, _ = self.request('GET', '/vultr/servers/%s' % (self.rng.choice(self.servers)))
+        else:
+            server_id = self.servers.pop(self.rng.randrange(len(self.servers)))
+            status, _ = self.request('DELETE', '/vultr/servers/%s' % (server_id))
+
+        return operation, status
+
+
+def drive(client, mix, stop, warm, results, lock):
+    """Sends requests from a client until stopped, recording `(latency, ok)` for each one once warmed up."""
+    operations, weights = zip(*mix.items())
+
+    while not stop.is_set():
+        operation = client.rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+
+        try:
+            operation, status = client.run(operation)
+            ok = status < 400
+        except (http.client.HTTPException, OSError):
+            ok = False
+
+        elapsed = time.perf_counter() - started
+        if warm.is_set():
+            with lock:
+                results.setdefault(operation, []).append((elapsed, ok))
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of sorted values."""
+    if not values:
+        return math.nan
+
+    return values[max(int(math.ceil(fraction * len(values))) - 1, 0)]
+
+
+def summarize(results, seconds):
+    """Returns the count, errors, throughput and latency percentiles of each kind of request, and of all of them."""
+    rows = {}
+
+    for operation, samples in sorted(results.items()) + [('total', [s for r in results.values() for s in r])]:
+        latencies = sorted(latency for latency, _ in samples)
+        rows[operation] = {
+            'count': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'rps': len(samples) / seconds,
+            'p50': percentile(latencies, 0.5) * 1000,
+            'p90': percentile(latencies, 0.9) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': (latencies[-1] if latencies else math.nan) * 1000,
+        }
+
+    return rows
+
+
+def parse_mix(mix):
+    """Parses `catalog=40,verify=15,...` into weights by operation."""
+    weights = {}
+
+    for item in mix.split(','):
+        operation, _, weight = item.partition('=')
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError('Unknown operation %r, expected one of %s' % (operation, ', '.join(OPERATIONS)))
+        weights[operation] = float(weight or 1)
+
+    return weights
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, path, timeout=30):
+    """Waits until something answers HTTP requests on a local port."""
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', path)
+            connection.getresponse().read()
+            connection.close()
+            return
+        except (http.client.HTTPException, OSError):
+            time.sleep(0.2)
+
+    raise RuntimeError('Nothing answered on port %d within %d seconds' % (port, timeout))
+
+
+def start(args, log):
+    """Starts the stand-in provider API and gunicorn, returning their processes and the app's port."""
+    provider_port, app_port = free_port(), free_port()
+
+    provider = subprocess.Popen([sys.executable, '-m', 'bench.provider', '--port', str(provider_port),
+                                 '--latency', str(args.latency), '--jitter', str(args.jitter),
+                                 '--error-rate', str(args.error_rate), '--throttle', str(args.throttle)],
+                                cwd=ROOT, stdout=subprocess.PIPE, universal_newlines=True)
+
+    env = dict(os.environ,
+               LOAD_PROVIDER_URL='http://127.0.0.1:%d' % (provider_port),
+               GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_WORKER_CLASS=args.worker_class,
+               GUNICORN_THREADS=str(args.threads))
+    app = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'etc/gunicorn.py', '-b', '127.0.0.1:%d' % (app_port),
+                            'bench.loadapp:app'], cwd=ROOT, env=env, stdout=log, stderr=log)
+
+    try:
+        wait_for(provider_port, '/v1/regions/list')
+        wait_for(app_port, '/')
+    except RuntimeError:
+        stop(provider, app)
+        raise
+
+    return provider, app, app_port
+
+
+def stop(provider, app) -> str:
+    """Stops gunicorn and the stand-in provider API, returning the provider's summary of what it served."""
+    app.send_signal(signal.SIGTERM)
+    provider.send_signal(signal.SIGINT)
+
+    try:
+        app.wait(30)
+    except subprocess.TimeoutExpired:
+        app.kill()
+
+    try:
+        summary = provider.communicate(timeout=10)[0]
+    except subprocess.TimeoutExpired:
+        provider.kill()
+        summary = ''
+
+    return summary.strip().splitlines()[-1] if summary.strip() else ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=30, help='seconds to measure for, after warming up')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds to send requests for before measuring')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent clients')
+    parser.add_argument('--accounts', type=int, default=8, help='distinct accounts the clients are spread over')
+    parser.add_argument('--mix', type=parse_mix, default='catalog=40,verify=15,create=15,query=20,cancel=10',
+                        help='relative weights of each kind of request')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=50, help='provider API latency per request, in milliseconds')
+    parser.add_argument('--jitter', type=float, default=20, help='standard deviation of the latency, in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of provider requests which fail')
+    parser.add_argument('--throttle', type=float, default=0, help='provider requests per second, 0 for unlimited')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('GUNICORN_WORKERS', 2)))
+    parser.add_argument('--worker-class', default=os.getenv('GUNICORN_WORKER_CLASS', 'gthread'))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('GUNICORN_THREADS', 16)))
+    parser.add_argument('--log', default='/tmp/nanobox-load.log', help='where gunicorn logs to')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    with open(args.log, 'w') as log:
+        provider, app, port = start(args, log)
+
+        try:
+            clients = [Client(port, 'load-account-%d' % (i % args.accounts), random.Random(args.seed * 1000 + i))
+                       for i in range(args.clients)]
+
+            # Each account needs the key its servers are created with
+            for client in clients[:args.accounts]:
+                client.request('POST', '/vultr/keys', {'id': 'load-key', 'key': PUBLIC_KEY})
+
+            results, lock, halt, warm = {}, threading.Lock(), threading.Event(), threading.Event()
+            threads = [threading.Thread(target=drive, args=(client, args.mix, halt, warm, results, lock))
+                       for client in clients]
+            for thread in threads:
+                thread.start()
+
+            time.sleep(args.warmup)
+            warm.set()
+            started = time.perf_counter()
+            time.sleep(args.duration)
+            with lock:
+                measured = {operation: list(samples) for operation, samples in results.items()}
+            elapsed = time.perf_counter() - started
+
+            halt.set()
+            for thread in threads:
+                thread.join()
+            for client in clients:
+                client.close()
+        finally:
+            provider_summary = stop(provider, app)
+
+    rows = summarize(measured, elapsed)
+    settings = {name: value for name, value in vars(args).items() if name not in ('json', 'log')}
+
+    if args.json:
+        print(json.dumps({'settings': settings, 'seconds': elapsed, 'results': rows, 'provider': provider_summary},
+                         indent=2, sort_keys=True))
+        return 0
+
+    print('%d clients over %d accounts for %.1fs: %d %s worker(s) x %d threads, provider latency %gms (+/-%gms), '
+          'error rate %g, throttle %s' % (args.clients, args.accounts, elapsed, args.workers, args.worker_class,
+                                          args.threads, args.latency, args.jitter, args.error_rate,
+                                          '%g/s' % (args.throttle) if args.throttle else 'off'))
+    print('%-8s %8s %7s %8s %9s %9s %9s %9s' % ('request', 'count', 'errors', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms',
+                                                'max ms'))
+    for operation, row in rows.items():
+        print('%-8s %8d %7d %8.1f %9.1f %9.1f %9.1f %9.1f' % (operation, row['count'], row['errors'], row['rps'],
+                                                              row['p50'], row['p90'], row['p99'], row['max']))
+    print('provider: %s' % (provider_summary or 'no summary'))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""
+The Flask app, with the Vultr adapter's libcloud driver pointed at a local stand-in API (see `bench.provider`) instead
+of api.vultr.com, for load testing under gunicorn:
+
+    LOAD_PROVIDER_URL=http://127.0.0.1:9090 gunicorn -c etc/gunicorn.py bench.loadapp:app
+
+Every other part of the request path, including libcloud's HTTP connection layer, runs as it does in production. Unless
+`DATA_REDIS_HOST` is set, each worker uses an in-memory Redis, and unless `RATE_LIMITS` is set, calls to the stand-in
+aren't rate limited.
+"""
+import os
+
+from bench import provider, stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters.vultr import Vultr
+from nanobox_libcloud.utils import limiter, store
+
+DRIVER = provider.local_driver(os.getenv('LOAD_PROVIDER_URL', 'http://127.0.0.1:9090'))
+
+Vultr._get_driver_class = lambda self: DRIVER
+Vultr._resolve_egress_ip = lambda self: None
+
+if not os.getenv('DATA_REDIS_HOST'):
+    store.use(stubs.FakeRedis())
+
+if not os.getenv('RATE_LIMITS'):
+    limiter.LIMITS.clear()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark for the catalog data models.
+
+Compares the previous attribute-based models, which validated every keyword with `hasattr`/`setattr`, against the
+slot-based ones in utils.models: time to build each ServerSpec, time to serialize it, and memory per instance.
+
+    python -m bench.models [--specs 6000] [--runs 15]
+"""
+import argparse
+import timeit
+import tracemalloc
+
+from nanobox_libcloud.utils import models
+
+
+class LegacyModel(object):
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            if not hasattr(self, key):
+                raise AttributeError("The {} model has no field {}.".format(self.__class__.__name__, key))
+            setattr(self, key, value)
+
+
+class LegacyServerSpec(LegacyModel):
+    id = None
+    name = None
+    ram = None
+    cpu = None
+    disk = None
+    transfer = None
+    dollars_per_hr = None
+    dollars_per_mo = None
+
+    to_nanobox = models.ServerSpec.to_nanobox
+
+
+def fields(i):
+    return {
+        'id': 'size-%d' % i,
+        'name': 'Size %d' % i,
+        'ram': 512 * (i % 64 + 1),
+        'cpu': float(i % 32 + 1),
+        'disk': 20 * (i % 64 + 1),
+        'transfer': None,
+        'dollars_per_hr': 0.01 * i,
+        'dollars_per_mo': 7.2 * i,
+    }
+
+
+def measure(model, specs, runs):
+    kwargs = [fields(i) for i in range(specs)]
+
+    build = min(timeit.repeat(lambda: [model(**spec) for spec in kwargs], number=1, repeat=runs))
+    built = [model(**spec) for spec in kwargs]
+    serialize = min(timeit.repeat(lambda: [spec.to_nanobox() for spec in built], number=1, repeat=runs))
+    del built
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = [model(**spec) for spec in kwargs]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    return build / specs, serialize / specs, (allocated - len(built) * 8) / specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--specs', type=int, default=6000)
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+
+    print('%-18s %14s %16s %14s' % ('model', 'build us/spec', 'to_nanobox us', 'bytes/spec'))
+    for name, model in [('legacy ServerSpec', LegacyServerSpec), ('slots ServerSpec', models.ServerSpec)]:
+        build, serialize, size = measure(model, args.specs, args.runs)
+        print('%-18s %14.3f %16.3f %14.0f' % (name, build * 1e6, serialize * 1e6, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Serialization benchmark for utils.output, on a catalog sized like the GCE and Azure ARM ones.
+
+Compares the previous `json.dumps(data, indent=2)` output with the compact and orjson encoders, and the size of the
+gzipped bodies clients accepting compression receive.
+
+    python -m bench.output [--regions 40] [--plans 6] [--specs 25] [--runs 20]
+"""
+import argparse
+import gzip
+import timeit
+
+from flask import json
+
+from bench import data
+from nanobox_libcloud.utils import output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--regions', type=int, default=40)
+    parser.add_argument('--plans', type=int, default=6)
+    parser.add_argument('--specs', type=int, default=25)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    catalog = data.catalog(args.regions, args.plans, args.specs)
+    encoders = [
+        ('indent=2 (previous)', lambda: json.dumps(catalog, indent=2).encode('utf-8')),
+        ('compact json', lambda: json.dumps(catalog, separators=(',', ':')).encode('utf-8')),
+        ('pretty (?pretty=1)', lambda: output.encode(catalog, True)),
+        ('compact (default)', lambda: output.encode(catalog)),
+    ]
+
+    print('%d specs, encoder: %s' % (args.regions * args.plans * args.specs,
+                                     'orjson' if output.orjson is not None else 'flask.json'))
+    print('%-22s %10s %12s %12s %10s' % ('encoding', 'encode ms', 'bytes', 'gzip bytes', 'gzip ms'))
+    for name, encode in encoders:
+        body = encode()
+        seconds = min(timeit.repeat(encode, number=1, repeat=args.runs))
+        gzip_seconds = min(timeit.repeat(lambda: gzip.compress(body, 6), number=1, repeat=max(args.runs // 4, 1)))
+        print('%-22s %10.2f %12d %12d %10.2f' % (name, seconds * 1000, len(body), len(gzip.compress(body, 6)),
+                                                 gzip_seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
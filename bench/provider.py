@@ -0,0 +1,258 @@
+"""
+Local HTTP stand-in for a provider API, for load testing without cloud accounts.
+
+Serves the parts of the Vultr v1 API the Vultr adapter uses (regions, plans, OS images, SSH keys and servers), keeping
+keys and servers per API key, with tunable latency, error rate and throttling. Throttled requests are answered with a
+503, as Vultr does when rate limiting, and failed ones with a 500.
+
+    python -m bench.provider [--port 9090] [--latency 50] [--jitter 20] [--error-rate 0.01] [--throttle 100]
+"""
+import argparse
+import json
+import random
+import socketserver
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from libcloud.compute.drivers.vultr import VultrNodeDriver
+
+CITIES = [('New Jersey', 'US'), ('Chicago', 'US'), ('Dallas', 'US'), ('Seattle', 'US'), ('Los Angeles', 'US'),
+          ('Atlanta', 'US'), ('Amsterdam', 'NL'), ('London', 'GB'), ('Frankfurt', 'DE'), ('Silicon Valley', 'US'),
+          ('Sydney', 'AU'), ('Paris', 'FR'), ('Tokyo', 'JP'), ('Miami', 'US'), ('Singapore', 'SG')]
+
+# (VPSPLANID, plan type, vCPUs, RAM MB, disk GB, bandwidth TB, monthly price)
+PLANS = [('201', 'SSD', 1, 1024, 25, 1, 5), ('202', 'SSD', 1, 2048, 55, 2, 10), ('203', 'SSD', 2, 4096, 80, 3, 20),
+         ('204', 'SSD', 4, 8192, 160, 4, 40), ('205', 'SSD', 6, 16384, 320, 5, 80), ('206', 'SSD', 8, 32768, 640, 6, 160),
+         ('207', 'SSD', 16, 65536, 1280, 10, 320), ('208', 'SSD', 24, 98304, 1600, 15, 640),
+         ('115', 'DEDICATED', 2, 8192, 120, 10, 60), ('116', 'DEDICATED', 4, 16384, 240, 20, 120),
+         ('117', 'DEDICATED', 6, 32768, 480, 30, 240)]
+
+
+class TokenBucket(object):
+    """
+    Allows `rate` requests per second on average, in bursts of up to one second's worth.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+
+class ProviderAPI(object):
+    """
+    The stand-in API's state and behaviour, shared by all the threads serving it.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(throttle) if throttle > 0 else None
+        self.accounts = {}  # type: dict
+        self.counts = {'requests': 0, 'throttled': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self.routes = {
+            ('GET', '/v1/regions/list'): self.regions,
+            ('GET', '/v1/plans/list'): self.plans,
+            ('GET', '/v1/os/list'): self.images,
+            ('GET', '/v1/sshkey/list'): self.keys,
+            ('POST', '/v1/sshkey/create'): self.create_key,
+            ('POST', '/v1/sshkey/destroy'): self.destroy_key,
+            ('GET', '/v1/server/list'): self.servers,
+            ('POST', '/v1/server/create'): self.create_server,
+            ('POST', '/v1/server/destroy'): self.destroy_server,
+            ('POST', '/v1/server/reboot'): self.reboot_server,
+        }
+
+    def handle(self, method, path, api_key, params):
+        """Returns the status and JSON-serializable body answering a request."""
+        with self._lock:
+            self.counts['requests'] += 1
+
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+        if self.bucket is not None and not self.bucket.take():
+            self._count('throttled')
+            return 503, 'Rate limit reached - please try your request again later.'
+
+        if self.error_rate and random.random() < self.error_rate:
+            self._count('errors')
+            return 500, 'Internal server error'
+
+        route = self.routes.get((method, path))
+        if route is None:
+            return 404, 'Invalid API location'
+
+        if route in (self.regions, self.plans, self.images):
+            return 200, route()
+
+        if not api_key:
+            return 403, 'Invalid API key.'
+
+        with self._lock:
+            account = self.accounts.setdefault(api_key, {'keys': {}, 'servers': {}})
+            return route(account, params)
+
+    def regions(self):
+        return {str(i + 1): {'DCID': str(i + 1), 'name': city, 'country': country, 'continent': '', 'state': ''}
+                for i, (city, country) in enumerate(CITIES)}
+
+    def plans(self):
+        return {plan_id: {'VPSPLANID': plan_id, 'name': '%d MB RAM,%d GB SSD,%d.00 TB BW' % (ram, disk, bandwidth),
+                          'vcpu_count': str(cpus), 'ram': str(ram), 'disk': str(disk), 'bandwidth': '%d.00' % (bandwidth),
+                          'price_per_month': '%d.00' % (price), 'plan_type': plan_type, 'windows': False,
+                          'available_locations': list(range(1, len(CITIES) + 1))}
+                for plan_id, plan_type, cpus, ram, disk, bandwidth, price in PLANS}
+
+    def images(self):
+        return {os_id: {'OSID': os_id, 'name': name, 'arch': 'x64', 'family': family, 'windows': False}
+                for os_id, name, family in [('215', 'Ubuntu 16.04 x64', 'ubuntu'), ('270', 'Ubuntu 18.04 x64', 'ubuntu'),
+                                            ('244', 'Debian 9 x64 (stretch)', 'debian')]}
+
+    def keys(self, account, params):
+        return 200, account['keys'] or []
+
+    def create_key(self, account, params):
+        key_id = uuid.uuid4().hex[:13]
+        account['keys'][key_id] = {'SSHKEYID': key_id, 'name': params.get('name', ''),
+                                   'ssh_key': params.get('ssh_key', ''), 'date_created': _now()}
+        return 200, {'SSHKEYID': key_id}
+
+    def destroy_key(self, account, params):
+        if account['keys'].pop(params.get('SSHKEYID'), None) is None:
+            return 412, 'Invalid SSH key.'
+        return 200, ''
+
+    def servers(self, account, params):
+        return 200, account['servers'] or []
+
+    def create_server(self, account, params):
+        for param in ('DCID', 'VPSPLANID', 'OSID'):
+            if not params.get(param):
+                return 412, 'Missing %s' % (param)
+
+        server_id = str(random.randint(10000000, 99999999))
+        account['servers'][server_id] = {
+            'SUBID': server_id, 'label': params.get('label', ''), 'status': 'active', 'power_status': 'running',
+            'main_ip': '203.0.113.%d' % (random.randint(1, 254)), 'DCID': params['DCID'],
+            'VPSPLANID': params['VPSPLANID'], 'date_created': _now(),
+        }
+        return 200, {'SUBID': server_id}
+
+    def destroy_server(self, account, params):
+        if account['servers'].pop(params.get('SUBID'), None) is None:
+            return 412, 'Invalid server.'
+        return 200, ''
+
+    def reboot_server(self, account, params):
+        return (200, '') if params.get('SUBID') in account['servers'] else (412, 'Invalid server.')
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    api = None  # type: ProviderAPI
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.answer()
+
+    def answer(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if length:
+            params.update({name: values[-1] for name, values in
+                           parse_qs(self.rfile.read(length).decode('utf-8')).items()})
+
+        status, body = self.api.handle(self.command, url.path, self.headers.get('API-Key'), params)
+        data = json.dumps(body).encode('utf-8') if status == 200 and body != '' else str(body).encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json' if status == 200 else 'text/plain')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(api: ProviderAPI, host='127.0.0.1', port=9090) -> Server:
+    """Starts serving the stand-in API from a background thread, returning the server so it can be shut down."""
+    handler = type('Handler', (Handler,), {'api': api})
+    server = Server((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='provider-api', daemon=True).start()
+
+    return server
+
+
+def local_driver(url: str) -> type:
+    """Returns a Vultr driver class sending its requests to the stand-in API at `url` rather than api.vultr.com."""
+    parts = urlsplit(url)
+
+    class LocalVultrNodeDriver(VultrNodeDriver):
+        def __init__(self, key, secret=None, **kwargs):
+            super().__init__(key, secret, secure=parts.scheme == 'https', host=parts.hostname, port=parts.port)
+
+    return LocalVultrNodeDriver
+
+
+def _now():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9090)
+    parser.add_argument('--latency', type=float, default=50, help='mean latency per request, in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0, help='standard deviation of the latency, in milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with a 500')
+    parser.add_argument('--throttle', type=float, default=0, help='requests per second allowed, 0 for unlimited')
+    args = parser.parse_args()
+
+    api = ProviderAPI(args.latency / 1000, args.jitter / 1000, args.error_rate, args.throttle)
+    server = serve(api, args.host, args.port)
+    print('Serving the stand-in provider API on http://%s:%d' % (args.host, args.port), flush=True)
+
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print('%(requests)d requests, %(throttled)d throttled, %(errors)d errors' % (api.counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+"""
+In-process stand-ins for the libcloud drivers of every adapter, and for Redis, so the adapters can run offline.
+
+Each stub driver answers with realistically shaped locations, sizes, images, nodes, keys and (where the adapter needs
+them) rate cards, waiting `StubDriver.latency` seconds per call to stand in for the provider's API. Keys and nodes
+created through a stub are kept per credential, so they can be found again by later requests.
+
+    with stubs.installed(latency=0.05):
+        app.test_client().get('/vultr/catalog')
+"""
+import contextlib
+import hashlib
+import random
+import re
+import threading
+import time
+import typing
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from libcloud.common.exceptions import BaseHTTPError
+from libcloud.common.types import ProviderError
+from libcloud.compute.base import KeyPair, Node, NodeImage, NodeLocation, NodeSize, StorageVolume
+from libcloud.compute.drivers.vultr import SSHKey
+from libcloud.compute.types import NodeState
+
+from nanobox_libcloud import adapters, tasks
+from nanobox_libcloud.utils import cache, limiter, store
+
+
+class StubDriver(object):
+    """
+    Base stub driver, implementing the calls most adapters share.
+    """
+
+    latency = 0.0
+
+    # Per-credential keys and nodes, shared by all instances of a driver class
+    _accounts = None
+    _lock = threading.Lock()
+
+    def __init__(self, key=None, secret=None, **kwargs):
+        self.key = key
+        self.secret = secret
+
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+        if not key and not kwargs.get('key_file'):
+            raise ProviderError('Invalid credentials', 401, self)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _account(self) -> dict:
+        with self._lock:
+            accounts = type(self).__dict__.get('_accounts')
+            if accounts is None:
+                accounts = type(self)._accounts = {}
+
+            return accounts.setdefault(self.key, {'keys': {}, 'nodes': {}})
+
+    # Catalog data, overridden per provider
+    def _locations(self):
+        return []
+
+    def _sizes(self, location=None):
+        return []
+
+    def _images(self):
+        return [NodeImage('ubuntu-16-04', 'Ubuntu 16.04 x64', self)]
+
+    # Shared driver API
+    def list_locations(self):
+        self._wait()
+        return self._locations()
+
+    def list_sizes(self, location=None):
+        self._wait()
+        return self._sizes(location)
+
+    def list_images(self, *args, **kwargs):
+        self._wait()
+        return self._images()
+
+    def list_nodes(self, *args, **kwargs):
+        self._wait()
+        return list(self._account()['nodes'].values())
+
+    def create_node(self, name=None, size=None, image=None, location=None, **kwargs):
+        self._wait()
+        node_id = uuid.uuid4().hex[:12]
+        location = location or kwargs.get('region')
+        node = Node(node_id, name, NodeState.RUNNING, ['203.0.113.%d' % random.randint(1, 254)],
+                    ['10.0.0.%d' % random.randint(1, 254)], self, size=size, image=image,
+                    extra={'region': getattr(location, 'id', location)})
+        self._account()['nodes'][node_id] = node
+        return node
+
+    def destroy_node(self, node):
+        self._wait()
+        return self._account()['nodes'].pop(node.id, None) is not None
+
+    def reboot_node(self, node):
+        self._wait()
+        return True
+
+    def list_key_pairs(self, *args, **kwargs):
+        self._wait()
+        return list(self._account()['keys'].values())
+
+    def create_key_pair(self, name, public_key=None, *args, **kwargs):
+        self._wait()
+        return self._add_key(name, public_key)
+
+    def import_key_pair_from_string(self, name, key_material, *args, **kwargs):
+        self._wait()
+        return self._add_key(name, key_material)
+
+    def delete_key_pair(self, key_pair):
+        self._wait()
+        return self._account()['keys'].pop(key_pair.name, None) is not None
+
+    def _add_key(self, name, public_key):
+        key = KeyPair(name, public_key, hashlib.md5((public_key or '').encode('utf-8')).hexdigest(), self)
+        self._account()['keys'][name] = key
+        return key
+
+
+class VultrStub(StubDriver):
+    CITIES = ['New Jersey', 'Chicago', 'Dallas', 'Seattle', 'Los Angeles', 'Atlanta', 'Amsterdam', 'London',
+              'Frankfurt', 'Silicon Valley', 'Sydney', 'Paris', 'Tokyo', 'Miami', 'Singapore']
+
+    def _locations(self):
+        return [NodeLocation(str(i + 1), city, '', self) for i, city in enumerate(self.CITIES)]
+
+    def _sizes(self, location=None):
+        sizes = []
+        everywhere = [str(i + 1) for i in range(len(self.CITIES))]
+
+        for i, (ram, cpus, disk, price) in enumerate([(1024, 1, 25, 5), (2048, 1, 55, 10), (4096, 2, 80, 20),
+                                                     (8192, 4, 160, 40), (16384, 6, 320, 80), (32768, 8, 640, 160),
+                                                     (65536, 16, 1280, 320), (98304, 24, 1600, 640)]):
+            sizes.append(NodeSize(str(201 + i), '%d MB RAM,%d GB SSD' % (ram, disk), ram, disk, ram // 1024, price,
+                                  self, extra={'plan_type': 'SSD', 'vcpu_count': cpus,
+                                               'available_locations': everywhere[i % 3:]}))
+
+        for i, (ram, cpus, disk, price) in enumerate([(8192, 2, 120, 60), (16384, 4, 240, 120),
+                                                     (32768, 6, 480, 240)]):
+            sizes.append(NodeSize(str(115 + i), '%d MB RAM,%d GB SSD (dedicated)' % (ram, disk), ram, disk, 10, price,
+                                  self, extra={'plan_type': 'DEDICATED', 'vcpu_count': cpus,
+                                               'available_locations': everywhere[::2]}))
+
+        return sizes
+
+    def _images(self):
+        return [NodeImage('215', 'Ubuntu 16.04 x64', self), NodeImage('270', 'Ubuntu 18.04 x64', self)]
+
+    def _add_key(self, name, public_key):
+        key = SSHKey(uuid.uuid4().hex[:13], name, public_key)
+        self._account()['keys'][name] = key
+        return key
+
+
+class PacketStub(StubDriver):
+    def _locations(self):
+        return [NodeLocation(code, name, country, self) for code, name, country in [
+            ('ewr1', 'Parsippany, NJ', 'US'), ('sjc1', 'Sunnyvale, CA', 'US'), ('ams1', 'Amsterdam, NL', 'NL'),
+            ('nrt1', 'Tokyo, JP', 'JP'), ('dfw2', 'Dallas, TX', 'US')]]
+
+    def _sizes(self, location=None):
+        return [NodeSize(size_id, name, ram, disk, None, price, self, extra={'cpus': cpus})
+                for size_id, name, ram, disk, price, cpus in [
+                    ('baremetal_0', 'Type 0', 8192, 80, 0.07, 4), ('baremetal_1', 'Type 1', 32768, 240, 0.4, 4),
+                    ('baremetal_2', 'Type 2', 262144, 2800, 1.25, 24), ('baremetal_3', 'Type 3', 65536, 1600, 1.0, 16),
+                    ('baremetal_1e', 'Type 1E', 32768, 240, 0.4, 4), ('baremetal_2a', 'Type 2A', 131072, 500, 0.5, 96)]]
+
+    def _images(self):
+        return [NodeImage('ubuntu_16_04', 'Ubuntu 16.04 LTS', self), NodeImage('centos_7', 'CentOS 7', self)]
+
+    def list_nodes(self, project_id=None):
+        return super().list_nodes()
+
+
+class ScalewayStub(StubDriver):
+    def _locations(self):
+        return [NodeLocation('par1', 'Paris 1', 'FR', self), NodeLocation('ams1', 'Amsterdam 1', 'NL', self)]
+
+    def _sizes(self, location=None):
+        return [NodeSize(size_id, size_id, ram, disk, None, price, self, extra={
+                    'baremetal': baremetal, 'arch': arch, 'cores': cores, 'monthly': monthly, 'max_disk': disk})
+                for size_id, ram, disk, price, monthly, cores, arch, baremetal in [
+                    ('START1-XS', 1024, 25, 0.004, 1.99, 1, 'x86_64', False),
+                    ('START1-S', 2048, 50, 0.008, 3.99, 2, 'x86_64', False),
+                    ('START1-M', 4096, 100, 0.016, 7.99, 4, 'x86_64', False),
+                    ('START1-L', 8192, 200, 0.032, 15.99, 8, 'x86_64', False),
+                    ('VC1S', 2048, 50, 0.006, 2.99, 2, 'x86_64', False),
+                    ('VC1M', 4096, 100, 0.012, 5.99, 4, 'x86_64', False),
+                    ('C2S', 8192, 50, 0.024, 11.99, 4, 'x86_64', True),
+                    ('C2M', 16384, 50, 0.036, 17.99, 8, 'x86_64', True),
+                    ('C2L', 32768, 50, 0.048, 23.99, 8, 'x86_64', True),
+                    ('X64-15GB', 15360, 200, 0.05, 24.99, 6, 'x86_64', False),
+                    ('X64-30GB', 30720, 300, 0.1, 49.99, 8, 'x86_64', False),
+                    ('ARM64-2GB', 2048, 50, 0.006, 2.99, 4, 'arm64', False)]]
+
+    def _images(self):
+        return [NodeImage('img-%d' % i, 'Ubuntu Xenial', self, extra={'arch': arch, 'size': 10})
+                for i, arch in enumerate(['x86_64', 'arm64', 'arm'])]
+
+    def list_nodes(self, region=None):
+        return super().list_nodes()
+
+
+class OvhStub(StubDriver):
+    FLAVORS = [('b2-7', 'eg', 7000, 50, 2), ('b2-15', 'eg', 15000, 100, 4), ('b2-30', 'eg', 30000, 200, 8),
+               ('b2-60', 'eg', 60000, 400, 16), ('c2-7', 'cpu', 7000, 50, 2), ('c2-15', 'cpu', 15000, 100, 4),
+               ('c2-30', 'cpu', 30000, 200, 8), ('r2-15', 'ram', 15000, 50, 2), ('r2-30', 'ram', 30000, 50, 2),
+               ('r2-60', 'ram', 60000, 100, 4), ('g1-15', 'gpu', 15000, 100, 4), ('win-b2-7', 'eg', 7000, 50, 2),
+               ('s1-2', 'sandbox', 2000, 10, 1)]
+
+    def _locations(self):
+        return [NodeLocation(code, code, country, self) for code, country in [
+            ('BHS3', 'CA'), ('GRA3', 'FR'), ('SBG3', 'FR'), ('WAW1', 'PL'), ('DE1', 'DE'), ('UK1', 'UK')]]
+
+    def _sizes(self, location=None):
+        regions = [location.id] if location is not None else [location.id for location in self._locations()]
+
+        return [NodeSize('%s-%s' % (region, name), name, ram, disk, None, None, self,
+                         extra={'type': 'ovh.ssd.%s' % (plan), 'region': region, 'vcpus': vcpus})
+                for region in regions for name, plan, ram, disk, vcpus in self.FLAVORS]
+
+    def _images(self):
+        return [NodeImage(uuid.uuid5(uuid.NAMESPACE_DNS, name).hex, name, self)
+                for name in ('Ubuntu 16.04', 'Ubuntu 18.04', 'Debian 9')]
+
+    def ex_get_pricing(self, size_id):
+        self._wait()
+        name = size_id.split('-', 1)[-1]
+        ram = next(ram for flavor, _, ram, _, _ in self.FLAVORS if flavor == name)
+        return {'hourly': round(ram / 1000 * 0.0045, 4), 'monthly': round(ram / 1000 * 3.1, 2)}
+
+    def ex_get_node(self, node_id):
+        self._wait()
+        if node_id not in self._account()['nodes']:
+            raise BaseHTTPError(404, 'Object not found')
+
+        return self._account()['nodes'][node_id]
+
+
+class GceStub(StubDriver):
+    ZONES = ['us-central1-a', 'us-central1-b', 'us-east1-b', 'us-west1-a', 'europe-west1-b', 'europe-west2-a',
+             'asia-east1-a', 'asia-northeast1-a', 'australia-southeast1-a', 'southamerica-east1-a']
+
+    def __init__(self, user_id=None, key=None, project=None, **kwargs):
+        super().__init__(key, user_id=user_id, project=project, **kwargs)
+
+    def _locations(self):
+        return [NodeLocation(str(2000 + i), zone, '', self) for i, zone in enumerate(self.ZONES)]
+
+    def _sizes(self, location=None):
+        sizes = [NodeSize('1000', 'f1-micro', 614, 0, None, 0.0076, self, extra={'guestCpus': 1}),
+                 NodeSize('1001', 'g1-small', 1740, 0, None, 0.0257, self, extra={'guestCpus': 1})]
+
+        for family, ram_per_cpu, price_per_cpu in [('standard', 3840, 0.0475), ('highcpu', 922, 0.0354),
+                                                   ('highmem', 6656, 0.0592)]:
+            for cpus in (1, 2, 4, 8, 16, 32, 64):
+                if family != 'standard' and cpus == 1:
+                    continue
+                sizes.append(NodeSize(str(3000 + len(sizes)), 'n1-%s-%d' % (family, cpus), ram_per_cpu * cpus, 0,
+                                      None, round(price_per_cpu * cpus, 4), self, extra={'guestCpus': cpus}))
+
+        return sizes
+
+    def ex_get_size(self, name, zone=None):
+        self._wait()
+        return next(size for size in self._sizes() if size.name == name)
+
+    def ex_get_network(self, name):
+        self._wait()
+        return SimpleNamespace(name=name)
+
+    def create_volume(self, size, name, location=None, **kwargs):
+        self._wait()
+        return StorageVolume(uuid.uuid4().hex[:12], name, size, self, extra={'sourceImage': 'ubuntu-1604-xenial'})
+
+    def ex_get_node(self, name, zone=None):
+        self._wait()
+        for node in self._account()['nodes'].values():
+            if node.name == name:
+                return node
+
+        raise ProviderError('The resource was not found', 404, self)
+
+
+class AzureARMStub(StubDriver):
+    REGIONS = [('westus2', 'West US 2', 'US West 2'), ('eastus', 'East US', 'US East'),
+               ('centralus', 'Central US', 'US Central'), ('westeurope', 'West Europe', 'EU West'),
+               ('northeurope', 'North Europe', 'EU North'), ('uksouth', 'UK South', 'UK South'),
+               ('southeastasia', 'Southeast Asia', 'AP Southeast'), ('japaneast', 'Japan East', 'JA East'),
+               ('australiaeast', 'Australia East', 'AU East'), ('brazilsouth', 'Brazil South', 'BR South')]
+    SIZES = [('Basic_A0', 768, 20, 'Shared', 0.018), ('Basic_A1', 1792, 40, 1, 0.023),
+             ('Standard_A1', 1792, 70, 1, 0.06), ('Standard_A2', 3584, 135, 2, 0.12),
+             ('Standard_B1s', 1024, 4, 1, 0.012), ('Standard_B2s', 4096, 8, 2, 0.05),
+             ('Standard_D1_v2', 3584, 50, 1, 0.073), ('Standard_D2_v2', 7168, 100, 2, 0.146),
+             ('Standard_D4_v2', 28672, 400, 8, 0.585), ('Standard_DS2_v2', 7168, 14, 2, 0.146),
+             ('Standard_F2s', 4096, 8, 2, 0.1), ('Standard_F8s', 16384, 32, 8, 0.398),
+             ('Standard_E4_v3', 32768, 64, 4, 0.266), ('Standard_G2', 57344, 768, 4, 1.34),
+             ('Standard_L4s', 32768, 678, 4, 0.344), ('Standard_NC6', 57344, 340, 6, 0.9),
+             ('Standard_H8', 57344, 1000, 8, 0.971), ('Standard_D2_v2_Promo', 7168, 100, 2, 0.12)]
+
+    def __init__(self, tenant_id=None, subscription_id=None, key=None, secret=None, **kwargs):
+        super().__init__(key, secret, tenant_id=tenant_id, subscription_id=subscription_id, **kwargs)
+
+    def _locations(self):
+        return [NodeLocation(region, name, '', self) for region, name, _ in self.REGIONS]
+
+    def _sizes(self, location=None):
+        return [NodeSize(size_id, size_id, ram, disk, None, None, self, extra={'numberOfCores': cores})
+                for size_id, ram, disk, cores, _ in self.SIZES]
+
+    def list_images(self, location=None, ex_publisher=None, ex_offer=None, ex_sku=None, ex_version=None):
+        self._wait()
+        return [NodeImage('%s:%s:%s:%s' % (ex_publisher, ex_offer, ex_sku, ex_version), ex_sku, self)]
+
+    def ex_get_ratecard(self, offer_durable_id, currency='USD', locale='en-US', region='US'):
+        """Returns a rate card with a compute meter per size and region, named the way the adapter looks them up."""
+        self._wait()
+        meters = [self._meter('Networking', 'Public IP Addresses', '', 'IP Address Hours', 0.004)]
+
+        for size_id, _, _, _, price in self.SIZES:
+            vm_size = re.sub(
+                r"(?i:Standard_(A)(\d+)$|(Standard_(?:[BDEFGL]|N[CV]))S?(\d+m?)s?(?:-\d+s?)?|(Standard_M\d+)(?:-\d+)?)",
+                r'\1\2\3\4\5', size_id.replace('Basic_', 'BASIC.'))
+
+            for n, (_, _, meter_region) in enumerate(self.REGIONS):
+                meters.append(self._meter('Virtual Machines', '%s VM' % (vm_size), meter_region, 'Compute Hours',
+                                          round(price * (1 + n * 0.02), 4)))
+
+        return {'Meters': meters}
+
+    @staticmethod
+    def _meter(category, sub_category, region, name, rate):
+        return {'MeterStatus': 'Active', 'MeterCategory': category, 'MeterSubCategory': sub_category,
+                'MeterRegion': region, 'MeterName': name, 'MeterRates': {'0': rate}}
+
+    def ex_list_resource_groups(self):
+        self._wait()
+        return list(self._account().setdefault('groups', {}).values())
+
+    def ex_create_resource_group(self, name, location):
+        self._wait()
+        group = self._account().setdefault('groups', {})[name] = SimpleNamespace(name=name, location=location)
+        return group
+
+    def ex_list_networks(self):
+        self._wait()
+        return list(self._account().setdefault('networks', {}).values())
+
+    def ex_create_network(self, name, location, resource_group):
+        self._wait()
+        network = self._account().setdefault('networks', {})[name] = SimpleNamespace(name=name, location=location)
+        return network
+
+    def ex_list_subnets(self, network):
+        self._wait()
+        return [SimpleNamespace(name='default', network=network)]
+
+    def ex_create_public_ip(self, name, resource_group, location=None):
+        self._wait()
+        return SimpleNamespace(name=name)
+
+    def ex_create_network_interface(self, name, subnet, resource_group, location=None, public_ip=None):
+        self._wait()
+        return SimpleNamespace(name=name, subnet=subnet, public_ip=public_ip)
+
+
+class AzureStub(StubDriver):
+    def __init__(self, subscription_id=None, key_file=None, **kwargs):
+        super().__init__(subscription_id, subscription_id=subscription_id, key_file=key_file, **kwargs)
+
+    def _locations(self):
+        return [NodeLocation(name, name, '', self) for name in ['West US 2', 'East US', 'Central US',
+                                                                'West Europe', 'North Europe', 'Southeast Asia',
+                                                                'Japan East', 'Australia East']]
+
+    def _sizes(self, location=None):
+        return [NodeSize(size_id, size_id, ram, disk, None, price, self, extra={'cores': cores})
+                for size_id, ram, disk, cores, price in [
+                    ('ExtraSmall', 768, 20, 'Shared', 0.02), ('Small', 1792, 70, 1, 0.06),
+                    ('Medium', 3584, 135, 2, 0.12), ('Large', 7168, 285, 4, 0.24),
+                    ('ExtraLarge', 14336, 605, 8, 0.48), ('Standard_D1', 3584, 50, 1, 0.077),
+                    ('Standard_D2', 7168, 100, 2, 0.154), ('Standard_D3', 14336, 200, 4, 0.308),
+                    ('Standard_D4', 28672, 400, 8, 0.616)]]
+
+    def _images(self):
+        return [NodeImage('b39f27a8__Ubuntu-16_04-LTS-amd64-server-20180112-en-us-30GB', 'Ubuntu Server 16.04 LTS',
+                          self)]
+
+
+# Stub driver classes by adapter id
+DRIVERS = {
+    'azure': AzureStub,
+    'azure_arm': AzureARMStub,
+    'gce': GceStub,
+    'ovh': OvhStub,
+    'packet': PacketStub,
+    'scaleway': ScalewayStub,
+    'vultr': VultrStub,
+}
+
+
+class FakeRedis(object):
+    """
+    In-memory stand-in for the few Redis commands the adapters use, answering with strings as the shared client does.
+    """
+
+    def __init__(self):
+        self._data = {}  # type: typing.Dict[str, typing.Tuple[str, typing.Optional[float]]]
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._get(key) is not None:
+                return None
+
+            self._data[key] = (str(value), time.monotonic() + ex if ex else None)
+            return True
+
+    def setex(self, key, time_to_live, value):
+        return self.set(key, value, ex=time_to_live)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def _get(self, key):
+        value, expires = self._data.get(key, (None, None))
+
+        if expires is not None and expires <= time.monotonic():
+            del self._data[key]
+            return None
+
+        return value
+
+
+class FakeCurrencyConverter(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def convert(self, amount, currency, new_currency):
+        return amount * 1.17
+
+
+@contextlib.contextmanager
+def installed(latency=0.0, redis=None):
+    """Makes every adapter use the stub drivers, with the given per-call latency, while `offline`."""
+    with offline(redis), mock.patch.object(StubDriver, 'latency', latency), contextlib.ExitStack() as stack:
+        for adapter_id, driver in DRIVERS.items():
+            stack.enter_context(mock.patch.object(adapters.get_adapter_class(adapter_id), '_get_driver_class',
+                                                  lambda self, driver=driver: driver))
+
+        yield
+
+
+@contextlib.contextmanager
+def offline(redis=None):
+    """Keeps the adapters from reaching anything but their drivers: Redis is in memory, nothing else is looked up over
+    the network, background tasks are not queued, and calls aren't rate limited. The process-wide caches start out
+    empty."""
+    adapters.import_adapters()
+    tasks.import_tasks()
+
+    patches = [mock.patch('nanobox_libcloud.adapters.scaleway.CurrencyConverter', FakeCurrencyConverter),
+               mock.patch('nanobox_libcloud.adapters.vultr.Vultr._resolve_egress_ip', lambda self: None),
+               mock.patch.object(tasks.azure.azure_create_classic, 'delay'),
+               mock.patch.object(tasks.azure.azure_destroy_classic, 'delay'),
+               mock.patch.object(tasks.azure_arm.azure_destroy_arm, 'delay'),
+               mock.patch.dict(limiter.LIMITS, clear=True)]
+
+    previous = store._client
+    store.use(redis if redis is not None else FakeRedis())
+    reset()
+
+    with contextlib.ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+
+        try:
+            yield
+        finally:
+            store.use(previous)
+
+
+def reset():
+    """Empties the process-wide caches, and the keys and nodes created through the stubs."""
+    cache.catalogs.clear()
+    cache.indexes.clear()
+    cache.pricing.clear()
+    cache.ssh_keys.clear()
+
+    for driver in DRIVERS.values():
+        driver._accounts = None
@@ -1,3 +1,5 @@
+import os
+
 # Server mechanics
 bind = '0.0.0.0:8080'
 backlog = 2048
@@ -13,7 +15,9 @@ proc_name = None
 errorlog = '-'
 loglevel = 'info'
 accesslog = '-'
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(L)ss' \
+                    ' provider_calls=%({x-provider-calls}o)s provider_time=%({x-provider-time}o)ss' \
+                    ' "%({x-provider-methods}o)s" provider_refused=%({x-provider-refused}o)s'
 
 #
 # Worker processes
@@ -41,6 +45,16 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 #           egg:gunicorn#eventlet   - Requires eventlet >= 0.9.7
 #           egg:gunicorn#gevent     - Requires gevent >= 0.12.2 (?)
 #           egg:gunicorn#tornado    - Requires tornado >= 0.2
+#           egg:gunicorn#gthread    - Threaded workers; see `threads`
+#
+#       The adapters keep all request state on per-request adapter
+#       instances, so both gthread and gevent workers are supported.
+#       gthread is the default, since it needs no extra packages;
+#       gevent additionally requires `pip install gevent`.
+#
+#   threads - The number of threads each gthread worker uses to
+#       handle requests concurrently. Provider calls are almost
+#       entirely network-bound, so this can be set fairly high.
 #
 #   worker_connections - For the eventlet and gevent worker classes
 #       this limits the maximum number of simultaneous clients that
@@ -64,9 +78,10 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 #       A positive integer. Generally set in the 1-5 seconds range.
 #
 
-workers = 1
-worker_class = 'sync'
-worker_connections = 1000
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
 timeout = 300
 keepalive = 2
 
@@ -102,22 +117,23 @@ def pre_exec(server):
 def when_ready(server):
     server.log.info("Server is ready. Spawning workers")
 
+def post_worker_init(worker):
+    # Threads don't survive forking, so each worker starts its own stack sampler
+    from nanobox_libcloud.utils import sampler
+    sampler.start()
+
 def worker_int(worker):
     worker.log.info("worker received INT or QUIT signal")
 
     ## get traceback info
-    import threading, sys, traceback
-    id2name = dict([(th.ident, th.name) for th in threading.enumerate()])
-    code = []
-    for threadId, stack in sys._current_frames().items():
-        code.append("\n# Thread: %s(%d)" % (id2name.get(threadId,""),
-            threadId))
-        for filename, lineno, name, line in traceback.extract_stack(stack):
-            code.append('File: "%s", line %d, in %s' % (filename,
-                lineno, name))
-            if line:
-                code.append("  %s" % (line.strip()))
-    worker.log.debug("\n".join(code))
+    from nanobox_libcloud.utils import sampler
+    worker.log.debug(sampler.format_stacks())
+
+def child_exit(server, worker):
+    # Drop the live metrics of exited workers when collecting them across processes
+    if os.getenv('prometheus_multiproc_dir') or os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
 
 def worker_abort(worker):
     worker.log.info("worker received SIGABRT signal")
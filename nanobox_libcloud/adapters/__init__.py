@@ -1,24 +1,107 @@
+import ast
 import importlib
 import os
+import threading
 import typing
 
 from nanobox_libcloud.adapters.base import Adapter, AdapterBase
 
 
-def get_adapter(adapter_id: str) -> typing.Optional[Adapter]:
-    """Returns the adapter with the given id or `None` if there is none."""
-    adapter = AdapterBase.registry.get(adapter_id)
-    if adapter:
-        return adapter()
-    return None
+# Ids of the available adapters, mapped to the names of the modules implementing them
+_modules = {}  # type: typing.Dict[str, str]
 
+# Ids of every adapter, whether or not ENABLED_ADAPTERS includes it, mapped the same way
+_all_modules = {}  # type: typing.Dict[str, str]
+_import_lock = threading.Lock()
+
+# Process-lifetime adapter instances, which requests get cheap copies of
+_instances = {}  # type: typing.Dict[str, Adapter]
+_instance_lock = threading.Lock()
+
+
+def get_adapter(adapter_id: str, enabled_only: bool = True) -> typing.Optional[Adapter]:
+    """Returns a per-request adapter with the given id or `None` if there is none. With `enabled_only=False`, adapters
+    left out of ENABLED_ADAPTERS are returned too, for background tasks queued for them to finish their work."""
+    adapter = _instances.get(adapter_id)
+
+    if adapter is None:
+        adapter_class = get_adapter_class(adapter_id, enabled_only)
+        if not adapter_class:
+            return None
+
+        with _instance_lock:
+            if adapter_id not in _instances:
+                _instances[adapter_id] = adapter_class()
+            adapter = _instances[adapter_id]
+
+    return adapter.for_request()
+
+
+def get_adapter_class(adapter_id: str, enabled_only: bool = True) -> typing.Optional[typing.Type[Adapter]]:
+    """Returns the adapter class with the given id, importing its module on first use, or `None` if there is none (or,
+    with `enabled_only`, it isn't enabled)."""
+    modules = _modules if enabled_only else _all_modules
+    if adapter_id not in modules:
+        return None
+
+    if adapter_id not in AdapterBase.registry:
+        with _import_lock:
+            importlib.import_module('{}.{}'.format(__name__, modules[adapter_id]))
+
+    return AdapterBase.registry.get(adapter_id)
+
+
+def adapter_ids() -> typing.List[str]:
+    """Returns the ids of all available adapters, whether or not they have been imported yet."""
+    return sorted(_modules)
+
+
+def find_adapters():
+    """Finds modules containing adapter implementations, and records their adapter ids without importing them."""
+    enabled = set(filter(None, os.getenv('ENABLED_ADAPTERS', '').replace(' ', '').split(',')))
 
-def import_adapters():
-    """Finds and imports modules containing adapter implementations."""
     for file in os.listdir(os.path.dirname(__file__)):
         if not file.startswith('_') and file.endswith('.py'):
-            importlib.import_module('{}.{}'.format(__name__, file[:-3]))
+            for adapter_id in _read_adapter_ids(os.path.join(os.path.dirname(__file__), file)):
+                _all_modules[adapter_id] = file[:-3]
+
+                if not enabled or adapter_id in enabled:
+                    _modules[adapter_id] = file[:-3]
+
+
+def import_adapters():
+    """Imports all available adapters up front, rather than on first use."""
+    for adapter_id in adapter_ids():
+        get_adapter_class(adapter_id)
+
+
+def _read_adapter_ids(path: str) -> typing.Iterator[str]:
+    """Reads the ids of the adapters defined in a module from its source, using `_get_id` if overridden, else `id`."""
+    with open(path, encoding='utf-8') as source:
+        tree = ast.parse(source.read(), path)
+
+    for cls in tree.body:
+        if not isinstance(cls, ast.ClassDef):
+            continue
+
+        ids = {}
+        for node in cls.body:
+            if isinstance(node, ast.FunctionDef) and node.name == '_get_id':
+                ids['_get_id'] = next((_literal(stmt.value) for stmt in node.body if isinstance(stmt, ast.Return)), None)
+            elif isinstance(node, ast.Assign) and any(getattr(target, 'id', None) == 'id' for target in node.targets):
+                ids['id'] = _literal(node.value)
+
+        adapter_id = ids['_get_id'] if '_get_id' in ids else ids.get('id')
+        if isinstance(adapter_id, str) and adapter_id:
+            yield adapter_id
+
+
+def _literal(node) -> typing.Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
 
 
-# Import all modules containing adapters so they will be registered
-import_adapters()
+# Record all modules containing adapters so they can be imported when first used
+find_adapters()
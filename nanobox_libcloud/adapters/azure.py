@@ -17,6 +17,7 @@ from libcloud.compute.deployment import ScriptDeployment
 from nanobox_libcloud import tasks
 from nanobox_libcloud.adapters import Adapter
 from nanobox_libcloud.adapters.base import KeyInstallMixin, RebootMixin
+from nanobox_libcloud.utils import cache
 
 
 class AzureClassic(RebootMixin, KeyInstallMixin, Adapter):
@@ -54,7 +55,6 @@ class AzureClassic(RebootMixin, KeyInstallMixin, Adapter):
         ('standard', 'Standard'),
         ('highspeed', 'High Speed'),
     ]
-    _sizes = {}
 
     def __init__(self, **kwargs):
         self.generic_credentials = {
@@ -62,6 +62,8 @@ class AzureClassic(RebootMixin, KeyInstallMixin, Adapter):
             'key': os.getenv('AZC_KEY', '')
         }
 
+        super().__init__(**kwargs)
+
     def do_server_create(self, headers, data):
         """Create a server with a certain provider."""
         try:
@@ -91,7 +93,6 @@ class AzureClassic(RebootMixin, KeyInstallMixin, Adapter):
                 fp.write(auth_credentials['key'])
                 del auth_credentials['key']
                 auth_credentials['key_file'] = key_file
-                super()._get_user_driver(**auth_credentials)
 
             try:
                 @after_this_request
@@ -103,23 +104,33 @@ class AzureClassic(RebootMixin, KeyInstallMixin, Adapter):
                 def clr_tmp_user(**kwargs):
                     os.remove(key_file)
 
+            super()._get_user_driver(**auth_credentials)
+
+        return self._user_driver
+
+    def _check_user_driver(self, driver):
         try:
-            self._user_driver.list_locations()
+            driver.list_locations()
         except AttributeError:
+            # libcloud fails to parse Azure's "Too Many Requests" responses, which don't mean the credentials are bad
             pass
 
-        return self._user_driver
+    def _get_rate_limit_account(self, credentials):
+        """Returns the account the provider's rate limits apply to: Azure limits whole subscriptions."""
+        return cache.account_id(self._get_id(), {'subscription_id': credentials.get('subscription_id')})
 
     def _get_generic_driver(self):
         """Returns a driver instance for a user with the appropriate authentication credentials set."""
 
         if self._generic_driver is None:
+            # The generic credentials are shared by all requests, so work on a copy of them
+            credentials = dict(self.generic_credentials)
+
             with tempfile.NamedTemporaryFile(mode = 'w+', delete = False) as fp:
                 key_file = fp.name
-                fp.write(self.generic_credentials['key'])
-                del self.generic_credentials['key']
-                self.generic_credentials['key_file'] = key_file
-                super()._get_generic_driver()
+                fp.write(credentials.pop('key'))
+                credentials['key_file'] = key_file
+                self._generic_driver = self._create_driver(**credentials)
 
             @after_this_request
             def clr_tmp_generic(response):
@@ -157,7 +168,7 @@ class AzureClassic(RebootMixin, KeyInstallMixin, Adapter):
             'highspeed': [],
         }
 
-        for size in self._get_generic_driver().list_sizes():
+        for size in self._get_catalog_driver().list_sizes():
             plan = {'A': 'standard', 'D': 'highspeed'}.get(
                 size.id.replace('Standard_', '')[:1], size.id)
 
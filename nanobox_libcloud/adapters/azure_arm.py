@@ -11,6 +11,7 @@ from libcloud.compute.base import NodeAuthSSHKey
 from nanobox_libcloud import tasks
 from nanobox_libcloud.adapters import Adapter
 from nanobox_libcloud.adapters.base import RebootMixin
+from nanobox_libcloud.utils import cache, flight
 
 
 class AzureARM(RebootMixin, Adapter):
@@ -67,8 +68,6 @@ class AzureARM(RebootMixin, Adapter):
         ('gpu', 'GPU'),
         ('high_performance', 'High Performance'),
     ]
-    _sizes = {}
-    _rates = None
 
     def __init__(self, **kwargs):
         self.generic_credentials = {
@@ -79,6 +78,8 @@ class AzureARM(RebootMixin, Adapter):
             'cloud_environment': os.getenv('AZR_CLOUD_ENVIRONMENT', 'default')
         }
 
+        super().__init__(**kwargs)
+
     # Internal overrides for provider retrieval
     def _get_request_credentials(self, headers):
         """Extracts credentials from request headers."""
@@ -91,15 +92,12 @@ class AzureARM(RebootMixin, Adapter):
             "cloud_environment": headers.get("Auth-Cloud-Environment", 'default')
         }
 
-    def _get_user_driver(self, **auth_credentials):
-        """Returns a driver instance for a user with the appropriate authentication credentials set."""
+    def _check_user_driver(self, driver):
+        driver.list_locations()
 
-        if self._user_driver is not None:
-            return self._user_driver
-        else:
-            driver = super()._get_user_driver(**auth_credentials)
-            driver.list_locations()
-            return driver
+    def _get_rate_limit_account(self, credentials):
+        """Returns the account the provider's rate limits apply to: Azure limits whole subscriptions."""
+        return cache.account_id(self._get_id(), {'subscription_id': credentials.get('subscription_id')})
 
     @classmethod
     def _get_id(cls):
@@ -136,7 +134,7 @@ class AzureARM(RebootMixin, Adapter):
             'high_performance': [],
         }
 
-        for size in self._get_generic_driver().list_sizes(location):
+        for size in self._get_catalog_driver().list_sizes(location):
             plan = {
                 'A': 'standard',
                 'B': 'burstable',
@@ -309,7 +307,7 @@ class AzureARM(RebootMixin, Adapter):
         return driver.list_images(location, vendor, product, version, 'latest')[0]
 
     def _find_server(self, driver, id):
-        for server in driver.list_nodes():
+        for server in self._list_nodes(driver):
             if server.name == id:
                 return server
 
@@ -332,39 +330,35 @@ class AzureARM(RebootMixin, Adapter):
                 return subnet
 
     def _get_rates(self):
-        if not self._rates:
-            driver = self._get_generic_driver()
-            self._rates = {}
-
-            # Pay As You Go pricing
-            for mtr in driver.ex_get_ratecard('0003P')['Meters']:
-                if mtr['MeterStatus'] == 'Active'\
-                        and mtr['MeterCategory'] in [
-                            'Networking',
-                            'Storage',
-                            'Virtual Machines']\
-                        and mtr['MeterSubCategory'].startswith((
-                            'A0 ','A1 ','A2 ','A3 ','A4 ','A5 ','A6 ','A7 ',
-                            'A8 ','A9 ','A10 ','A11 ','BASIC.','Locally ',
-                            'Public ','Standard_','Virtual '))\
-                        and 'Windows' not in mtr['MeterSubCategory']\
-                        and 'Low Priority' not in mtr['MeterSubCategory']:
-
-                    if mtr['MeterCategory'] not in self._rates:
-                        self._rates[mtr['MeterCategory']] = {}
-
-                    if mtr['MeterSubCategory'] not in self._rates\
-                            [mtr['MeterCategory']]:
-                        self._rates[mtr['MeterCategory']]\
-                            [mtr['MeterSubCategory']] = {}
-
-                    if mtr['MeterRegion'] not in self._rates\
-                            [mtr['MeterCategory']][mtr['MeterSubCategory']]:
-                        self._rates[mtr['MeterCategory']]\
-                            [mtr['MeterSubCategory']][mtr['MeterRegion']] = {}
-
-                    self._rates[mtr['MeterCategory']]\
-                        [mtr['MeterSubCategory']][mtr['MeterRegion']]\
-                        [mtr['MeterName']] = mtr['MeterRates']['0']
-
-        return self._rates
+        """Returns the Pay As You Go rate card, which is shared by all requests for the same subscription until it
+        expires. Only one request, in any worker, downloads it at a time."""
+        account = self._get_catalog_driver_account()
+
+        return cache.pricing.get((self._get_id(), account, 'ratecard'),
+                                 lambda: flight.share(('pricing', self._get_id(), account, 'ratecard'),
+                                                      self._load_rates))
+
+    def _load_rates(self):
+        driver = self._get_catalog_driver()
+        rates = {}
+
+        # Pay As You Go pricing
+        for mtr in driver.ex_get_ratecard('0003P')['Meters']:
+            if mtr['MeterStatus'] == 'Active'\
+                    and mtr['MeterCategory'] in [
+                        'Networking',
+                        'Storage',
+                        'Virtual Machines']\
+                    and mtr['MeterSubCategory'].startswith((
+                        'A0 ','A1 ','A2 ','A3 ','A4 ','A5 ','A6 ','A7 ',
+                        'A8 ','A9 ','A10 ','A11 ','BASIC.','Locally ',
+                        'Public ','Standard_','Virtual '))\
+                    and 'Windows' not in mtr['MeterSubCategory']\
+                    and 'Low Priority' not in mtr['MeterSubCategory']:
+
+                rates.setdefault(mtr['MeterCategory'], {})\
+                    .setdefault(mtr['MeterSubCategory'], {})\
+                    .setdefault(mtr['MeterRegion'], {})\
+                    [mtr['MeterName']] = mtr['MeterRates']['0']
+
+        return rates
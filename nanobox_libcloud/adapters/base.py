@@ -1,5 +1,9 @@
+import copy
+import hashlib
+import inspect
+import json
+import logging
 import os
-import redis
 import typing
 from decimal import Decimal
 from time import sleep
@@ -7,19 +11,49 @@ from operator import attrgetter
 
 import libcloud
 from libcloud.compute.base import NodeDriver, NodeLocation, NodeImage, NodeSize, Node
+from libcloud.compute.types import NodeState
 from requests.exceptions import ConnectionError
 
-from nanobox_libcloud.utils import models
+from nanobox_libcloud.utils import breaker, cache, flight, instrument, models, output, store
+
+
+# Adapter hooks timed as phases of each request, for the slow request log
+PHASES = {
+    'do_verify': 'verify',
+    '_create_driver': 'driver',
+    '_get_converter': 'pricing',
+    '_get_hourly_price': 'pricing',
+    '_get_monthly_price': 'pricing',
+    '_get_pricing': 'pricing',
+    '_get_rates': 'pricing',
+}
+
+# Seconds a server creation is remembered under its idempotency key, so retried requests get the same server back, and
+# how long a creation still in progress holds its key, in case it never finishes
+CREATE_RECORD_SECONDS = int(os.getenv('IDEMPOTENCY_TTL', 86400))
+CREATE_PENDING_SECONDS = 600
+
+
+class PartialCatalog(list):
+    """
+    The regions of a catalog whose build failed part of the way through. They are served when there is nothing better,
+    but never cached or shared with other requests.
+    """
 
 
 class AdapterBase(type):
     """
-    Metaclass for Adapter classes registering defined adapters.
+    Metaclass for Adapter classes registering defined adapters, and instrumenting their hooks.
     """
 
     registry = {}
 
     def __new__(mcs, name, bases, attrs):
+        for attr, value in list(attrs.items()):
+            phase = PHASES.get(attr, attr[1:] if attr.startswith('_find_') else None)
+            if phase and inspect.isfunction(value):
+                attrs[attr] = instrument.timed_phase(phase, value)
+
         cls = super(AdapterBase, mcs).__new__(mcs, name, bases, attrs)
 
         if name != 'Adapter':
@@ -50,6 +84,10 @@ class Adapter(object, metaclass=AdapterBase):
     which can be overridden by subclasses for specific drivers.
 
     If subclasses are placed in the same package as this module they will automatically be discovered.
+
+    Each adapter is constructed once per process, so expensive setup (reading credentials from the environment,
+    resolving hostnames, ...) belongs in `__init__`. Requests are then handled by copies made with `for_request`, which
+    only carry fresh per-request state, set up by `_init_request`.
     """
 
     # Adapter metadata
@@ -71,8 +109,17 @@ class Adapter(object, metaclass=AdapterBase):
     auth_instructions = ""  # type: str
 
     generic_credentials = {}  # type: dict
+
+    # Per-request state, (re)set by _init_request
     _generic_driver = None  # type: NodeDriver
     _user_driver = None  # type: NodeDriver
+    _catalog_driver = None  # type: NodeDriver
+    _account = None  # type: str
+    _sizes = None  # type: typing.Dict[str, typing.List[NodeSize]]
+
+    def __init__(self, **kwargs):
+        self._meta = output.Payload(self.do_meta())
+        self._init_request()
 
     # Controller entry points
     def do_meta(self) -> typing.Dict[str, typing.Any]:
@@ -94,54 +141,234 @@ class Adapter(object, metaclass=AdapterBase):
             bootstrap_script=self.server_bootstrap_script,
             bootstrap_timeout=self.server_bootstrap_timeout,
             auth_credential_fields=self.auth_credential_fields,
-            auth_instructions=self.auth_instructions,
+            auth_instructions=self._get_auth_instructions(),
         ).to_nanobox()
 
+    def do_cached_meta(self) -> output.Payload:
+        """Returns the serialized metadata of this adapter, computed once when the process-lifetime adapter was built."""
+        return self._meta
+
     def do_catalog(self, headers) -> typing.List[dict]:
         """Returns the catalog for this adapter."""
-        # Build catalog
-        catalog = []
+        # Uses generic driver in case there are no auth tokens, but we want
+        # to override it with a user driver if the credentials are available
+        account = None
+        if self.do_verify(headers) is True:
+            self._catalog_driver = self._user_driver
+            account = self._account
+
+        return self._build_shared_catalog(account)
 
+    def do_cached_catalog(self, headers) -> typing.Union[output.Payload, Exception]:
+        """Returns the serialized catalog for this adapter, only building it if there is no cached copy."""
+        account, payload = self._find_cached_catalog(headers)
+
+        return payload if payload is not None else self._build_cached_catalog(account)
+
+    def do_streamed_catalog(self, headers) -> typing.Union[output.Payload, typing.Iterator[bytes], Exception]:
+        """Returns the cached catalog for this adapter if there is one, else an iterator over its JSON-encoded regions,
+        each built as it is consumed."""
+        account, payload = self._find_cached_catalog(headers)
+        if payload is not None:
+            return payload
+
+        if flight.in_progress(('catalog', self._get_id(), account)):
+            # Wait for the catalog already being built rather than build it again
+            return self._build_cached_catalog(account)
+
+        regions = self._iter_catalog()
+
+        # Build the first region up front, so failing requests still get a proper error response
         try:
-            # Uses generic driver in case there are no auth tokens, but we want
-            # to override it with a user driver if the credentials are available
+            first = next(regions, None)
+        except (libcloud.common.exceptions.BaseHTTPError, ConnectionError) as err:
+            return self._get_stale_catalog(account) or err
+        except libcloud.common.types.LibcloudError:
+            if os.getenv('APP_NAME', 'dev') == 'dev':
+                raise
+            return iter(())
+
+        return self._stream_catalog(account, first, regions)
+
+    def do_cached_region(self, headers, region_id) -> typing.Union[output.Payload, None, Exception]:
+        """Returns the serialized catalog entry for a single region, or `None` if there is no such region. Only that
+        region is built if neither it nor the full catalog is cached."""
+        account, payload = self._find_cached_catalog(headers, region_id)
+
+        if payload is None:
+            try:
+                result = next((self._build_region(location) for location in self._get_locations()
+                               if self._get_location_id(location) == region_id), None)
+            except (libcloud.common.exceptions.BaseHTTPError, ConnectionError) as err:
+                return self._get_stale_catalog(account, region_id) or err
+            except libcloud.common.types.LibcloudError as err:
+                if os.getenv('APP_NAME', 'dev') == 'dev':
+                    raise
+                return self._get_stale_catalog(account, region_id) or err
+
+            if result is None:
+                return None
+
+            payload = output.Payload(result)
+            cache.catalogs.set((self._get_id(), account, region_id), payload)
+
+        return payload
+
+    def _find_cached_catalog(self, headers, region_id=None) -> typing.Tuple[typing.Optional[str],
+                                                                            typing.Optional[output.Payload]]:
+        """Returns the account a request's catalog is cached under, and the cached catalog (or one region of it) if
+        there is one. Sets up the catalog driver when the catalog will have to be built with the user's credentials."""
+        account = self._get_catalog_account(headers)
+        payload = self._get_cached_catalog(account, region_id)
+
+        if payload is None and breaker.is_open():
+            # Serve the last catalog built rather than wait on a failing provider
+            payload = self._get_stale_catalog(account, region_id) or self._get_stale_catalog(None, region_id)
+            if payload is None:
+                raise breaker.refuse()
+
+        if payload is None and account is not None:
             if self.do_verify(headers) is True:
-                self._generic_driver = self._user_driver
-
-            for location in self._get_locations():
-                catalog.append(models.ServerRegion(
-                    id=self._get_location_id(location),
-                    name=self._get_location_name(location),
-                    plans=[
-                        models.ServerPlan(
-                            id=plan_id,
-                            name=plan_name,
-                            specs=[
-                                models.ServerSpec(
-                                    id=self._get_size_id(location, plan_id, size),
-                                    name=self._get_size_name(location, plan_id, size),
-                                    ram=self._get_ram(location, plan_id, size),
-                                    cpu=self._get_cpu(location, plan_id, size),
-                                    disk=self._get_disk(location, plan_id, size),
-                                    transfer=self._get_transfer(location, plan_id, size),
-                                    dollars_per_hr=self._get_hourly_price(location, plan_id, size),
-                                    dollars_per_mo=self._get_monthly_price(location, plan_id, size)
-                                ) for size in sorted(self._get_sizes(location, plan_id), key=attrgetter('ram', 'disk', 'name'))
-                            ]
-                        ) for plan_id, plan_name in self._get_plans(location)
-                    ]
-                ).to_nanobox())
+                self._catalog_driver = self._user_driver
+            else:
+                # Unverified credentials get the generic catalog
+                account = None
+                payload = self._get_cached_catalog(account, region_id)
+
+        return account, payload
+
+    def _get_cached_catalog(self, account, region_id=None) -> typing.Optional[output.Payload]:
+        """Returns the cached catalog of an account, or a single region of it, which is taken from the full catalog if
+        only that is cached."""
+        if region_id is None:
+            return cache.catalogs.get((self._get_id(), account))
+
+        payload = cache.catalogs.get((self._get_id(), account, region_id))
+
+        if payload is None:
+            catalog = cache.catalogs.get((self._get_id(), account))
+            region = next((region for region in catalog.data if region['id'] == region_id), None) if catalog else None
+
+            if region is not None:
+                payload = output.Payload(region)
+                cache.catalogs.set((self._get_id(), account, region_id), payload)
+
+        return payload
+
+    def _get_stale_catalog(self, account, region_id=None) -> typing.Optional[output.Payload]:
+        """Returns the catalog last built for an account, or one region of it, however old it is."""
+        catalog = cache.catalogs.last((self._get_id(), account))
+
+        if region_id is None:
+            return catalog
+
+        if catalog is None:
+            return cache.catalogs.last((self._get_id(), account, region_id))
+
+        region = next((region for region in catalog.data if region['id'] == region_id), None)
+        return output.Payload(region) if region is not None else None
+
+    def _build_cached_catalog(self, account) -> typing.Union[output.Payload, Exception]:
+        """Builds the catalog for an account and caches it, falling back to the last one built if that fails."""
+        result = self._build_shared_catalog(account)
+        if isinstance(result, PartialCatalog):
+            return self._get_stale_catalog(account) or output.Payload(result)
+        elif not isinstance(result, list):
+            return self._get_stale_catalog(account) or result
+
+        payload = output.Payload(result)
+        self._cache_catalog(account, payload)
+
+        return payload
+
+    def _cache_catalog(self, account, payload):
+        """Caches the built catalog of an account, sharing generic catalogs with the other workers for searches."""
+        cache.catalogs.set((self._get_id(), account), payload)
+
+        if account is None:
+            cache.shared_catalogs.publish(self._get_id(), payload)
+
+    def _build_shared_catalog(self, account) -> typing.Union[typing.List[dict], Exception]:
+        """Builds the catalog for an account, or takes the result of an identical build already in progress, in this
+        process or another worker."""
+        return flight.share(('catalog', self._get_id(), account), self._build_catalog, encode=self._encode_catalog)
+
+    @staticmethod
+    def _encode_catalog(catalog) -> typing.Optional[str]:
+        """Encodes a built catalog for other workers, or returns `None` if the build failed, even part of the way."""
+        return None if isinstance(catalog, PartialCatalog) else flight.encode_json(catalog)
+
+    def _build_catalog(self) -> typing.Union[typing.List[dict], Exception]:
+        """Builds the catalog using the catalog driver. In production, a build which fails part of the way through
+        returns the regions built so far as a `PartialCatalog`."""
+        catalog = []
+
+        try:
+            for region in self._iter_catalog():
+                catalog.append(region)
         except (libcloud.common.exceptions.BaseHTTPError, ConnectionError) as err:
             return err
         except libcloud.common.types.LibcloudError:
-            # TODO: Get cached data...
             if os.getenv('APP_NAME', 'dev') == 'dev':
                 raise
-            else:
-                pass
+
+            return PartialCatalog(catalog)
 
         return catalog
 
+    def _stream_catalog(self, account, first, regions) -> typing.Iterator[bytes]:
+        """Encodes regions as they are built, and caches the complete catalog once the last one is done. Only the
+        encoded regions are kept until then, so at most one region's models are in memory at a time."""
+        chunks = []
+        region = first
+
+        try:
+            while region is not None:
+                chunks.append(output.encode(region))
+                yield chunks[-1]
+                region = next(regions, None)
+        except (libcloud.common.exceptions.BaseHTTPError, ConnectionError) as err:
+            # The response has already started, so end the array with what was sent, but don't cache it
+            logging.getLogger(__name__).warning('catalog stream for %s cut short: %r', self._get_id(), err)
+            return
+        except libcloud.common.types.LibcloudError:
+            # Like _build_catalog, serve what we have in production, but don't cache it
+            if os.getenv('APP_NAME', 'dev') == 'dev':
+                raise
+            return
+
+        self._cache_catalog(account, output.Payload(body=b'[' + b','.join(chunks) + b']'))
+
+    def _iter_catalog(self) -> typing.Iterator[dict]:
+        """Builds the catalog one region at a time."""
+        for location in self._get_locations():
+            yield self._build_region(location)
+
+    def _build_region(self, location) -> dict:
+        """Builds the catalog entry for a single location."""
+        return models.ServerRegion(
+            id=self._get_location_id(location),
+            name=self._get_location_name(location),
+            plans=[
+                models.ServerPlan(
+                    id=plan_id,
+                    name=plan_name,
+                    specs=[
+                        models.ServerSpec(
+                            id=self._get_size_id(location, plan_id, size),
+                            name=self._get_size_name(location, plan_id, size),
+                            ram=self._get_ram(location, plan_id, size),
+                            cpu=self._get_cpu(location, plan_id, size),
+                            disk=self._get_disk(location, plan_id, size),
+                            transfer=self._get_transfer(location, plan_id, size),
+                            dollars_per_hr=self._get_hourly_price(location, plan_id, size),
+                            dollars_per_mo=self._get_monthly_price(location, plan_id, size)
+                        ) for size in sorted(self._get_sizes(location, plan_id), key=attrgetter('ram', 'disk', 'name'))
+                    ]
+                ) for plan_id, plan_name in self._get_plans(location)
+            ]
+        ).to_nanobox()
+
     def do_verify(self, headers) -> bool:
         """Verify the account credentials."""
         try:
@@ -163,10 +390,8 @@ class Adapter(object, metaclass=AdapterBase):
 
             result = None
             for tries in range(5):
-                for key in driver.list_key_pairs():
-                    if (key.pub_key if hasattr(key, 'pub_key') else key.public_key) == data['key']:
-                        result = key
-                        break
+                result = cache.ssh_keys.find(self._account, lambda: self._find_usable_ssh_keys(driver),
+                                             public_key=data['key'], refresh=True)
                 if result:
                     break
                 sleep(1)
@@ -184,8 +409,11 @@ class Adapter(object, metaclass=AdapterBase):
             return {"error": "This provider doesn't support key storage", "status": 501}
 
         try:
-            driver = self._get_user_driver(**self._get_request_credentials(headers))
-            key = self._find_ssh_key(driver, id)
+            if breaker.is_open():
+                key = self._get_stale_ssh_key(headers, id)
+            else:
+                driver = self._get_user_driver(**self._get_request_credentials(headers))
+                key = self._find_ssh_key(driver, id)
         except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError) as err:
             return {"error": err.value if hasattr(err, 'value') else err.message, "status": err.code if hasattr(err, 'message') else 500}
         else:
@@ -212,6 +440,8 @@ class Adapter(object, metaclass=AdapterBase):
 
             if not self._delete_key(driver, key):
                 return {"error": "Problem deleting key", "status": 500}
+
+            cache.ssh_keys.discard(self._account, key)
         except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError) as err:
             return {"error": err.value if hasattr(err, 'value') else err.message, "status": err.code if hasattr(err, 'message') else 500}
         else:
@@ -245,8 +475,62 @@ class Adapter(object, metaclass=AdapterBase):
             self._cache_server(self._get_node_id(result))
             return {"data": {"id": self._get_node_id(result)}, "status": 201}
 
+    def do_server_create_once(self, headers, data) -> typing.Dict[str, typing.Any]:
+        """Create a server with a certain provider, unless the same creation was requested before: by `Idempotency-Key`
+        header or, without one, by server name. Retried requests then get the first request's server back."""
+        key = self._get_create_key(headers, data)
+        if key is None:
+            return self.do_server_create(headers, data)
+
+        # Claimed again if the key expires between the two lookups, or its server no longer exists, a few times at most
+        client = store.client()
+        for _ in range(3):
+            with instrument.phase('redis'):
+                claimed = client.set(key, 'pending', ex=CREATE_PENDING_SECONDS, nx=True)
+                existing = None if claimed else client.get(key)
+
+            if claimed:
+                break
+            elif existing == 'pending':
+                return {"error": "This " + self.server_nick_name + " is already being created. Please try again shortly.",
+                        "status": 409}
+            elif existing and self._server_exists(headers, existing):
+                return {"data": {"id": existing}, "status": 201}
+            elif existing:
+                # The server was destroyed without being cancelled here, so a new one is created in its place
+                self._forget_create(existing, key)
+        else:
+            return {"error": "This " + self.server_nick_name + " is already being created. Please try again shortly.",
+                    "status": 409}
+
+        creates = self._count_creates()
+
+        try:
+            result = self.do_server_create(headers, data)
+        except Exception:
+            # The provider wasn't asked to create anything, as when the body is malformed or the breaker is open, so the
+            # creation can safely be tried again. Otherwise the key is held until it expires, as the server may have been
+            # created regardless
+            if creates is not None and self._count_creates() == creates:
+                with instrument.phase('redis'):
+                    client.delete(key)
+            raise
+
+        with instrument.phase('redis'):
+            if 'error' not in result:
+                client.setex(key, CREATE_RECORD_SECONDS, result['data']['id'])
+                client.setex('%s:server:%s:create' % (self.id, result['data']['id']), CREATE_RECORD_SECONDS, key)
+            elif (creates is not None and self._count_creates() == creates) or self._is_rejection(result['status']):
+                # Likewise held unless nothing was asked of the provider, or it turned the server down
+                client.delete(key)
+
+        return result
+
     def do_server_query(self, headers, id) -> typing.Dict[str, typing.Any]:
         """Query a server with a certain provider."""
+        if breaker.is_open():
+            return self._get_stale_server(headers, id)
+
         try:
             driver = self._get_user_driver(**self._get_request_credentials(headers))
             server = self._find_server(driver, id)
@@ -256,13 +540,16 @@ class Adapter(object, metaclass=AdapterBase):
             if not server:
                 return {"error": self.server_nick_name + " not found", "status": 404}
 
-            return {"data": models.ServerInfo(
+            result = {"data": models.ServerInfo(
                 id=self._get_node_id(server),
                 status=server.state,
                 name=server.name,
                 external_ip=self._get_ext_ip(server),
                 internal_ip=self._get_int_ip(server)
             ).to_nanobox(), "status": 201}
+            cache.servers.set(self._get_server_cache_key(headers, id), result)
+
+            return result
 
     def do_server_cancel(self, headers, id) -> typing.Union[bool, typing.Dict[str, typing.Any]]:
         """Cancel a server with a certain provider."""
@@ -277,8 +564,26 @@ class Adapter(object, metaclass=AdapterBase):
         except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError) as err:
             return {"error": err.value if hasattr(err, 'value') else err.message, "status": err.code if hasattr(err, 'message') else 500}
         else:
+            cache.servers.pop(self._get_server_cache_key(headers, id))
+            self._forget_create(id)
             return True
 
+    # Request state
+    def for_request(self) -> 'Adapter':
+        """Returns a cheap copy of this process-lifetime adapter, with fresh per-request state."""
+        adapter = copy.copy(self)
+        adapter._init_request()
+
+        return adapter
+
+    def _init_request(self):
+        """Resets the state this adapter only keeps for the duration of a single request."""
+        self._generic_driver = None
+        self._user_driver = None
+        self._catalog_driver = None
+        self._account = None
+        self._sizes = {}
+
     # Provider retrieval
     def _get_driver_class(self) -> typing.Type[NodeDriver]:
         """Returns the libcloud driver class for the id of this adapter."""
@@ -290,19 +595,66 @@ class Adapter(object, metaclass=AdapterBase):
         raise NotImplementedError()
 
     def _get_user_driver(self, **auth_credentials) -> NodeDriver:
-        """Returns a driver instance for a user with the appropriate authentication credentials set."""
+        """Returns a driver instance for a user with the appropriate authentication credentials set. The credentials are
+        only checked with the provider when the driver is first created, not every time it is reused by the request."""
         if self._user_driver is None:
-            self._user_driver = self._get_driver_class()(**auth_credentials)
+            self._account = cache.account_id(self._get_id(), auth_credentials)
+            instrument.tag_account(self._account)
+            driver = self._create_driver(**auth_credentials)
+            self._check_user_driver(driver)
+            self._user_driver = driver
 
         return self._user_driver
 
+    def _check_user_driver(self, driver):
+        """Makes a cheap provider call with a newly created user driver, raising if its credentials are rejected. Most
+        drivers don't talk to the provider until they are used, so this is what actually verifies credentials. It is
+        only called once per request, when the user driver is created, so overrides should make the cheapest call which
+        needs valid credentials, preferably one the request is likely to make anyway. By default nothing is checked."""
+        pass
+
     def _get_generic_driver(self) -> NodeDriver:
         """Returns a driver instance for an anonymous user."""
         if self._generic_driver is None:
-            self._generic_driver = self._get_driver_class()(**self.generic_credentials)
+            self._generic_driver = self._create_driver(**self.generic_credentials)
 
         return self._generic_driver
 
+    def _create_driver(self, **credentials) -> NodeDriver:
+        """Creates a driver instance, instrumented so every call made through it is timed and counted. Requests whose
+        provider's circuit breaker is open are refused here, rather than left to wait on the provider."""
+        if breaker.is_open():
+            raise breaker.refuse()
+
+        return instrument.DriverProxy(self._get_driver_class()(**credentials), self._get_id(),
+                                      self._get_rate_limit_account(credentials))
+
+    def _get_rate_limit_account(self, credentials) -> str:
+        """Returns the account the provider's rate limits apply to for a set of driver credentials."""
+        return cache.account_id(self._get_id(), credentials)
+
+    def _get_catalog_driver(self) -> NodeDriver:
+        """Returns the driver catalog data is retrieved with: the user's if they are authenticated, else the generic one."""
+        if self._catalog_driver is not None:
+            return self._catalog_driver
+
+        return self._get_generic_driver()
+
+    def _get_catalog_driver_account(self) -> typing.Optional[str]:
+        """Returns the account the catalog driver belongs to, or `None` for the generic one, so data retrieved with it
+        is only shared with requests for the same account."""
+        return self._account if self._catalog_driver is not None else None
+
+    def _get_catalog_account(self, headers) -> typing.Optional[str]:
+        """Returns the account the catalog for a request is cached under, or `None` if no credentials were sent."""
+        if not any(headers.get('Auth-' + field[0]) for field in self.auth_credential_fields):
+            return None
+
+        account = cache.account_id(self._get_id(), self._get_request_credentials(headers))
+        instrument.tag_account(account)
+
+        return account
+
     @classmethod
     def _get_id(cls) -> str:
         """"Returns the id of this adapter."""
@@ -327,6 +679,10 @@ class Adapter(object, metaclass=AdapterBase):
         """Returns the id of the default plan for this adapter."""
         raise NotImplementedError()
 
+    def _get_auth_instructions(self) -> str:
+        """Returns the instructions shown to users entering their credentials."""
+        return self.auth_instructions
+
     @classmethod
     def can_install_key(cls) -> bool:
         """Returns whether this adapter allows servers to install keys."""
@@ -345,7 +701,7 @@ class Adapter(object, metaclass=AdapterBase):
     # Internal (overridable) methods for /catalog
     def _get_locations(self) -> typing.List[NodeLocation]:
         """Retrieves a list of datacenter locations."""
-        return self._get_generic_driver().list_locations()
+        return self._get_catalog_driver().list_locations()
 
     def _get_plans(self, location) -> typing.List[typing.Tuple[str, str]]:
         """Retrieves a list of plans."""
@@ -353,7 +709,7 @@ class Adapter(object, metaclass=AdapterBase):
 
     def _get_sizes(self, location, plan) -> typing.List[NodeSize]:
         """Retrieves a list of sizes."""
-        return self._get_generic_driver().list_sizes(location)
+        return self._get_catalog_driver().list_sizes(location)
 
     def _get_location_id(self, location) -> str:
         """Translates a location ID for a given adapter to a ServerSpec value."""
@@ -445,12 +801,8 @@ class Adapter(object, metaclass=AdapterBase):
                 return image
 
     def _find_ssh_key(self, driver, id, public_key=None) -> typing.Optional[object]:
-        for ssh_key in self._find_usable_ssh_keys(driver):
-            if ssh_key.name == id or \
-               (public_key is not None and (
-                    ssh_key.pub_key if hasattr(ssh_key, 'pub_key')
-                    else ssh_key.public_key) == public_key):
-                return ssh_key
+        return cache.ssh_keys.find(self._account, lambda: self._find_usable_ssh_keys(driver),
+                                   name=id, public_key=public_key)
 
     def _find_usable_ssh_keys(self, driver) -> typing.Optional[typing.List[object]]:
         return driver.list_key_pairs()
@@ -465,8 +817,8 @@ class Adapter(object, metaclass=AdapterBase):
         except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError, AttributeError) as e:
             err = e
 
-        r = redis.StrictRedis(host=os.getenv('DATA_REDIS_HOST'))
-        status = r.get('%s:server:%s:status' % (self.id, id))
+        with instrument.phase('redis'):
+            status = store.client().get('%s:server:%s:status' % (self.id, id))
 
         if status:
             return Node(
@@ -482,11 +834,121 @@ class Adapter(object, metaclass=AdapterBase):
             raise err
 
     def _find_usable_servers(self, driver) -> typing.Optional[typing.List[Node]]:
-        return driver.list_nodes()
+        return self._list_nodes(driver)
+
+    def _list_nodes(self, driver, *args) -> typing.List[Node]:
+        """Lists the servers of the request's account, sharing one listing between identical concurrent requests, in
+        this process or another worker. Servers listed by another request are copied and bound to this one's driver."""
+        if self._account is None:
+            return driver.list_nodes(*args)
+
+        nodes = flight.share(('nodes', self._get_id(), self._account) + args, lambda: driver.list_nodes(*args),
+                             encode=self._encode_nodes, decode=lambda result: self._decode_nodes(driver, result))
+
+        return [node if node.driver is driver else self._rebind_node(node, driver) for node in nodes]
+
+    @staticmethod
+    def _encode_nodes(nodes) -> typing.Optional[str]:
+        """Encodes a server listing for other workers, or returns `None` if the servers carry more than plain data."""
+        return flight.encode_json([[node.id, node.name, getattr(node.state, 'value', node.state),
+                                    node.public_ips, node.private_ips, node.extra] for node in nodes])
+
+    @staticmethod
+    def _decode_nodes(driver, result) -> typing.List[Node]:
+        nodes = []
+
+        for id, name, state, public_ips, private_ips, extra in json.loads(result):
+            try:
+                state = NodeState(state)
+            except ValueError:
+                pass
+
+            nodes.append(Node(id=id, name=name, state=state, public_ips=public_ips, private_ips=private_ips,
+                              driver=driver, extra=extra))
+
+        return nodes
+
+    @staticmethod
+    def _rebind_node(node, driver) -> Node:
+        node = copy.copy(node)
+        node.driver = driver
+
+        return node
 
     def _cache_server(self, server_id):
-        r = redis.StrictRedis(host=os.getenv('DATA_REDIS_HOST'))
-        r.setex('%s:server:%s:status' % (self.id, server_id), 360, 'ordering')
+        with instrument.phase('redis'):
+            store.client().setex('%s:server:%s:status' % (self.id, server_id), 360, 'ordering')
+
+    def _get_create_key(self, headers, data) -> typing.Optional[str]:
+        """Returns the Redis key a server creation is recorded under, from its idempotency key or else its server name,
+        scoped to the account. Returns `None` if the request has neither."""
+        key = headers.get('Idempotency-Key') or (data.get('name') if isinstance(data, dict) else None)
+        if not key:
+            return None
+
+        return '%s:create:%s:%s' % (self.id, cache.account_id(self._get_id(), self._get_request_credentials(headers)),
+                                    hashlib.sha256(str(key).encode('utf-8')).hexdigest())
+
+    @staticmethod
+    def _count_creates() -> typing.Optional[int]:
+        """Returns how many provider calls creating something, such as servers, volumes or storage services, the current
+        request has made, or `None` outside of requests."""
+        account = instrument.accounting()
+        if account is None:
+            return None
+
+        return sum(calls for name, (calls, _) in account.methods.items() if 'create' in name)
+
+    def _forget_create(self, server_id, key=None):
+        """Drops the record of a server's creation once it is cancelled, so a new server may be created in its place.
+        With the key it was recorded under, the record is only dropped if it still names that server."""
+        with instrument.phase('redis'):
+            client = store.client()
+
+            if key is None:
+                key = client.get('%s:server:%s:create' % (self.id, server_id))
+            elif client.get(key) != server_id:
+                key = None
+
+            if key:
+                client.delete(key, '%s:server:%s:create' % (self.id, server_id))
+
+    def _server_exists(self, headers, server_id) -> bool:
+        """Returns whether a server created earlier still exists. While that can't be told, it is assumed to."""
+        if breaker.is_open():
+            return True
+
+        try:
+            driver = self._get_user_driver(**self._get_request_credentials(headers))
+            return self._find_server(driver, server_id) is not None
+        except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError):
+            return True
+
+    @staticmethod
+    def _is_rejection(status) -> bool:
+        """Returns whether an error status means the provider turned a request down, rather than failed to answer it."""
+        return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+    def _get_server_cache_key(self, headers, server_id) -> typing.Tuple[str, str, str]:
+        """Returns the key the last queried state of a server is cached under, which only the same credentials match."""
+        return self._get_id(), cache.account_id(self._get_id(), self._get_request_credentials(headers)), server_id
+
+    def _get_stale_server(self, headers, id) -> typing.Dict[str, typing.Any]:
+        """Returns the last result of querying a server with the same credentials, for when the provider can't be
+        asked."""
+        result = cache.servers.get(self._get_server_cache_key(headers, id))
+        if result is None:
+            raise breaker.refuse()
+
+        return result
+
+    def _get_stale_ssh_key(self, headers, id) -> object:
+        """Returns an SSH key from the account's key index however old it is, for when the provider can't be asked."""
+        key = cache.ssh_keys.last(cache.account_id(self._get_id(), self._get_request_credentials(headers)), name=id)
+        if key is None:
+            raise breaker.refuse()
+
+        return key
 
     @classmethod
     def _config_error(cls, msg, **kwargs):
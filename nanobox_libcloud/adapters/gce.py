@@ -47,7 +47,6 @@ class Gce(RebootMixin, Adapter):
         ('highcpu-ssd', 'High CPU with SSD'),
         ('highmem-ssd', 'High Memory with SSD')
     ]
-    _sizes = {}
     _image_family = 'ubuntu-1604-lts'
 
     def __init__(self, **kwargs):
@@ -63,6 +62,8 @@ class Gce(RebootMixin, Adapter):
             'ssd': Decimal(os.getenv('GCE_MONTHLY_SSD_COST', 0)) / 30 / 24
         }
 
+        super().__init__(**kwargs)
+
     # Internal overrides for provider retrieval
     def _get_request_credentials(self, headers):
         """Extracts credentials from request headers."""
@@ -112,7 +113,7 @@ class Gce(RebootMixin, Adapter):
             'highmem-ssd': [],
         }
 
-        for size in self._get_generic_driver().list_sizes(location):
+        for size in self._get_catalog_driver().list_sizes(location):
             plan = size.name.split('-')[1]
 
             if plan in ['micro', 'small']:
@@ -5,6 +5,7 @@ from decimal import Decimal
 
 import libcloud
 from nanobox_libcloud.adapters import Adapter
+from nanobox_libcloud.utils import cache, flight
 
 
 class Ovh(Adapter):
@@ -46,8 +47,6 @@ class Ovh(Adapter):
         ('ram', 'RAM'),
         ('gpu', 'GPU'),
     ]
-    _sizes = {}
-    _pricing = {}
 
     def __init__(self, **kwargs):
         self.generic_credentials = {
@@ -58,6 +57,8 @@ class Ovh(Adapter):
             'ex_datacenter': os.getenv('OVH_APP_REGION', '')
         }
 
+        super().__init__(**kwargs)
+
         # try:
         #     ip = socket.gethostbyname(os.getenv('APP_NAME', '') + '.nanoapp.io') or None
         # except socket.gaierror:
@@ -81,15 +82,9 @@ class Ovh(Adapter):
             "ex_datacenter": headers.get("Auth-App-Region", '')
         }
 
-    def _get_user_driver(self, **auth_credentials):
-        """Returns a driver instance for a user with the appropriate authentication credentials set."""
-
-        driver = super()._get_user_driver(**auth_credentials)
-
+    def _check_user_driver(self, driver):
         driver.list_key_pairs()
 
-        return driver
-
     @classmethod
     def _get_id(cls):
         return 'ovh'
@@ -122,7 +117,7 @@ class Ovh(Adapter):
             'gpu': [],
         }
 
-        for size in self._get_generic_driver().list_sizes(location):
+        for size in self._get_catalog_driver().list_sizes(location):
             plan = size.extra['type'].split('.')[-1]
 
             if 'win' in size.name\
@@ -155,18 +150,12 @@ class Ovh(Adapter):
     def _get_hourly_price(self, location, plan, size):
         """Translates an hourly cost value for a given adapter to a ServerSpec value."""
 
-        if size.id not in self._pricing:
-            self._pricing[size.id] = self._get_generic_driver()\
-                .ex_get_pricing(size.id)
-        return float(self._pricing[size.id]['hourly']) or None
+        return float(self._get_pricing(size)['hourly']) or None
 
     def _get_monthly_price(self, location, plan, size):
         """Translates a monthly cost value for a given adapter to a ServerSpec value."""
 
-        if size.id not in self._pricing:
-            self._pricing[size.id] = self._get_generic_driver()\
-                .ex_get_pricing(size.id)
-        return float(self._pricing[size.id]['monthly']) or None
+        return float(self._get_pricing(size)['monthly']) or None
 
     # Internal overrides for /server endpoints
     def _get_create_args(self, data):
@@ -179,13 +168,9 @@ class Ovh(Adapter):
         image = self._find_image(driver, location, 'Ubuntu 16.04')
 
         keyname = '-'.join(data['name'].split('-')[:-1])
-        try:
-            driver.get_key_pair(keyname, location)
-        except Exception as e:
-            if 'No key named' in str(e):
-                driver.import_key_pair_from_string(keyname, data['ssh_key'], location)
-            else:
-                raise
+        if self._find_ssh_key(driver, keyname, location=location) is None:
+            key = driver.import_key_pair_from_string(keyname, data['ssh_key'], location)
+            cache.ssh_keys.add(self._get_key_scope(location), key)
 
         return {
             "name": data['name'],
@@ -209,3 +194,30 @@ class Ovh(Adapter):
         for image in driver.list_images(location):
             if image.name == id:
                 return image
+
+    def _find_ssh_key(self, driver, id, public_key=None, location=None):
+        return cache.ssh_keys.find(self._get_key_scope(location), lambda: driver.list_key_pairs(location),
+                                   name=id, public_key=public_key)
+
+    def _find_server(self, driver, id):
+        try:
+            return driver.ex_get_node(id)
+        except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError):
+            return super()._find_server(driver, id)
+
+    # Misc internal helpers (adapter-specific)
+    def _get_pricing(self, size):
+        """Returns the pricing of a size, which is shared by all requests for the same account until it expires. Only
+        one request, in any worker, loads it at a time."""
+        account = self._get_catalog_driver_account()
+
+        return cache.pricing.get((self._get_id(), account, size.id),
+                                 lambda: flight.share(('pricing', self._get_id(), account, size.id),
+                                                      lambda: self._get_catalog_driver().ex_get_pricing(size.id)))
+
+    def _get_key_scope(self, location):
+        """Returns the key index scope for an account's keys in a region, since OVH keys are regional."""
+        if self._account is None:
+            return None
+
+        return '%s:%s' % (self._account, location.id if location is not None else '')
@@ -35,7 +35,7 @@ class Packet(RebootMixin, Adapter):
     _plans = [
         ('baremetal', 'Bare Metal')
     ]
-    project_id = None
+    project_id = None  # type: str
 
     def __init__(self, **kwargs):
         self.generic_credentials = {
@@ -43,6 +43,13 @@ class Packet(RebootMixin, Adapter):
             'secret': None
         }
 
+        super().__init__(**kwargs)
+
+    def _init_request(self):
+        """Resets the state this adapter only keeps for the duration of a single request."""
+        super()._init_request()
+        self.project_id = None
+
     # Internal overrides for provider retrieval
     def _get_request_credentials(self, headers):
         """Extracts credentials from request headers."""
@@ -54,15 +61,9 @@ class Packet(RebootMixin, Adapter):
             "secret": None
         }
 
-    def _get_user_driver(self, **auth_credentials):
-        """Returns a driver instance for a user with the appropriate authentication credentials set."""
-
-        driver = super()._get_user_driver(**auth_credentials)
-
+    def _check_user_driver(self, driver):
         driver.list_key_pairs()
 
-        return driver
-
     @classmethod
     def _get_id(cls):
         return 'packet'
@@ -92,7 +93,7 @@ class Packet(RebootMixin, Adapter):
     def _get_sizes(self, location, plan):
         """Retrieves a list of sizes for a given adapter."""
 
-        return self._get_generic_driver().list_sizes()
+        return self._get_catalog_driver().list_sizes()
 
     def _get_cpu(self, location, plan, size):
         """Translates a CPU count value for a given adapter to a ServerSpec value."""
@@ -127,6 +128,6 @@ class Packet(RebootMixin, Adapter):
                 return size
 
     def _find_server(self, driver, id):
-        for server in driver.list_nodes(self.project_id):
+        for server in self._list_nodes(driver, self.project_id):
             if server.id == id:
                 return server
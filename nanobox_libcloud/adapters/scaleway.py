@@ -9,6 +9,7 @@ from flask import request
 import libcloud
 from nanobox_libcloud.adapters import Adapter
 from nanobox_libcloud.adapters.base import RebootMixin
+from nanobox_libcloud.utils import breaker, cache, flight
 
 
 class Scaleway(RebootMixin, Adapter):
@@ -42,7 +43,6 @@ class Scaleway(RebootMixin, Adapter):
         ('Pro', 'Pro'),
         ('Deprecated', 'Deprecated\n(UPGRADE TO NEW\n"Start"\nSIZE ASAP)'),
     ]
-    _sizes = {}
 
     def __init__(self, **kwargs):
         self.generic_credentials = {
@@ -50,6 +50,8 @@ class Scaleway(RebootMixin, Adapter):
             'secret': os.getenv('SCALEWAY_API_TOKEN', ''),
         }
 
+        super().__init__(**kwargs)
+
     # Internal overrides for provider retrieval
     def _get_request_credentials(self, headers):
         """Extracts credentials from request headers."""
@@ -59,15 +61,9 @@ class Scaleway(RebootMixin, Adapter):
             "secret": headers.get("Auth-Api-Token", ''),
         }
 
-    def _get_user_driver(self, **auth_credentials):
-        """Returns a driver instance for a user with the appropriate authentication credentials set."""
-
-        driver = super()._get_user_driver(**auth_credentials)
-
+    def _check_user_driver(self, driver):
         driver.list_nodes()
 
-        return driver
-
     @classmethod
     def _get_id(cls):
         return 'scaleway'
@@ -95,7 +91,7 @@ class Scaleway(RebootMixin, Adapter):
         # self._plans = []
         self._sizes = {}
 
-        for size in self._get_generic_driver().list_sizes():
+        for size in self._get_catalog_driver().list_sizes():
             if size.id.upper().startswith('START'):
                 plan = 'Start'
             elif size.id.upper().startswith('VC'):
@@ -129,14 +125,12 @@ class Scaleway(RebootMixin, Adapter):
     def _get_hourly_price(self, location, plan, size):
         """Translates an hourly cost value for a given adapter to a ServerSpec value."""
 
-        c = CurrencyConverter('http://www.ecb.europa.eu/stats/eurofxref/eurofxref.zip')
-        return c.convert(float(size.price or 0), 'EUR', 'USD') or None
+        return self._get_converter().convert(float(size.price or 0), 'EUR', 'USD') or None
 
     def _get_monthly_price(self, location, plan, size):
         """Translates a monthly cost value for a given adapter to a ServerSpec value."""
 
-        c = CurrencyConverter('http://www.ecb.europa.eu/stats/eurofxref/eurofxref.zip')
-        return c.convert(float(size.extra.get('monthly', 0) or 0), 'EUR', 'USD') or None
+        return self._get_converter().convert(float(size.extra.get('monthly', 0) or 0), 'EUR', 'USD') or None
 
     # Internal overrides for /key endpoints
     def _create_key(self, driver, key):
@@ -186,7 +180,7 @@ class Scaleway(RebootMixin, Adapter):
 
     def _find_server(self, driver, id):
         (region, id) = id.split('::', 2)
-        for server in driver.list_nodes(region):
+        for server in self._list_nodes(driver, region):
             if server.id == id:
                 return server
 
@@ -194,3 +188,15 @@ class Scaleway(RebootMixin, Adapter):
 
     def _find_usable_servers(self, driver):
         return []
+
+    # Misc internal helpers (adapter-specific)
+    def _get_converter(self):
+        """Returns the EUR to USD converter, whose rates are downloaded from the ECB once per pricing cache TTL rather
+        than for every price. Concurrent requests in a worker share one download."""
+        return cache.pricing.get((self._get_id(), 'eurofxref'),
+                                 lambda: flight.share(('pricing', self._get_id(), 'eurofxref'), self._load_converter,
+                                                      encode=None))
+
+    def _load_converter(self):
+        with breaker.watch():
+            return CurrencyConverter('http://www.ecb.europa.eu/stats/eurofxref/eurofxref.zip')
@@ -3,7 +3,7 @@ import socket
 from urllib import parse
 from decimal import Decimal
 
-from flask import request
+from flask import has_request_context, request
 
 import libcloud
 from nanobox_libcloud.adapters import Adapter
@@ -40,27 +40,13 @@ class Vultr(RebootMixin, Adapter):
         ('SSD', 'Standard SSD'),
         ('DEDICATED', 'Dedicated Server')
     ]
-    _sizes = {}
 
     def __init__(self, **kwargs):
         self.generic_credentials = {
             'key': os.getenv('VULTR_API_KEY', '')
         }
 
-        for host in [request.host, os.getenv('APP_NAME', '') + '.nanoapp.io']:
-            try:
-                ip = socket.gethostbyname(host) or None
-            except socket.gaierror:
-                ip = None
-
-            if ip:
-                break
-
-        self.auth_instructions += (' (If you need to be more specific about '
-            'the access controls, you can use %s/32, but keep in mind that '
-            'this address may change at any point in the future, and you will '
-            'need to update your Vultr account accordingly to continue '
-            'deploying.)') % (ip) if ip else ''
+        super().__init__(**kwargs)
 
     # Internal overrides for provider retrieval
     def _get_request_credentials(self, headers):
@@ -70,15 +56,9 @@ class Vultr(RebootMixin, Adapter):
             "key": headers.get("Auth-Api-Key", '')
         }
 
-    def _get_user_driver(self, **auth_credentials):
-        """Returns a driver instance for a user with the appropriate authentication credentials set."""
-
-        driver = super()._get_user_driver(**auth_credentials)
-
+    def _check_user_driver(self, driver):
         driver.list_key_pairs()
 
-        return driver
-
     @classmethod
     def _get_id(cls):
         return 'vultr'
@@ -99,6 +79,17 @@ class Vultr(RebootMixin, Adapter):
 
         return 'SSD'
 
+    def _get_auth_instructions(self):
+        """Gets the credential instructions, including the IP to allow if known."""
+
+        ip = self._resolve_egress_ip()
+
+        return self.auth_instructions + ((' (If you need to be more specific about '
+            'the access controls, you can use %s/32, but keep in mind that '
+            'this address may change at any point in the future, and you will '
+            'need to update your Vultr account accordingly to continue '
+            'deploying.)') % (ip) if ip else '')
+
     # Internal overrides for /catalog
     def _get_plans(self, location):
         """Retrieves a list of plans for a given adapter."""
@@ -106,7 +97,7 @@ class Vultr(RebootMixin, Adapter):
         # self._plans = []
         self._sizes = {}
 
-        for size in self._get_generic_driver().list_sizes():
+        for size in self._get_catalog_driver().list_sizes():
             plan = size.extra['plan_type']
 
             if plan in ['SATA']:
@@ -168,3 +159,17 @@ class Vultr(RebootMixin, Adapter):
     def _get_int_ip(self, server):
         """Returns the internal IP of a server for this adapter."""
         return self._get_ext_ip(server)
+
+    # Misc internal helpers (adapter-specific)
+    def _resolve_egress_ip(self):
+        """Looks up the IP address Vultr will see requests come from. Only done once, as /meta is precomputed."""
+        hosts = [request.host] if has_request_context() else []
+
+        for host in hosts + [os.getenv('APP_NAME', '') + '.nanoapp.io']:
+            try:
+                ip = socket.gethostbyname(host) or None
+            except socket.gaierror:
+                ip = None
+
+            if ip:
+                return ip
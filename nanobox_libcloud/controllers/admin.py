@@ -0,0 +1,21 @@
+import hmac
+import os
+from flask import request
+from nanobox_libcloud import app
+from nanobox_libcloud.utils import output, sampler
+
+
+# Admin endpoints, which are only available when an ADMIN_TOKEN is set, and only to requests sending it
+def authorized() -> bool:
+    token = os.getenv('ADMIN_TOKEN')
+
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+
+@app.route('/admin/stacks', methods=['GET'])
+def admin_stacks():
+    """Provides the stacks sampled across all processes, as a collapsed-stack file for flame graph tools."""
+    if not authorized():
+        return output.failure("Not found.", 404)
+
+    return sampler.collect(), 200, [("Content-Type", "text/plain; charset=utf-8")]
@@ -0,0 +1,17 @@
+from nanobox_libcloud import app
+from nanobox_libcloud.utils import breaker, output
+
+
+# Requests refused because their provider's circuit breaker is open, see utils/breaker.py
+@app.errorhandler(breaker.CircuitOpen)
+def circuit_open(err):
+    """Fails fast with a 503, telling the client when the provider will next be tried."""
+    body, status, headers = output.failure(str(err), 503)
+
+    return body, status, headers + [("Retry-After", str(err.retry_after))]
+
+
+@app.teardown_request
+def end_trial(exc=None):
+    """Lets the next request try a recovering provider, if this one was the trial but never settled how it's doing."""
+    breaker.finish()
@@ -1,15 +1,14 @@
 from flask import render_template, request
 from nanobox_libcloud import app
-from nanobox_libcloud.adapters import get_adapter
-from nanobox_libcloud.adapters.base import AdapterBase
-from nanobox_libcloud.utils import output
+from nanobox_libcloud.adapters import adapter_ids, get_adapter
+from nanobox_libcloud.utils import index, output
 
 
 # Overview and usage endpoints, to explain how this meta-adapter works
 @app.route('/', methods=['GET'])
 def overview():
     """Provides an overview of the libcloud meta-adapter, and how to use it, in the most general sense."""
-    adapters = sorted(AdapterBase.registry.keys())
+    adapters = adapter_ids()
 
     return render_template("overview.html", adapters=adapters)
 
@@ -17,7 +16,7 @@ def overview():
 @app.route('/docs', methods=['GET'])
 def docs():
     """Loads Swagger UI with all the supported adapters' OpenAPI Spec Files pre-loaded into the Topbar for exploration."""
-    adapters = sorted(AdapterBase.registry.keys())
+    adapters = adapter_ids()
 
     return render_template("docs.html", adapters=adapters)
 
@@ -48,7 +47,7 @@ def meta(adapter_id):
     if not adapter:
         return output.failure("That adapter doesn't (yet) exist. Please check the adapter name and try again.", 501)
 
-    return output.success(adapter.do_meta())
+    return output.cached(adapter.do_cached_meta())
 
 
 @app.route('/<adapter_id>/catalog', methods=['GET'])
@@ -59,11 +58,46 @@ def catalog(adapter_id):
     if not adapter:
         return output.failure("That adapter doesn't (yet) exist. Please check the adapter name and try again.", 501)
 
-    result = adapter.do_catalog(request.headers)
-    if not isinstance(result, list):
+    if index.wants_query(request.args):
+        try:
+            query = index.parse_query(request.args)
+        except ValueError as err:
+            return output.failure(str(err), 400)
+
+        result = adapter.do_cached_catalog(request.headers)
+        if isinstance(result, output.Payload):
+            result = output.Payload(index.get_index(result).query(**query))
+    elif output.wants_stream():
+        result = adapter.do_streamed_catalog(request.headers)
+    else:
+        result = adapter.do_cached_catalog(request.headers)
+
+    if isinstance(result, Exception):
         return output.failure('%d: %s' % (result.code, result.message) if hasattr(result, 'code') and hasattr(result, 'message') else repr(result), 500)
 
-    return output.success(result)
+    if not isinstance(result, output.Payload):
+        return output.streamed(result)
+
+    return output.cached(result)
+
+
+@app.route('/<adapter_id>/catalog/<region_id>', methods=['GET'])
+def catalog_region(adapter_id, region_id):
+    """Provides the catalog data for a single region of a certain adapter."""
+    adapter = get_adapter(adapter_id)
+
+    if not adapter:
+        return output.failure("That adapter doesn't (yet) exist. Please check the adapter name and try again.", 501)
+
+    result = adapter.do_cached_region(request.headers, region_id)
+
+    if result is None:
+        return output.failure("That region doesn't exist. Please check the region ID and try again.", 404)
+
+    if isinstance(result, Exception):
+        return output.failure('%d: %s' % (result.code, result.message) if hasattr(result, 'code') and hasattr(result, 'message') else repr(result), 500)
+
+    return output.cached(result)
 
 
 @app.route('/<adapter_id>/verify', methods=['POST'])
@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+import time
+from flask import g, request
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters import adapter_ids
+from nanobox_libcloud.utils import instrument
+
+
+# Requests taking at least this many seconds are logged with a breakdown of where the time went
+SLOW_REQUEST_SECONDS = float(os.getenv('SLOW_REQUEST_SECONDS', 5))
+
+
+# Request instrumentation, recorded for every endpoint
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+
+@app.after_request
+def record_status(response):
+    """Records the status of a request, and reports the provider calls made while handling it. For streamed responses
+    only the calls made before the body started are included."""
+    g.status = response.status_code
+
+    for header, value in instrument.accounting().headers():
+        response.headers[header] = value
+
+    return response
+
+
+@app.teardown_request
+def record_request(exc=None):
+    """Records the latency of a request once it is completely done, including any streamed response body."""
+    if 'started' not in g:
+        return
+
+    adapter_id = (request.view_args or {}).get('adapter_id')
+    adapter_id = adapter_id if adapter_id in adapter_ids() else ''
+    status = g.get('status', 500) if exc is None else 500
+    elapsed = time.perf_counter() - g.started
+
+    instrument.REQUEST_LATENCY.labels(adapter_id, request.endpoint or '', status).observe(elapsed)
+
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        log_slow_request(adapter_id, status, elapsed)
+
+
+def log_slow_request(adapter_id, status, elapsed):
+    """Logs a single structured line breaking a slow request's time down by phase."""
+    account = instrument.accounting()
+
+    logging.getLogger(__name__).warning('slow request %s', json.dumps({
+        'adapter': adapter_id,
+        'account': account.account_id[:16] if account.account_id else None,
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'seconds': round(elapsed, 3),
+        'provider_calls': account.requests,
+        'provider_seconds': round(account.seconds, 3),
+        'phases': {name: {'calls': calls, 'seconds': round(seconds, 3)}
+                   for name, (calls, seconds) in sorted(account.phases.items())},
+    }, sort_keys=True))
+
+
+# Metrics endpoint, for Prometheus to scrape
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Provides request, provider call, task and cache metrics in the Prometheus text format."""
+    body, content_type = instrument.metrics()
+
+    return body, 200, [("Content-Type", content_type)]
@@ -0,0 +1,34 @@
+from flask import g, request
+from nanobox_libcloud import app
+from nanobox_libcloud.utils import profile
+
+
+# Opt-in request profiling, see utils/profile.py for the settings
+@app.before_request
+def start_profile():
+    if profile.wants_profile(request.headers):
+        g.profile = profile.start()
+
+
+@app.after_request
+def report_profile(response):
+    if g.get('profile') is not None:
+        response.headers["X-Profile-Id"] = g.profile.id
+
+    return response
+
+
+@app.teardown_request
+def finish_profile(exc=None):
+    """Saves the profile of a request once it is completely done, including any streamed response body."""
+    if g.get('profile') is None:
+        return
+
+    profile.finish(
+        g.pop('profile'),
+        adapter=(request.view_args or {}).get('adapter_id'),
+        endpoint=request.endpoint,
+        method=request.method,
+        path=request.path,
+        status=g.get('status', 500) if exc is None else 500,
+    )
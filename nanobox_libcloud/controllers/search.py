@@ -0,0 +1,30 @@
+from flask import request
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters import adapter_ids, get_adapter_class
+from nanobox_libcloud.utils import cache, index, output
+
+
+# Search endpoints, which look across the catalogs of every adapter
+@app.route('/search', methods=['GET'])
+def search():
+    """Finds the server specs best matching a query across the cached generic catalogs of all adapters."""
+    try:
+        query = index.parse_search(request.args)
+    except ValueError as err:
+        return output.failure(str(err), 400)
+
+    # Every available adapter is loaded, not just those this worker has imported, so every worker searches the same
+    # set. Only catalogs which are already cached, here or by another worker, are searched, so a search never calls a
+    # provider
+    adapter_classes = [get_adapter_class(adapter_id) for adapter_id in adapter_ids()]
+    payloads = {}
+    for adapter_class in adapter_classes:
+        payload = cache.shared_catalogs.get(adapter_class._get_id())
+        if payload is not None:
+            payloads[adapter_class._get_id()] = payload
+
+    return output.success({
+        "results": index.get_search_index(payloads).query(**query),
+        "missing": [adapter_class._get_id() for adapter_class in adapter_classes
+                    if adapter_class._get_id() not in payloads],
+    })
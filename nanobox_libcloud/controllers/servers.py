@@ -1,7 +1,7 @@
 from flask import request
 from nanobox_libcloud import app
 from nanobox_libcloud.adapters import get_adapter
-from nanobox_libcloud.utils import output
+from nanobox_libcloud.utils import breaker, output
 
 
 # Server endpoints for the Nanobox Provider Adapter API
@@ -16,7 +16,7 @@ def server_create(adapter_id):
     if not adapter.do_verify(request.headers):
         return output.failure("Credential verification failed. Please check your credentials and try again.", 401)
 
-    result = adapter.do_server_create(request.headers, request.json)
+    result = adapter.do_server_create_once(request.headers, request.json)
 
     if 'error' in result:
         return output.failure(result['error'], result['status'])
@@ -32,7 +32,8 @@ def server_query(adapter_id, server_id):
     if not adapter:
         return output.failure("That adapter doesn't (yet) exist. Please check the adapter name and try again.", 501)
 
-    if not adapter.do_verify(request.headers):
+    # While the provider's breaker is open, queries are answered from what was cached for these exact credentials
+    if not breaker.is_open() and not adapter.do_verify(request.headers):
         return output.failure("Credential verification failed. Please check your credentials and try again.", 401)
 
     result = adapter.do_server_query(request.headers, server_id)
@@ -1,5 +1,11 @@
 import importlib
 import os
+import time
+from celery.signals import task_prerun, task_postrun, worker_process_init
+from nanobox_libcloud.utils import instrument, sampler
+
+# Start times of the tasks running in this worker, by task ID
+_started = {}
 
 
 def import_tasks():
@@ -9,5 +15,24 @@ def import_tasks():
             importlib.import_module('{}.{}'.format(__name__, file[:-3]))
 
 
+@worker_process_init.connect
+def start_sampler(**kwargs):
+    sampler.start()
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task(task_id=None, task=None, state=None, **kwargs):
+    """Records how long a task ran for, and how it ended."""
+    started = _started.pop(task_id, None)
+
+    if started is not None:
+        instrument.TASK_LATENCY.labels(task.name, state or '').observe(time.perf_counter() - started)
+
+
 # Import all modules containing tasks so they will be registered
 import_tasks()
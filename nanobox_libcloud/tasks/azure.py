@@ -1,33 +1,80 @@
 from nanobox_libcloud import celery
 from nanobox_libcloud import adapters
+from nanobox_libcloud.utils import limiter
 from time import sleep
 import logging
 import libcloud
+from libcloud.common.exceptions import RateLimitReachedError
 from libcloud.compute.base import Node
 from libcloud.compute.types import NodeState
 from requests.exceptions import ReadTimeout
 
+# Seconds between checks on a server being started or destroyed, so one task doesn't use up the subscription's calls
+POLL_SECONDS = 5
+
+
+def wait_turn(err):
+    """Waits out a call refused for being over the subscription's rate limit, whether by the rate limiter or Azure."""
+    sleep(max(err.retry_after, 1))
+
+
+def when_allowed(call, *args, **kwargs):
+    """Makes a provider call, waiting out any refusals for being over the subscription's rate limit."""
+    while True:
+        try:
+            return call(*args, **kwargs)
+        except RateLimitReachedError as e:
+            wait_turn(e)
+
+
+def back_off(self, account, seconds=2):
+    """Holds back every call for a subscription after a "Too Many Requests" response, which libcloud fails to parse and
+    surfaces as an AttributeError, so the next call waits its turn in the rate limiter instead of retrying blindly."""
+    if not limiter.throttled(self._get_id(), account, seconds):
+        sleep(seconds)
+
+
+def find_created(self, driver, name):
+    """Returns the server with the given name if it has actually been created, ignoring the status recorded while it is
+    being ordered. Failing to list servers, as when their cloud service doesn't exist yet, means it hasn't been."""
+    try:
+        return next((server for server in self._find_usable_servers(driver) if server.id == name), None)
+    except (libcloud.common.types.LibcloudError, libcloud.common.exceptions.BaseHTTPError):
+        return None
+
 
 @celery.task
 def azure_create_classic(headers, data):
     logger = logging.getLogger(__name__)
-    self = adapters.azure.AzureClassic()
-    driver = self._get_user_driver(**self._get_request_credentials(headers))
+    self = adapters.get_adapter('azure', enabled_only=False)
+    driver = when_allowed(self._get_user_driver, **self._get_request_credentials(headers))
+    account = self._get_rate_limit_account(self._get_request_credentials(headers))
 
     logger.info('Creating server and dependencies...')
     node = None
     while node is None:
         try:
-            node = driver.create_node(**self._get_create_args(data))
-        except (AttributeError, libcloud.common.types.LibcloudError):
+            # A failed attempt, or an earlier run of this task, may have created the server anyway
+            node = find_created(self, driver, data['name']) or driver.create_node(**self._get_create_args(data))
+        except RateLimitReachedError as e:
+            wait_turn(e)
+        except AttributeError:
+            back_off(self, account)
+        except libcloud.common.types.LibcloudError:
             sleep(2)
 
     logger.info('Waiting for server to start...')
     while node is None or node.state != NodeState.RUNNING:
+        sleep(POLL_SECONDS)
+
         try:
             node = self._find_server(driver, data['name'])
-        except (AttributeError, libcloud.common.types.LibcloudError):
-            sleep(2)
+        except RateLimitReachedError as e:
+            wait_turn(e)
+        except AttributeError:
+            back_off(self, account)
+        except libcloud.common.types.LibcloudError:
+            pass
 
     logger.info('Adding Nanobox ports...')
     while True:
@@ -47,10 +94,13 @@ def azure_create_classic(headers, data):
                 {"name": 'Red Daemon', "protocol": 'UDP', "port": 8472, "local_port": 8472},
                 {"name": 'NanoAgent API', "protocol": 'TCP', "port": 8570, "local_port": 8570},
             ], 'production')
+        except RateLimitReachedError as e:
+            wait_turn(e)
         except AttributeError:
-            pass
+            back_off(self, account)
         except libcloud.common.types.LibcloudError as e:
             logger.info(repr(e))
+            sleep(POLL_SECONDS)
         else:
             break
 
@@ -84,29 +134,31 @@ def azure_create_classic(headers, data):
 @celery.task
 def azure_destroy_classic(creds, name):
     logger = logging.getLogger(__name__)
-    self = azure.AzureClassic()
-    driver = self._get_user_driver(**creds)
+    self = adapters.get_adapter('azure', enabled_only=False)
+    driver = when_allowed(self._get_user_driver, **creds)
+    account = self._get_rate_limit_account(creds)
 
     logger.info('Waiting for server to be destroyed...')
-    while self._find_server(driver, name) is not None:
-        sleep(0.5)
+    while when_allowed(self._find_server, driver, name) is not None:
+        sleep(POLL_SECONDS)
 
     logger.info('Removing cloud service...')
-    driver.ex_destroy_cloud_service(name)
+    when_allowed(driver.ex_destroy_cloud_service, name)
 
-    if len([cloud for cloud in driver.ex_list_cloud_services()
+    if len([cloud for cloud in when_allowed(driver.ex_list_cloud_services)
             if cloud.service_name.startswith(name.rsplit('-', 1)[0])]) < 1:
         logger.info('Removing storage service...')
         while True:
             try:
                 driver.ex_destroy_storage_service(name.rsplit('-', 1)[0].replace('-', ''))
+            except RateLimitReachedError as e:
+                wait_turn(e)
             except (libcloud.common.types.LibcloudError, ReadTimeout) as e:
                 if 'has some active image(s)' not in repr(e):
                     logger.info(repr(e))
+                sleep(POLL_SECONDS)
             except AttributeError:
                 # Generally caused by "Too Many Requests" response not being parsed
-                sleep(2)
+                back_off(self, account)
             else:
                 break
-            finally:
-                sleep(0.5)
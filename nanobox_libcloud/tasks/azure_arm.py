@@ -7,7 +7,7 @@ import logging
 @celery.task
 def azure_destroy_arm(creds, name):
     logger = logging.getLogger(__name__)
-    self = adapters.azure_arm.AzureARM()
+    self = adapters.get_adapter('azure_arm', enabled_only=False)
     driver = self._get_user_driver(**creds)
 
     logger.info('Destroying server, NIC, public IP, and VHD...')
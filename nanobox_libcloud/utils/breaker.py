@@ -0,0 +1,219 @@
+import contextlib
+import logging
+import math
+import os
+import threading
+import time
+import typing
+
+from flask import g, has_request_context, request
+from libcloud.common.exceptions import BaseHTTPError
+
+
+# Consecutive failed provider calls which open a breaker; calls slower than SLOW_SECONDS count as failures
+FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+SLOW_SECONDS = float(os.getenv('BREAKER_SLOW_SECONDS', 30))
+
+# Seconds an open breaker refuses requests for, before letting a single trial request through
+RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', 60))
+
+# Endpoints sharing a breaker, so a failing rate card API doesn't stop servers being managed, for example
+ENDPOINT_CLASSES = {
+    'catalog': 'catalog',
+    'catalog_region': 'catalog',
+    'verify': 'query',
+    'key_query': 'query',
+    'server_query': 'query',
+    'key_create': 'mutation',
+    'key_delete': 'mutation',
+    'server_create': 'mutation',
+    'server_cancel': 'mutation',
+    'server_install_key': 'mutation',
+    'server_reboot': 'mutation',
+    'server_rename': 'mutation',
+}
+
+
+class CircuitOpen(Exception):
+    """
+    Raised when a request can't be served without calling a provider whose breaker is open.
+    """
+
+    def __init__(self, adapter_id: str, retry_after: int):
+        super().__init__("%s isn't responding properly at the moment. Please try again in %d seconds."
+                         % (adapter_id, retry_after))
+        self.adapter_id = adapter_id
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+    """
+    Tracks the provider calls made by one adapter's endpoint class. Opens after `failures` failed calls in a row, and
+    then refuses requests until `reset` seconds have passed, when one trial request is let through: the breaker closes
+    again as soon as a call succeeds, and stays open for another `reset` seconds if it fails. Calls refused for being
+    wrong, such as lookups of missing servers, neither close nor open it. Trials which end without settling whether
+    the provider has recovered, or are still going after `trial_timeout` seconds, let the next request try instead.
+    """
+
+    def __init__(self, name, failures=FAILURES, reset=RESET_SECONDS, trial_timeout=SLOW_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset = reset
+        self.trial_timeout = trial_timeout
+        self._failed = 0
+        self._opened = None  # type: typing.Optional[float]
+        self._trial = None  # type: typing.Optional[float]
+        self._lock = threading.Lock()
+
+    def admit(self) -> typing.Tuple[bool, typing.Optional[float]]:
+        """Returns whether a request may call the provider and, if it is let through as the trial request, the time its
+        trial started, to end it with."""
+        with self._lock:
+            if self._opened is None:
+                return True, None
+
+            now = time.monotonic()
+            if now < self._opened + self.reset or (self._trial is not None and now < self._trial + self.trial_timeout):
+                return False, None
+
+            self._trial = now
+            return True, now
+
+    def end_trial(self, started: float):
+        """Ends the trial started at `started`, if it is still going, so the next request tries the provider."""
+        with self._lock:
+            if self._trial == started:
+                self._trial = None
+
+    def retry_after(self) -> int:
+        """Returns the seconds until the next trial request, rounded up."""
+        with self._lock:
+            if self._opened is None:
+                return 0
+
+            due = self._opened + self.reset
+            if self._trial is not None:
+                due = max(due, self._trial + self.trial_timeout)
+
+            return max(int(math.ceil(due - time.monotonic())), 1)
+
+    def record(self, ok: typing.Optional[bool]):
+        """Records the outcome of a provider call: `True` if it succeeded, `False` if the provider failed, or `None` if
+        it was refused for being wrong, which says nothing either way."""
+        with self._lock:
+            if ok is None:
+                return
+
+            if ok:
+                self._failed, self._opened, self._trial = 0, None, None
+                return
+
+            self._failed += 1
+            if self._opened is None and self._failed < self.failures:
+                return
+
+            if self._opened is None:
+                logging.getLogger(__name__).warning('circuit opened for %s after %d failed provider calls',
+                                                    self.name, self._failed)
+
+            self._opened, self._trial = time.monotonic(), None
+
+
+_breakers = {}  # type: typing.Dict[typing.Tuple[str, str], CircuitBreaker]
+_lock = threading.Lock()
+
+
+def get(adapter_id: str, kind: str, create=True) -> typing.Optional[CircuitBreaker]:
+    """Returns the breaker of an adapter's endpoint class, shared by every request in the process."""
+    with _lock:
+        breaker = _breakers.get((adapter_id, kind))
+
+        if breaker is None and create:
+            breaker = _breakers[(adapter_id, kind)] = CircuitBreaker('%s %s' % (adapter_id, kind))
+
+        return breaker
+
+
+def current(create=True) -> typing.Optional[CircuitBreaker]:
+    """Returns the breaker the current request's provider calls count against, or `None` outside of provider
+    endpoints. Only provider calls create breakers, so requests for unknown adapters never do."""
+    if not has_request_context():
+        return None
+
+    kind = ENDPOINT_CLASSES.get(request.endpoint)
+    adapter_id = (request.view_args or {}).get('adapter_id')
+
+    if kind is None or not adapter_id:
+        return None
+
+    return get(adapter_id, kind, create)
+
+
+def is_open() -> bool:
+    """Returns whether the current request should stay away from its provider. Decided once per request, so a request
+    let through as the trial stays the trial."""
+    if not has_request_context():
+        return False
+
+    if 'circuit_open' not in g:
+        breaker = current(create=False)
+        allowed, g.circuit_trial = breaker.admit() if breaker is not None else (True, None)
+        g.circuit_open = not allowed
+
+    return g.circuit_open
+
+
+def finish():
+    """Ends the current request's trial, if it was let through as one and its calls didn't settle whether the provider
+    has recovered, such as when it was answered from a cache or rejected before calling the provider."""
+    trial = g.pop('circuit_trial', None) if has_request_context() else None
+    breaker = current(create=False) if trial is not None else None
+
+    if breaker is not None:
+        breaker.end_trial(trial)
+
+
+def refuse() -> CircuitOpen:
+    """Returns the error refusing the current request, to be raised instead of calling a provider whose breaker is
+    open."""
+    breaker = current(create=False)
+
+    return CircuitOpen((request.view_args or {}).get('adapter_id', ''),
+                       breaker.retry_after() if breaker is not None else int(RESET_SECONDS))
+
+
+def is_outage(err: Exception) -> bool:
+    """Returns whether an error means the provider is failing, rather than that the request was wrong."""
+    if isinstance(err, OSError):
+        return True
+
+    # Including 429 Too Many Requests
+    return isinstance(err, BaseHTTPError) and isinstance(err.code, int) and (err.code >= 500 or err.code == 429)
+
+
+def record(seconds: float, err: typing.Optional[Exception] = None):
+    """Records the outcome of a provider call made by the current request. Only calls which succeeded in time count
+    towards closing the breaker: one finding a server missing doesn't mean the provider is working again."""
+    breaker = current()
+
+    if breaker is None:
+        return
+
+    if seconds >= SLOW_SECONDS or (err is not None and is_outage(err)):
+        breaker.record(False)
+    else:
+        breaker.record(True if err is None else None)
+
+
+@contextlib.contextmanager
+def watch():
+    """Records the outcome of a block of code calling a provider outside of its driver, such as a pricing download."""
+    started = time.perf_counter()
+
+    try:
+        yield
+    except Exception as e:
+        record(time.perf_counter() - started, e)
+        raise
+    else:
+        record(time.perf_counter() - started)
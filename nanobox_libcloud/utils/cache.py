@@ -0,0 +1,253 @@
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import threading
+import time
+import typing
+
+from redis.exceptions import RedisError
+
+from nanobox_libcloud.utils import instrument, output, store
+
+
+def account_id(adapter_id: str, credentials: typing.Dict[str, typing.Any]) -> str:
+    """Returns an opaque, stable identifier for the account a set of credentials belongs to."""
+    digest = hashlib.sha256(adapter_id.encode('utf-8'))
+
+    for key, value in sorted(credentials.items()):
+        digest.update(('\0%s=%s' % (key, value)).encode('utf-8'))
+
+    return digest.hexdigest()
+
+
+def public_key(key) -> typing.Optional[str]:
+    """Returns the public key material of a libcloud key pair object."""
+    return key.pub_key if hasattr(key, 'pub_key') else getattr(key, 'public_key', None)
+
+
+def fingerprint(key: typing.Optional[str]) -> typing.Optional[str]:
+    """Returns the MD5 fingerprint of an OpenSSH public key, ignoring its comment and whitespace."""
+    if not key:
+        return None
+
+    for part in key.split()[:3]:
+        try:
+            blob = base64.b64decode(part.encode('ascii'), validate=True)
+        except (binascii.Error, ValueError, UnicodeEncodeError):
+            continue
+
+        if len(blob) > 4:
+            digest = hashlib.md5(blob).hexdigest()
+            return ':'.join(digest[i:i + 2] for i in range(0, len(digest), 2))
+
+    return ' '.join(key.split()[:2])
+
+
+class TTLCache(object):
+    """
+    Thread-safe cache of values shared by every request in a process, which expire after a TTL.
+    """
+
+    def __init__(self, name, ttl, maxsize=None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}  # type: typing.Dict[typing.Hashable, typing.Tuple[float, typing.Any]]
+        self._lock = threading.Lock()
+
+    def get(self, key, loader=None, ttl=None) -> typing.Any:
+        """Returns the cached value for a key, storing the result of `loader` if there is no fresh one."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+        hit = entry is not None and entry[0] > time.monotonic()
+        instrument.cache_lookup(self.name, hit)
+
+        if hit:
+            return entry[1]
+
+        if loader is None:
+            return None
+
+        value = loader()
+        self.set(key, value, ttl)
+
+        return value
+
+    def last(self, key) -> typing.Any:
+        """Returns the value last stored for a key even if it has expired, for when there is no way to get a fresh one.
+        Expired values are kept until they are replaced or pruned to make room."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+        return entry[1] if entry is not None else None
+
+    def set(self, key, value, ttl=None):
+        """Stores a value for a key."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+
+            if self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._prune()
+
+    def pop(self, key) -> typing.Any:
+        """Removes a key, returning its value if it was cached."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+
+        return entry[1] if entry is not None else None
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def _prune(self):
+        """Drops expired entries and, if that isn't enough, the ones closest to expiring."""
+        now = time.monotonic()
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+
+        if len(self._entries) > self.maxsize:
+            for key in sorted(self._entries, key=lambda key: self._entries[key][0])[:len(self._entries) - self.maxsize]:
+                del self._entries[key]
+
+
+class KeyIndex(object):
+    """
+    Per-account index of SSH keys by name and public key fingerprint. Entries are kept current as keys are created and
+    deleted, and are reloaded from the provider once they are older than the TTL.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else int(os.getenv('KEY_CACHE_TTL', 300))
+        self._entries = {}  # type: typing.Dict[str, typing.Tuple[float, dict, dict]]
+        self._lock = threading.Lock()
+
+    def find(self, account, loader, name=None, public_key=None, refresh=False) -> typing.Optional[object]:
+        """Returns the key with the given name or public key, calling `loader` only if the index is stale or misses."""
+        entry, loaded = self._get(account, loader, refresh)
+        instrument.cache_lookup('ssh_keys', not loaded)
+        key = self._match(entry, name, public_key)
+
+        if key is None and not loaded:
+            entry, loaded = self._get(account, loader, True)
+            key = self._match(entry, name, public_key)
+
+        return key
+
+    def last(self, account, name=None, public_key=None) -> typing.Optional[object]:
+        """Returns the key with the given name or public key from an account's index however old it is, without ever
+        loading it, for when the provider can't be asked."""
+        with self._lock:
+            entry = self._entries.get(account)
+
+        return self._match(entry, name, public_key) if entry is not None else None
+
+    def add(self, account, key):
+        """Records a newly created key in the index of an account."""
+        with self._lock:
+            if account in self._entries:
+                by_name, by_print = self._entries[account][1:]
+                by_name[key.name] = key
+                by_print[fingerprint(public_key(key))] = key
+
+    def discard(self, account, key):
+        """Removes a deleted key from the index of an account."""
+        with self._lock:
+            if account in self._entries:
+                by_name, by_print = self._entries[account][1:]
+                by_name.pop(key.name, None)
+                by_print.pop(fingerprint(public_key(key)), None)
+
+    def invalidate(self, account):
+        """Drops the index of an account, so it will be reloaded on next use."""
+        with self._lock:
+            self._entries.pop(account, None)
+
+    def clear(self):
+        """Drops the indexes of every account."""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, account, loader, refresh) -> typing.Tuple[typing.Tuple[float, dict, dict], bool]:
+        if account is not None and not refresh:
+            with self._lock:
+                entry = self._entries.get(account)
+
+            if entry is not None and entry[0] > time.monotonic():
+                return entry, False
+
+        keys = loader() or []
+        entry = (
+            time.monotonic() + self.ttl,
+            {key.name: key for key in keys},
+            {fingerprint(public_key(key)): key for key in keys},
+        )
+
+        if account is not None:
+            with self._lock:
+                self._entries[account] = entry
+
+        return entry, True
+
+    @staticmethod
+    def _match(entry, name, key) -> typing.Optional[object]:
+        if name is not None and name in entry[1]:
+            return entry[1][name]
+
+        if key is not None:
+            return entry[2].get(fingerprint(key))
+
+        return None
+
+
+class SharedCatalogs(object):
+    """
+    Generic catalogs published to Redis, so every worker process searches the same catalogs whichever of them built
+    each one. Catalogs fetched from Redis are kept in `catalogs` for `refresh` seconds before they're fetched again.
+    """
+
+    def __init__(self, ttl, refresh=60):
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def publish(self, adapter_id: str, payload: 'output.Payload'):
+        """Shares a newly built generic catalog with the other workers."""
+        try:
+            with instrument.phase('redis'):
+                store.client().setex('catalog:%s' % (adapter_id), self.ttl, payload.body.decode('utf-8'))
+        except RedisError as e:
+            logging.getLogger(__name__).warning('shared catalogs unavailable: %r', e)
+
+    def get(self, adapter_id: str) -> typing.Optional['output.Payload']:
+        """Returns the generic catalog of an adapter, as cached in this process or else as shared by another worker."""
+        payload = catalogs.get((adapter_id, None))
+        if payload is not None:
+            return payload
+
+        try:
+            with instrument.phase('redis'):
+                body = store.client().get('catalog:%s' % (adapter_id))
+        except RedisError as e:
+            logging.getLogger(__name__).warning('shared catalogs unavailable: %r', e)
+            return None
+
+        if body is None:
+            return None
+
+        payload = output.Payload(body=body.encode('utf-8'))
+        catalogs.set((adapter_id, None), payload, self.refresh)
+
+        return payload
+
+
+# Process-wide caches, shared by all adapters
+ssh_keys = KeyIndex()
+pricing = TTLCache('pricing', int(os.getenv('PRICING_CACHE_TTL', 3600)))
+catalogs = TTLCache('catalogs', int(os.getenv('CATALOG_CACHE_TTL', 3600)), int(os.getenv('CATALOG_CACHE_SIZE', 256)))
+indexes = TTLCache('indexes', int(os.getenv('CATALOG_CACHE_TTL', 3600)), int(os.getenv('CATALOG_CACHE_SIZE', 256)))
+servers = TTLCache('servers', int(os.getenv('SERVER_CACHE_TTL', 3600)), 4096)
+shared_catalogs = SharedCatalogs(int(os.getenv('CATALOG_CACHE_TTL', 3600)))
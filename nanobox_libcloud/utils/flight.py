@@ -0,0 +1,198 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+import typing
+import uuid
+
+from redis.exceptions import RedisError
+
+from nanobox_libcloud.utils import instrument, store
+
+
+# Longest a caller waits for an identical load in progress, here or in another worker, before loading for itself
+WAIT_SECONDS = float(os.getenv('COALESCE_WAIT_SECONDS', 60))
+
+# Seconds a finished load's result is kept in Redis for the workers waiting on it, and how often they check for it
+HANDOFF_SECONDS = 10
+POLL_SECONDS = 0.05
+
+
+class Flight(object):
+    """
+    A load in progress in this process, which callers asking for the same thing wait on rather than repeat.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None  # type: typing.Any
+        self.error = None  # type: typing.Optional[Exception]
+
+
+_flights = {}  # type: typing.Dict[str, Flight]
+_lock = threading.Lock()
+
+
+def encode_json(value) -> typing.Optional[str]:
+    """Encodes a result for the workers waiting on it, or returns `None` if it isn't plain JSON data (such as an error
+    returned rather than raised), so they load it for themselves instead."""
+    try:
+        return json.dumps(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def share(key: tuple, loader: typing.Callable, encode: typing.Optional[typing.Callable] = encode_json,
+          decode: typing.Callable = json.loads) -> typing.Any:
+    """
+    Returns the result of `loader`, calling it only once for every concurrent caller with the same key. The first
+    caller loads, and the others wait for it and get the very same result, or error. Callers in other worker processes
+    wait on a lock in Redis and are handed the result through it, if `encode` can turn it into a string; pass
+    `encode=None` to only share a load within this process. Those callers load for themselves if the load fails, as do
+    any callers which have waited longer than COALESCE_WAIT_SECONDS.
+    """
+    name = 'flight:' + ':'.join(str(part) for part in key)
+
+    with _lock:
+        flight = _flights.get(name)
+        leading = flight is None
+
+        if leading:
+            flight = _flights[name] = Flight()
+
+    if not leading:
+        with instrument.phase('coalesce'):
+            done = flight.done.wait(WAIT_SECONDS)
+
+        if not done:
+            return loader()
+
+        instrument.coalesced(key[0], 'process')
+        if flight.error is not None:
+            raise flight.error
+
+        return flight.value
+
+    try:
+        flight.value = _share_across(name, key[0], loader, encode, decode) if encode is not None else loader()
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            _flights.pop(name, None)
+
+        flight.done.set()
+
+    return flight.value
+
+
+def in_progress(key: tuple) -> bool:
+    """Returns whether a load is in progress for a key, in this process or another worker."""
+    name = 'flight:' + ':'.join(str(part) for part in key)
+
+    with _lock:
+        if name in _flights:
+            return True
+
+    try:
+        with instrument.phase('redis'):
+            return store.client().get(name) is not None
+    except RedisError:
+        return False
+
+
+def _share_across(name, kind, loader, encode, decode) -> typing.Any:
+    """Loads as the only worker doing so, handing the result to the others in Redis, or takes the result of the worker
+    already loading."""
+    token = uuid.uuid4().hex
+
+    try:
+        with instrument.phase('redis'):
+            leader = _lead(name, token)
+    except RedisError as e:
+        # Every worker loads for itself rather than fail because Redis did
+        logging.getLogger(__name__).warning('request coalescing unavailable: %r', e)
+        return loader()
+
+    if leader is not None and leader != token:
+        result = _await(name, leader)
+        if result is None:
+            return loader()
+
+        instrument.coalesced(kind, 'redis')
+        return decode(result)
+
+    try:
+        value = loader()
+        result = encode(value) if leader is not None else None
+
+        if result is not None:
+            _hand_over(name, token, result)
+
+        return value
+    finally:
+        if leader is not None:
+            _release(name, token)
+
+
+def _lead(name, token) -> typing.Optional[str]:
+    """Takes the lock for a load, returning `token` if this worker is to load, the token of the worker already loading
+    otherwise, or `None` if neither could be settled."""
+    client = store.client()
+
+    for _ in range(3):
+        if client.set(name, token, ex=int(math.ceil(WAIT_SECONDS)), nx=True):
+            return token
+
+        leader = client.get(name)
+        if leader is not None:
+            return leader
+
+    return None
+
+
+def _await(name, leader) -> typing.Optional[str]:
+    """Waits for another worker's load to finish, returning its encoded result, or `None` if it failed, didn't hand its
+    result over, or is taking too long."""
+    client = store.client()
+    deadline = time.monotonic() + WAIT_SECONDS
+
+    try:
+        with instrument.phase('coalesce'):
+            while time.monotonic() < deadline:
+                result = client.get('%s:%s' % (name, leader))
+                if result is not None:
+                    return result
+
+                # Results are handed over before the lock is released, so this is the last chance to find one
+                if client.get(name) != leader:
+                    return client.get('%s:%s' % (name, leader))
+
+                time.sleep(POLL_SECONDS)
+    except RedisError as e:
+        logging.getLogger(__name__).warning('request coalescing unavailable: %r', e)
+
+    return None
+
+
+def _hand_over(name, token, result):
+    """Stores the encoded result of a load for the workers waiting on it."""
+    try:
+        with instrument.phase('redis'):
+            store.client().setex('%s:%s' % (name, token), HANDOFF_SECONDS, result)
+    except RedisError as e:
+        logging.getLogger(__name__).warning('request coalescing unavailable: %r', e)
+
+
+def _release(name, token):
+    """Releases the lock for a load, unless it has expired and been taken by another worker since."""
+    try:
+        with instrument.phase('redis'):
+            client = store.client()
+            if client.get(name) == token:
+                client.delete(name)
+    except RedisError as e:
+        logging.getLogger(__name__).warning('request coalescing unavailable: %r', e)
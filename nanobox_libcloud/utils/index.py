@@ -0,0 +1,261 @@
+import heapq
+import math
+import typing
+from array import array
+from itertools import repeat
+
+from nanobox_libcloud.utils import cache
+
+
+# Spec fields which can be filtered by range, by the names used in their `min_` and `max_` query parameters
+RANGES = {
+    'ram': 'ram',
+    'cpu': 'cpu',
+    'disk': 'disk',
+    'price': 'dollars_per_mo',
+    'hourly_price': 'dollars_per_hr',
+}
+
+# Spec fields which can be projected
+FIELDS = ('id', 'name', 'ram', 'cpu', 'disk', 'transfer', 'dollars_per_hr', 'dollars_per_mo')
+
+# Query parameters understood by `parse_query`
+PARAMS = ('regions', 'plans', 'exclude_plans', 'fields') + tuple('%s_%s' % (bound, name)
+                                                                   for name in RANGES for bound in ('min', 'max'))
+
+
+class CatalogIndex(object):
+    """
+    Columnar index over the specs of a catalog. Each filterable field is kept in a flat array of floats, with one entry
+    per spec (NaN where the catalog has no number, such as 'unlimited' or 'Unknown'), so queries only scan the columns
+    they filter on and never touch the catalog itself until the matching specs are assembled.
+    """
+
+    __slots__ = ('regions', 'plans', 'specs', 'plan', 'columns')
+
+    def __init__(self, catalog: typing.List[dict]):
+        self.regions = []  # type: typing.List[dict]
+        self.plans = []  # type: typing.List[typing.Tuple[int, dict]]
+        self.specs = []  # type: typing.List[dict]
+        self.plan = array('L')
+        self.columns = {field: array('d') for field in RANGES.values()}
+
+        for region in catalog:
+            self.regions.append(region)
+
+            for plan in region.get('plans', []):
+                self.plans.append((len(self.regions) - 1, plan))
+
+                for spec in plan.get('specs', []):
+                    self.specs.append(spec)
+                    self.plan.append(len(self.plans) - 1)
+
+                    for field, column in self.columns.items():
+                        column.append(_number(spec.get(field)))
+
+    def query(self, regions=None, plans=None, exclude_plans=None, ranges=None,
+              fields=None) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Returns the catalog restricted to the given region and plan ids, and to specs within the given
+        `{field: (min, max)}` ranges, with only the given spec fields. Plans and regions left empty are dropped."""
+        selected = [(regions is None or self.regions[region]['id'] in regions) and
+                    (plans is None or plan['id'] in plans) and
+                    (exclude_plans is None or plan['id'] not in exclude_plans)
+                    for region, plan in self.plans]
+        matches = [i for i, plan in enumerate(self.plan) if selected[plan]]
+
+        for field, (low, high) in (ranges or {}).items():
+            column = self.columns[field]
+            if low is not None:
+                matches = [i for i in matches if column[i] >= low]
+            if high is not None:
+                matches = [i for i in matches if column[i] <= high]
+
+        return self._assemble(matches, fields)
+
+    def _assemble(self, matches, fields) -> typing.List[typing.Dict[str, typing.Any]]:
+        result = []
+        last_plan = last_region = None
+
+        # Specs were indexed in catalog order, so the matches for each plan and region are contiguous
+        for i in matches:
+            if self.plan[i] != last_plan:
+                last_plan = self.plan[i]
+                region, plan = self.plans[last_plan]
+
+                if region != last_region:
+                    last_region = region
+                    result.append({'id': self.regions[region]['id'], 'name': self.regions[region]['name'], 'plans': []})
+
+                result[-1]['plans'].append({'id': plan['id'], 'name': plan['name'], 'specs': []})
+
+            spec = self.specs[i]
+            result[-1]['plans'][-1]['specs'].append(spec if fields is None else
+                                                    {field: spec[field] for field in fields if field in spec})
+
+        return result
+
+
+class SearchIndex(object):
+    """
+    Columnar index over the specs of several adapters' catalogs, made by concatenating the columns of their catalog
+    indexes, so a query across every provider is a scan over a handful of flat arrays.
+    """
+
+    __slots__ = ('adapters', 'catalogs', 'starts', 'owner', 'offset', 'columns')
+
+    def __init__(self, catalogs: typing.Dict[str, CatalogIndex]):
+        self.adapters = sorted(catalogs)
+        self.catalogs = [catalogs[adapter_id] for adapter_id in self.adapters]
+        self.starts = array('L')
+        self.owner = array('H')
+        self.offset = array('L')
+        self.columns = {field: array('d') for field in RANGES.values()}
+
+        for position, catalog in enumerate(self.catalogs):
+            self.starts.append(len(self.owner))
+            self.owner.extend(repeat(position, len(catalog.specs)))
+            self.offset.extend(range(len(catalog.specs)))
+
+            for field, column in self.columns.items():
+                column.extend(catalog.columns[field])
+
+    def query(self, adapters=None, regions=None, plans=None, exclude_plans=None, ranges=None, sort='dollars_per_mo',
+              descending=False, limit=10) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Returns the first `limit` specs, in `sort` order, of the given adapters, in regions whose id or name contains
+        any of `regions` (ignoring case), with the given plan ids, and within the given `{field: (min, max)}` ranges.
+        Specs without a number for the sort field come last."""
+        selected = [self._select_plans(catalog, adapters is None or adapter_id in adapters, regions, plans, exclude_plans)
+                    for adapter_id, catalog in zip(self.adapters, self.catalogs)]
+        matches = []
+        for catalog, plans_selected, start in zip(self.catalogs, selected, self.starts):
+            if any(plans_selected):
+                matches.extend(start + i for i, plan in enumerate(catalog.plan) if plans_selected[plan])
+
+        for field, (low, high) in (ranges or {}).items():
+            column = self.columns[field]
+            if low is not None:
+                matches = [i for i in matches if column[i] >= low]
+            if high is not None:
+                matches = [i for i in matches if column[i] <= high]
+
+        column = self.columns[sort]
+        if descending:
+            top = heapq.nsmallest(limit, matches, key=lambda i: (math.isnan(column[i]), -column[i]))
+        else:
+            top = heapq.nsmallest(limit, matches, key=lambda i: (math.isnan(column[i]), column[i]))
+
+        return [self._describe(i) for i in top]
+
+    @staticmethod
+    def _select_plans(catalog, enabled, regions, plans, exclude_plans) -> typing.List[bool]:
+        if not enabled:
+            return [False] * len(catalog.plans)
+
+        matched = [regions is None or any(pattern in region['id'].lower() or pattern in region['name'].lower()
+                                          for pattern in regions)
+                   for region in catalog.regions]
+
+        return [matched[region] and (plans is None or plan['id'] in plans) and
+                (exclude_plans is None or plan['id'] not in exclude_plans)
+                for region, plan in catalog.plans]
+
+    def _describe(self, i) -> typing.Dict[str, typing.Any]:
+        catalog = self.catalogs[self.owner[i]]
+        offset = self.offset[i]
+        region, plan = catalog.plans[catalog.plan[offset]]
+
+        return dict(catalog.specs[offset],
+                    adapter=self.adapters[self.owner[i]],
+                    region=catalog.regions[region]['id'],
+                    region_name=catalog.regions[region]['name'],
+                    plan=plan['id'],
+                    plan_name=plan['name'])
+
+
+def get_search_index(payloads: typing.Dict[str, typing.Any]) -> SearchIndex:
+    """Returns the search index over a set of serialized catalogs, keyed by adapter id, building it only the first time
+    that exact set of catalogs is searched."""
+    key = ('search',) + tuple(sorted((adapter_id, payload.etag) for adapter_id, payload in payloads.items()))
+
+    return cache.indexes.get(key, lambda: SearchIndex({adapter_id: get_index(payload)
+                                                       for adapter_id, payload in payloads.items()}))
+
+
+def parse_search(args) -> typing.Dict[str, typing.Any]:
+    """Turns query parameters into keyword arguments for `SearchIndex.query`, raising a ValueError for invalid ones."""
+    query = parse_query(args)
+    query.pop('fields', None)
+
+    if 'adapters' in args:
+        query['adapters'] = set(_list(args.getlist('adapters')))
+
+    if 'regions' in query:
+        query['regions'] = {region.lower() for region in query['regions']}
+
+    sort = args.get('sort', 'price')
+    query['descending'] = sort.startswith('-')
+    if sort.lstrip('-') not in RANGES:
+        raise ValueError('Unknown sort field: %s. Valid fields are %s.' % (sort.lstrip('-'), ', '.join(RANGES)))
+    query['sort'] = RANGES[sort.lstrip('-')]
+
+    query['limit'] = _bound('limit', args.get('limit', '10'))
+    if query['limit'] < 1 or query['limit'] != int(query['limit']):
+        raise ValueError('limit must be a positive integer.')
+    query['limit'] = int(query['limit'])
+
+    return query
+
+
+def get_index(payload) -> CatalogIndex:
+    """Returns the index of a serialized catalog, building it only the first time that catalog is queried."""
+    return cache.indexes.get(payload.etag, lambda: CatalogIndex(payload.data))
+
+
+def wants_query(args) -> bool:
+    """Returns whether a request's query string asks for a filtered or projected catalog."""
+    return any(param in args for param in PARAMS)
+
+
+def parse_query(args) -> typing.Dict[str, typing.Any]:
+    """Turns query parameters into keyword arguments for `CatalogIndex.query`, raising a ValueError for invalid ones."""
+    query = {'ranges': {}}
+
+    for param in ('regions', 'plans', 'exclude_plans'):
+        if param in args:
+            query[param] = set(_list(args.getlist(param)))
+
+    if 'fields' in args:
+        query['fields'] = _list(args.getlist('fields'))
+
+    for name, field in RANGES.items():
+        low, high = args.get('min_' + name), args.get('max_' + name)
+        if low is not None or high is not None:
+            query['ranges'][field] = (_bound('min_' + name, low), _bound('max_' + name, high))
+
+    unknown = [field for field in query.get('fields', []) if field not in FIELDS]
+    if unknown:
+        raise ValueError('Unknown fields: %s. Valid fields are %s.' % (', '.join(unknown), ', '.join(FIELDS)))
+
+    return query
+
+
+def _list(values: typing.List[str]) -> typing.List[str]:
+    return [item for value in values for item in value.split(',') if item]
+
+
+def _bound(param: str, value: typing.Optional[str]) -> typing.Optional[float]:
+    if value is None:
+        return None
+
+    number = _number(value)
+    if not math.isfinite(number):
+        raise ValueError('%s must be a number.' % (param))
+
+    return number
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
@@ -0,0 +1,276 @@
+import contextlib
+import functools
+import os
+import time
+import typing
+
+from flask import g, has_request_context
+from libcloud.common.base import Connection
+from libcloud.compute.base import Node
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+from nanobox_libcloud.utils import breaker, limiter
+
+try:
+    from prometheus_client import multiprocess
+except ImportError:
+    multiprocess = None
+
+
+# Provider calls range from cached lookups to multi-minute server creates
+BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+REQUEST_LATENCY = Histogram('nanobox_request_seconds', 'Time spent handling requests.',
+                            ['adapter', 'endpoint', 'status'], buckets=BUCKETS)
+PROVIDER_LATENCY = Histogram('nanobox_provider_call_seconds', 'Time spent in provider driver calls.',
+                             ['adapter', 'method'], buckets=BUCKETS)
+PROVIDER_ERRORS = Counter('nanobox_provider_call_errors_total', 'Provider driver calls which raised an exception.',
+                          ['adapter', 'method', 'exception'])
+PROVIDER_REFUSED = Counter('nanobox_provider_calls_refused_total',
+                           'Provider driver calls refused by the rate limiter without reaching the provider.',
+                           ['adapter', 'method'])
+TASK_LATENCY = Histogram('nanobox_task_seconds', 'Time spent running Celery tasks.',
+                         ['task', 'state'], buckets=BUCKETS)
+CACHE_LOOKUPS = Counter('nanobox_cache_lookups_total', 'Lookups in the in-process caches.', ['cache', 'result'])
+COALESCED = Counter('nanobox_coalesced_loads_total', 'Loads served by an identical load already in progress.',
+                    ['kind', 'source'])
+
+
+class Accounting(object):
+    """
+    Provider calls made while handling a single request: the HTTP requests sent through libcloud's connection layer,
+    the driver methods called, and the calls the rate limiter refused to make.
+    """
+
+    __slots__ = ('requests', 'seconds', 'methods', 'refused', 'phases', 'account_id', '_open')
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.methods = {}  # type: typing.Dict[str, typing.List]
+        self.refused = 0
+        self.phases = {}  # type: typing.Dict[str, typing.List]
+        self.account_id = None  # type: typing.Optional[str]
+        self._open = []  # type: typing.List[typing.List]
+
+    def enter(self, name: str) -> bool:
+        """Starts timing a phase, unless it's already the innermost one (an override calling its parent's version)."""
+        if self._open and self._open[-1][0] == name:
+            return False
+
+        self._open.append([name, time.perf_counter(), 0.0])
+        return True
+
+    def exit(self):
+        """Stops timing the innermost phase. Phases only count their own time, not that of phases nested in them."""
+        name, started, nested = self._open.pop()
+        elapsed = time.perf_counter() - started
+
+        totals = self.phases.setdefault(name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += elapsed - nested
+
+        if self._open:
+            self._open[-1][2] += elapsed
+
+    def add_request(self, seconds: float):
+        self.requests += 1
+        self.seconds += seconds
+
+    def add_method(self, name: str, seconds: float):
+        totals = self.methods.setdefault(name, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+    def headers(self) -> typing.List[typing.Tuple[str, str]]:
+        """Summarizes the calls as response headers."""
+        return [
+            ("X-Provider-Calls", str(self.requests)),
+            ("X-Provider-Time", '%0.3f' % (self.seconds)),
+            ("X-Provider-Methods", ', '.join('%s=%d/%0.3f' % (name, calls, seconds)
+                                             for name, (calls, seconds) in sorted(self.methods.items()))),
+            ("X-Provider-Refused", str(self.refused)),
+        ]
+
+
+def accounting() -> typing.Optional[Accounting]:
+    """Returns the provider call accounting of the current request, or `None` outside of requests."""
+    if not has_request_context():
+        return None
+
+    if 'provider_accounting' not in g:
+        g.provider_accounting = Accounting()
+
+    return g.provider_accounting
+
+
+def tag_account(account_id: str):
+    """Records which account the current request is for."""
+    account = accounting()
+
+    if account is not None:
+        account.account_id = account_id
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Times a block of code as a phase of the current request."""
+    account = accounting()
+
+    if account is None or not account.enter(name):
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        account.exit()
+
+
+def timed_phase(name: str, method: typing.Callable) -> typing.Callable:
+    """Wraps a method, timing each call as a phase of the current request."""
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        account = accounting()
+
+        if account is None or not account.enter(name):
+            return method(*args, **kwargs)
+
+        try:
+            return method(*args, **kwargs)
+        finally:
+            account.exit()
+
+    return timed
+
+
+class DriverProxy(object):
+    """
+    Wraps a libcloud driver, timing and counting every public method called on it, and counting the exceptions those
+    calls raise by type. Each call's outcome is also recorded with the circuit breaker of the request making it, and
+    calls wait their turn under the provider's rate limit for the account. Servers the calls return are bound to the
+    proxy, so calls made through them, like `node.destroy()`, are counted too. Everything else is passed straight
+    through to the driver.
+    """
+
+    def __init__(self, driver, adapter_id: str, account_id: typing.Optional[str] = None):
+        object.__setattr__(self, '_driver', driver)
+        object.__setattr__(self, '_adapter_id', adapter_id)
+        object.__setattr__(self, '_account_id', account_id)
+
+    def __getattr__(self, name):
+        value = getattr(self._driver, name)
+
+        if name.startswith('_') or not callable(value) or isinstance(value, type):
+            return value
+
+        return _timed(value, self, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._driver, name, value)
+
+    def __repr__(self):
+        return '<DriverProxy %r>' % (self._driver,)
+
+
+def _timed(method, proxy, name) -> typing.Callable:
+    adapter_id, account_id = proxy._adapter_id, proxy._account_id
+
+    def call(*args, **kwargs):
+        error = None
+        sent = False
+
+        try:
+            wait = limiter.reserve(adapter_id, account_id)
+            if wait > 0:
+                with phase('throttle'):
+                    time.sleep(wait)
+
+            started = time.perf_counter()
+            sent = True
+            return _bind(method(*args, **kwargs), proxy)
+        except Exception as e:
+            error = e
+            if not sent:
+                _refused(adapter_id, name)
+            else:
+                PROVIDER_ERRORS.labels(adapter_id, name, type(e).__name__).inc()
+                if limiter.is_throttle(e):
+                    limiter.throttled(adapter_id, account_id, getattr(e, 'retry_after', 0))
+            raise
+        finally:
+            # Refused calls say nothing about the provider, so they're left out of its latency and breaker; a breaker
+            # trial refused here ends with its request
+            if sent:
+                elapsed = time.perf_counter() - started
+                PROVIDER_LATENCY.labels(adapter_id, name).observe(elapsed)
+                breaker.record(elapsed, error)
+                account = accounting()
+                if account is not None:
+                    account.add_method(name, elapsed)
+
+    return call
+
+
+def _refused(adapter_id: str, name: str):
+    """Counts a call the rate limiter refused to make."""
+    PROVIDER_REFUSED.labels(adapter_id, name).inc()
+    account = accounting()
+
+    if account is not None:
+        account.refused += 1
+
+
+def _bind(result, proxy):
+    """Binds a server, or each server in a list, returned by a driver call to the proxy it was made through."""
+    for node in result if isinstance(result, list) else [result]:
+        if isinstance(node, Node):
+            node.driver = proxy
+
+    return result
+
+
+def _accounted(request) -> typing.Callable:
+    """Wraps libcloud's `Connection.request`, so every HTTP request sent to a provider is counted against the current
+    request's accounting."""
+    @functools.wraps(request)
+    def accounted(self, *args, **kwargs):
+        account = accounting()
+        if account is None:
+            return request(self, *args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return request(self, *args, **kwargs)
+        finally:
+            account.add_request(time.perf_counter() - started)
+
+    accounted.accounted = True
+    return accounted
+
+
+def cache_lookup(cache: str, hit: bool):
+    """Records a hit or miss in one of the in-process caches."""
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def coalesced(kind: str, source: str):
+    """Records a load served by an identical one in progress, in this process or another worker."""
+    COALESCED.labels(kind, source).inc()
+
+
+def metrics() -> typing.Tuple[bytes, str]:
+    """Returns the current metrics in the Prometheus text format, along with its content type. Under gunicorn with
+    several workers, set `prometheus_multiproc_dir` so the metrics of all workers are collected together."""
+    if multiprocess is not None and ({'prometheus_multiproc_dir', 'PROMETHEUS_MULTIPROC_DIR'} & set(os.environ)):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# Count every provider HTTP request, whichever driver (or code outside a driver proxy) sends it
+if not getattr(Connection.request, 'accounted', False):
+    Connection.request = _accounted(Connection.request)
@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+import typing
+
+from libcloud.common.exceptions import BaseHTTPError, RateLimitReachedError
+from libcloud.common.types import ServiceUnavailableError
+from redis.exceptions import RedisError
+
+from nanobox_libcloud.utils import store
+
+
+# Provider calls allowed per second for each account, and how many can be made at once after a quiet spell. Providers
+# don't all publish their limits, so these are on the safe side; RATE_LIMITS overrides them, as `id=rate[/burst]`
+DEFAULT_LIMITS = {
+    'azure': (2.0, 10.0),
+    'azure_arm': (3.0, 100.0),
+    'ovh': (5.0, 20.0),
+    'vultr': (2.0, 2.0),
+}
+
+# Calls which would have to wait longer than this for their turn fail instead, as if the provider had refused them
+MAX_WAIT_SECONDS = float(os.getenv('RATE_LIMIT_MAX_WAIT', 30))
+
+# Takes a token from a bucket, or reserves the next one to become available, returning how long the caller has to
+# wait for it; or, without taking anything, returns how long it would have had to wait if that's longer than allowed
+TAKE = """
+local rate, burst, now, max_wait = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local wait = math.max(1 - tokens, 0) / rate
+if wait > max_wait then
+    return {0, tostring(wait)}
+end
+
+tokens = tokens - 1
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {1, tostring(wait)}
+"""
+
+
+def parse_limits(value: str) -> typing.Dict[str, typing.Tuple[float, float]]:
+    """Parses `vultr=2,ovh=5/20` into `(rate, burst)` by adapter id. A rate of 0 turns limiting off for that adapter."""
+    limits = dict(DEFAULT_LIMITS)
+
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        adapter_id, _, limit = item.partition('=')
+        rate, _, burst = limit.partition('/')
+
+        if float(rate) > 0:
+            limits[adapter_id] = (float(rate), float(burst or rate))
+        else:
+            limits.pop(adapter_id, None)
+
+    return limits
+
+
+LIMITS = parse_limits(os.getenv('RATE_LIMITS', ''))
+
+
+class LocalBuckets(object):
+    """
+    The same token buckets, kept in-process, for Redis clients without scripting (like the in-memory stand-in the
+    offline benchmarks use). Buckets are then only shared by the threads of one process.
+    """
+
+    def __init__(self):
+        self._buckets = {}  # type: typing.Dict[str, typing.Tuple[float, float]]
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now, max_wait) -> typing.Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(now - updated, 0) * rate)
+            wait = max(1 - tokens, 0) / rate
+
+            if wait > max_wait:
+                return False, wait
+
+            self._buckets[key] = (tokens - 1, now)
+            return True, wait
+
+    def drain(self, key, tokens, now):
+        with self._lock:
+            self._buckets[key] = (tokens, now)
+
+
+_local = LocalBuckets()
+_registered = (None, None)  # type: typing.Tuple[typing.Any, typing.Optional[typing.Callable]]
+_registered_lock = threading.Lock()
+
+
+def reserve(adapter_id: str, account: typing.Optional[str]) -> float:
+    """Takes a turn to call a provider for an account, returning the seconds to wait before making the call. Raises
+    `RateLimitReachedError` if the wait would be longer than RATE_LIMIT_MAX_WAIT."""
+    limit = LIMITS.get(adapter_id)
+    if limit is None:
+        return 0.0
+
+    rate, burst = limit
+    key = _key(adapter_id, account)
+    script = _script()
+
+    if script is None:
+        taken, wait = _local.take(key, rate, burst, time.time(), MAX_WAIT_SECONDS)
+    else:
+        try:
+            taken, wait = script(keys=[key], args=[rate, burst, '%.6f' % (time.time()), MAX_WAIT_SECONDS])
+        except RedisError as e:
+            # Calls go ahead unlimited rather than fail because Redis did
+            logging.getLogger(__name__).warning('rate limiter unavailable: %r', e)
+            return 0.0
+
+        taken, wait = bool(int(taken)), float(wait)
+
+    if not taken:
+        raise RateLimitReachedError(headers={'retry-after': str(int(wait) + 1)})
+
+    return wait
+
+
+def throttled(adapter_id: str, account: typing.Optional[str], seconds: float) -> bool:
+    """Empties an account's bucket for `seconds` after the provider refused a call for being over its rate limit, so
+    every worker backs off rather than just the one which was refused. Returns `False` if the adapter isn't limited."""
+    limit = LIMITS.get(adapter_id)
+    if limit is None:
+        return False
+
+    tokens = -limit[0] * max(seconds, 1.0)
+    key = _key(adapter_id, account)
+
+    if _script() is None:
+        _local.drain(key, tokens, time.time())
+        return True
+
+    try:
+        client = store.client()
+        client.hmset(key, {'tokens': tokens, 'updated': '%.6f' % (time.time())})
+        client.expire(key, int(seconds) + 60)
+    except RedisError as e:
+        logging.getLogger(__name__).warning('rate limiter unavailable: %r', e)
+        return False
+
+    return True
+
+
+def is_throttle(err: Exception) -> bool:
+    """Returns whether an error is a provider refusing a call for being over its rate limit: a 429, or a 503 saying to
+    retry later. Vultr answers those with a 503 whose body says so, which libcloud raises without the headers."""
+    if isinstance(err, RateLimitReachedError):
+        return True
+
+    if isinstance(err, ServiceUnavailableError):
+        return 'rate limit' in str(err.value).lower()
+
+    if isinstance(err, BaseHTTPError) and err.code == 429:
+        return True
+
+    headers = {name.lower() for name in (getattr(err, 'headers', None) or {})}
+    return isinstance(err, BaseHTTPError) and err.code == 503 and 'retry-after' in headers
+
+
+def _key(adapter_id, account) -> str:
+    return 'ratelimit:%s:%s' % (adapter_id, account or 'generic')
+
+
+def _script() -> typing.Optional[typing.Callable]:
+    """Returns the bucket script registered with the current Redis client, or `None` if it can't run scripts."""
+    global _registered
+    client = store.client()
+
+    if not hasattr(client, 'register_script'):
+        return None
+
+    with _registered_lock:
+        if _registered[0] is not client:
+            _registered = (client, client.register_script(TAKE))
+
+        return _registered[1]
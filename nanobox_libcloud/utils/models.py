@@ -5,14 +5,10 @@ from libcloud.compute.types import NodeState
 
 class Model(object):
     """
-    Base class for the intermediate data models.
+    Base class for the intermediate data models. Fields are declared in `__slots__` and set by keyword in `__init__`, so
+    instances are small and cheap to build, which matters for catalogs made of thousands of them.
     """
-    def __init__(self, **kwargs):
-        # Set the keyword arguments on the fields, if present
-        for key, value in kwargs.items():
-            if not hasattr(self, key):
-                raise AttributeError("The {} model has no field {}.".format(self.__class__.__name__, key))
-            setattr(self, key, value)
+    __slots__ = ()
 
     def to_nanobox(self) -> dict:
         """Returns the data in a representation which can be converted to JSON and is expected by the Nanobox client."""
@@ -23,23 +19,46 @@ class AdapterMeta(Model):
     """
     Data model representing the metadata of an adapter.
     """
-    id = None  # type: str
-    name = None  # type: str
-    server_nick_name = None  # type: str
-    default_region = None  # type: str
-    default_size = None  # type: str
-    default_plan = None  # type: str
-    can_reboot = None  # type: bool
-    can_rename = None  # type: bool
-    internal_iface = None  # type: str
-    external_iface = None  # type: str
-    ssh_user = None  # type: str
-    ssh_auth_method = None  # type: str
-    ssh_key_method = None  # type: str
-    bootstrap_script = None  # type: str
-    bootstrap_timeout = None  # type: int
-    auth_credential_fields = None  # type: typing.Tuple[str, str]
-    auth_instructions = None  # type: str
+    __slots__ = ('id', 'name', 'server_nick_name', 'default_region', 'default_size', 'default_plan', 'can_reboot',
+                 'can_rename', 'internal_iface', 'external_iface', 'ssh_user', 'ssh_auth_method', 'ssh_key_method',
+                 'bootstrap_script', 'bootstrap_timeout', 'auth_credential_fields', 'auth_instructions')
+
+    def __init__(self,
+                 id=None,  # type: str
+                 name=None,  # type: str
+                 server_nick_name=None,  # type: str
+                 default_region=None,  # type: str
+                 default_size=None,  # type: str
+                 default_plan=None,  # type: str
+                 can_reboot=None,  # type: bool
+                 can_rename=None,  # type: bool
+                 internal_iface=None,  # type: str
+                 external_iface=None,  # type: str
+                 ssh_user=None,  # type: str
+                 ssh_auth_method=None,  # type: str
+                 ssh_key_method=None,  # type: str
+                 bootstrap_script=None,  # type: str
+                 bootstrap_timeout=None,  # type: int
+                 auth_credential_fields=None,  # type: typing.List[typing.Tuple[str, str]]
+                 auth_instructions=None  # type: str
+                 ):
+        self.id = id
+        self.name = name
+        self.server_nick_name = server_nick_name
+        self.default_region = default_region
+        self.default_size = default_size
+        self.default_plan = default_plan
+        self.can_reboot = can_reboot
+        self.can_rename = can_rename
+        self.internal_iface = internal_iface
+        self.external_iface = external_iface
+        self.ssh_user = ssh_user
+        self.ssh_auth_method = ssh_auth_method
+        self.ssh_key_method = ssh_key_method
+        self.bootstrap_script = bootstrap_script
+        self.bootstrap_timeout = bootstrap_timeout
+        self.auth_credential_fields = auth_credential_fields
+        self.auth_instructions = auth_instructions
 
     def to_nanobox(self) -> typing.Dict[str, typing.Any]:
         return {
@@ -69,14 +88,26 @@ class ServerSpec(Model):
     """
     Data model representing a server specification that can be ordered.
     """
-    id = None  # type: str
-    name = None  # type: str
-    ram = None  # type: int
-    cpu = None  # type: int
-    disk = None  # type: int
-    transfer = None  # type: int
-    dollars_per_hr = None  # type: float
-    dollars_per_mo = None  # type: float
+    __slots__ = ('id', 'name', 'ram', 'cpu', 'disk', 'transfer', 'dollars_per_hr', 'dollars_per_mo')
+
+    def __init__(self,
+                 id=None,  # type: str
+                 name=None,  # type: str
+                 ram=None,  # type: int
+                 cpu=None,  # type: float
+                 disk=None,  # type: int
+                 transfer=None,  # type: int
+                 dollars_per_hr=None,  # type: float
+                 dollars_per_mo=None  # type: float
+                 ):
+        self.id = id
+        self.name = name
+        self.ram = ram
+        self.cpu = cpu
+        self.disk = disk
+        self.transfer = transfer
+        self.dollars_per_hr = dollars_per_hr
+        self.dollars_per_mo = dollars_per_mo
 
     def to_nanobox(self) -> typing.Dict[str, typing.Any]:
         return {
@@ -97,9 +128,16 @@ class ServerPlan(Model):
     """
     Data model representing a server plan.
     """
-    id = None  # type: str
-    name = None  # type: str
-    specs = []  # type: typing.List[ServerSpec]
+    __slots__ = ('id', 'name', 'specs')
+
+    def __init__(self,
+                 id=None,  # type: str
+                 name=None,  # type: str
+                 specs=None  # type: typing.List[ServerSpec]
+                 ):
+        self.id = id
+        self.name = name
+        self.specs = specs if specs is not None else []
 
     def to_nanobox(self) -> typing.Dict[str, typing.Any]:
         return {
@@ -113,9 +151,16 @@ class ServerRegion(Model):
     """
     Data model representing a server region.
     """
-    id = None  # type: str
-    name = None  # type: str
-    plans = []  # type: typing.List[ServerPlan]
+    __slots__ = ('id', 'name', 'plans')
+
+    def __init__(self,
+                 id=None,  # type: str
+                 name=None,  # type: str
+                 plans=None  # type: typing.List[ServerPlan]
+                 ):
+        self.id = id
+        self.name = name
+        self.plans = plans if plans is not None else []
 
     def to_nanobox(self) -> typing.Dict[str, typing.Any]:
         return {
@@ -129,9 +174,16 @@ class KeyInfo(Model):
     """
     Data model representing an SSH key.
     """
-    id = None  # type: str
-    name = None  # type: str
-    key = None  # type: str
+    __slots__ = ('id', 'name', 'key')
+
+    def __init__(self,
+                 id=None,  # type: str
+                 name=None,  # type: str
+                 key=None  # type: str
+                 ):
+        self.id = id
+        self.name = name
+        self.key = key
 
     def to_nanobox(self) -> typing.Dict[str, typing.Any]:
         return {
@@ -140,20 +192,25 @@ class KeyInfo(Model):
             'public_key': self.key,
         }
 
-        if self.key is not None:
-            key['public_key'] = self.key
-        else:
-            key['fingerprint'] = self.fingerprint
 
 class ServerInfo(Model):
     """
     Data model representing an actual server.
     """
-    id = None  # type: str
-    status = None  # type: NodeState
-    name = None  # type: str
-    external_ip = None  # type: str
-    internal_ip = None  # type: str
+    __slots__ = ('id', 'status', 'name', 'external_ip', 'internal_ip')
+
+    def __init__(self,
+                 id=None,  # type: str
+                 status=None,  # type: NodeState
+                 name=None,  # type: str
+                 external_ip=None,  # type: str
+                 internal_ip=None  # type: str
+                 ):
+        self.id = id
+        self.status = status
+        self.name = name
+        self.external_ip = external_ip
+        self.internal_ip = internal_ip
 
     def to_nanobox(self) -> typing.Dict[str, typing.Any]:
         return {
@@ -1,18 +1,177 @@
+import gzip
+import hashlib
 import typing
-from flask import json
+import zlib
+from flask import Response, has_request_context, json, request, stream_with_context
+from nanobox_libcloud.utils import instrument
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 FlaskHeaders = typing.Union[typing.List[typing.Tuple[str, str]], typing.Dict[str, str]]
-FlaskResponse = typing.Tuple[str, int, FlaskHeaders]
+FlaskResponse = typing.Union[typing.Tuple[typing.Union[str, bytes], int, FlaskHeaders], Response]
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_SIZE = 1024
+
+
+class Payload(object):
+    """
+    A response body which is serialized and hashed once, and can then be served repeatedly without re-encoding.
+    """
+
+    __slots__ = ('_data', 'body', 'etag', '_gzipped')
+
+    def __init__(self, data=None, body=None):
+        self._data = data
+        self.body = body if body is not None else encode(data)  # type: bytes
+        self.etag = hashlib.sha1(self.body).hexdigest()  # type: str
+        self._gzipped = None  # type: bytes
+
+    @property
+    def data(self) -> typing.Any:
+        """The content of the payload, decoded on first use if the payload was built from its body."""
+        if self._data is None:
+            self._data = decode(self.body)
+
+        return self._data
+
+    @property
+    def gzipped(self) -> bytes:
+        """The gzip-encoded body, compressed on first use."""
+        if self._gzipped is None:
+            with instrument.phase('serialize'):
+                self._gzipped = gzip.compress(self.body, 6)
+
+        return self._gzipped
 
 
 def success(data, status=200) -> FlaskResponse:
-    return json.dumps(data, indent=2), status, [("Content-Type", "application/json")]
+    return respond(encode(data, wants_pretty()), status)
 
 
 def failure(message, status=400) -> FlaskResponse:
-    return json.dumps({"errors": ([message]\
+    return respond(encode({"errors": ([message]\
            if hasattr(message, 'strip') else message if hasattr(message, 'split')\
-           else repr(message))}, indent=2),\
-           status,\
-           [("Content-Type", "application/json")]
+           else repr(message))}, wants_pretty()),\
+           status)
+
+
+def encode(data, pretty=False) -> bytes:
+    """Serializes data as JSON, compactly unless `pretty` is set, using orjson if it is installed."""
+    with instrument.phase('serialize'):
+        return _encode(data, pretty)
+
+
+def _encode(data, pretty) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | (orjson.OPT_INDENT_2 if pretty else 0))
+        except TypeError:
+            # Types only the Flask encoder knows about
+            pass
+
+    if pretty:
+        return json.dumps(data, indent=2).encode('utf-8')
+
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def decode(body: bytes) -> typing.Any:
+    """Parses a JSON body, using orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(body)
+
+    return json.loads(body.decode('utf-8'))
+
+
+def respond(body: bytes, status=200, headers=None) -> FlaskResponse:
+    """Builds a JSON response from a serialized body, gzipping it for clients which accept that."""
+    headers = [("Content-Type", "application/json"), ("Vary", "Accept-Encoding")] + (headers or [])
+
+    if len(body) >= GZIP_MIN_SIZE and accepts_gzip():
+        with instrument.phase('serialize'):
+            body = gzip.compress(body, 6)
+        headers.append(("Content-Encoding", "gzip"))
+
+    return body, status, headers
+
+
+def cached(payload: Payload, status=200) -> FlaskResponse:
+    """Serves a pre-serialized payload with its ETag, answering requests for an unchanged one with 304 Not Modified."""
+    # Pretty output is the same content in a different representation, so it gets a weak ETag
+    pretty = wants_pretty()
+    gzipped = len(payload.body) >= GZIP_MIN_SIZE and accepts_gzip()
+    tag = payload.etag + ('-gz' if gzipped else '')
+
+    headers = [("Vary", "Accept-Encoding"), ("ETag", ('W/"%s"' if pretty else '"%s"') % tag)]
+
+    if has_request_context() and request.if_none_match.contains_weak(tag):
+        return b'', 304, headers
+
+    body = encode(payload.data, True) if pretty else payload.body
+    headers.append(("Content-Type", "application/json"))
+
+    if gzipped:
+        if pretty:
+            with instrument.phase('serialize'):
+                body = gzip.compress(body, 6)
+        else:
+            body = payload.gzipped
+        headers.append(("Content-Encoding", "gzip"))
+
+    return body, status, headers
+
+
+def streamed(items: typing.Iterator[bytes], status=200) -> FlaskResponse:
+    """Streams a JSON array from an iterator of encoded items, sending (and gzipping, for clients which accept that)
+    each item as soon as it is available."""
+    def generate():
+        separator = b'['
+        for item in items:
+            yield separator + item
+            separator = b','
+        yield b']' if separator == b',' else b'[]'
+
+    body = generate()
+    headers = [("Content-Type", "application/json"), ("Vary", "Accept-Encoding")]
+
+    if accepts_gzip():
+        body = _gzip_stream(body)
+        headers.append(("Content-Encoding", "gzip"))
+
+    return Response(stream_with_context(body), status, headers)
+
+
+def _gzip_stream(chunks: typing.Iterator[bytes]) -> typing.Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    yield compressor.flush()
+
+
+def wants_pretty() -> bool:
+    """Returns whether the client asked for indented output, using the `pretty` query parameter."""
+    return _flag('pretty')
+
+
+def wants_stream() -> bool:
+    """Returns whether the client asked for a streamed response, using the `stream` query parameter."""
+    return _flag('stream')
+
+
+def _flag(name) -> bool:
+    if not has_request_context() or name not in request.args:
+        return False
+
+    return request.args[name].lower() not in ('0', 'false', 'no')
+
+
+def accepts_gzip() -> bool:
+    """Returns whether the client accepts gzip-encoded responses."""
+    return has_request_context() and request.accept_encodings['gzip'] > 0
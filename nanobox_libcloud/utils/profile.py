@@ -0,0 +1,98 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import threading
+import time
+import typing
+
+
+# Profiling is off unless explicitly enabled, and then only runs for requests which ask for it or are sampled
+ENABLED = os.getenv('PROFILE_REQUESTS', '').lower() in ('1', 'true', 'yes')
+TOKEN = os.getenv('PROFILE_TOKEN') or None
+SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+MIN_SECONDS = float(os.getenv('PROFILE_MIN_SECONDS', 0))
+DIRECTORY = os.getenv('PROFILE_DIR', '/tmp/nanobox-profiles')
+KEEP = int(os.getenv('PROFILE_KEEP', 50))
+
+# Only one request per process is profiled at a time, so profiles never include other requests' threads
+_lock = threading.Lock()
+
+
+class Capture(object):
+    """
+    A profile being captured for a single request.
+    """
+
+    __slots__ = ('id', 'profile', 'started')
+
+    def __init__(self, profile: cProfile.Profile):
+        self.id = '%d-%d-%04x' % (time.time() * 1000, os.getpid(), random.getrandbits(16))  # type: str
+        self.profile = profile
+        self.started = time.perf_counter()
+
+
+def wants_profile(headers) -> bool:
+    """Returns whether a request should be profiled: when profiling is enabled, if it sends an `X-Profile` header
+    (matching `PROFILE_TOKEN`, if that is set), or else if it is picked at the configured sampling rate."""
+    if not ENABLED:
+        return False
+
+    header = headers.get('X-Profile')
+    if header:
+        return TOKEN is None or hmac.compare_digest(header, TOKEN)
+
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def start() -> typing.Optional[Capture]:
+    """Starts profiling the current request, unless another one is already being profiled."""
+    if not _lock.acquire(blocking=False):
+        return None
+
+    profile = cProfile.Profile()
+
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is already active in this process
+        _lock.release()
+        return None
+
+    return Capture(profile)
+
+
+def finish(capture: Capture, **details):
+    """Stops a capture and, if the request was slow enough to keep, writes its stats and details to the ring buffer."""
+    capture.profile.disable()
+    _lock.release()
+
+    seconds = time.perf_counter() - capture.started
+    if seconds < MIN_SECONDS:
+        return
+
+    os.makedirs(DIRECTORY, exist_ok=True)
+    path = os.path.join(DIRECTORY, capture.id)
+
+    capture.profile.dump_stats(path + '.prof')
+    with open(path + '.json', 'w') as fp:
+        json.dump(dict(details, id=capture.id, seconds=round(seconds, 6), pid=os.getpid(), time=time.time()), fp)
+
+    _prune()
+
+
+def _prune():
+    """Keeps only the newest `PROFILE_KEEP` profiles."""
+    try:
+        profiles = sorted(file[:-5] for file in os.listdir(DIRECTORY) if file.endswith('.prof'))
+    except OSError:
+        return
+
+    # IDs start with a millisecond timestamp, so they sort oldest first
+    for stale in profiles[:max(len(profiles) - KEEP, 0)]:
+        for suffix in ('.prof', '.json'):
+            try:
+                os.remove(os.path.join(DIRECTORY, stale + suffix))
+            except OSError:
+                pass
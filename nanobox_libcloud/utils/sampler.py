@@ -0,0 +1,144 @@
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import typing
+
+
+# Samples per second; 0 (the default) disables sampling
+RATE = float(os.getenv('STACK_SAMPLE_RATE', 0))
+DIRECTORY = os.getenv('STACK_SAMPLE_DIR', '/tmp/nanobox-stacks')
+FLUSH_INTERVAL = 10
+MAX_STACKS = 10000
+MAX_AGE = 86400
+
+_sampler = None  # type: typing.Optional[Sampler]
+_sampler_lock = threading.Lock()
+
+
+class Sampler(threading.Thread):
+    """
+    Background thread which periodically samples the stacks of every other thread in the process, aggregating them in
+    collapsed-stack form, and writes the totals to a per-process file which `collect` merges across processes.
+    """
+
+    def __init__(self, rate: float, directory: str):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.rate = rate
+        self.directory = directory
+        self.counts = collections.Counter()  # type: typing.Counter[str]
+
+    def run(self):
+        interval = 1.0 / self.rate
+        flush_at = log_at = time.monotonic() + FLUSH_INTERVAL
+
+        while True:
+            time.sleep(interval)
+
+            try:
+                self.sample()
+
+                if time.monotonic() >= flush_at:
+                    flush_at = time.monotonic() + FLUSH_INTERVAL
+                    self.flush()
+            except Exception as e:
+                # Keep sampling through failures such as a full disk or a cleaned out sample directory, logging them
+                # no more often than the samples are flushed
+                if time.monotonic() >= log_at:
+                    logging.getLogger(__name__).warning('stack sampling failed: %r', e)
+                    log_at = time.monotonic() + FLUSH_INTERVAL
+
+    def sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+
+            stack = collapse(frame, names.get(ident, 'thread-%d' % ident))
+            if stack in self.counts or len(self.counts) < MAX_STACKS:
+                self.counts[stack] += 1
+            else:
+                self.counts['[truncated]'] += 1
+
+    def flush(self):
+        """Writes this process's totals so far, replacing its previous file."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, '%d.txt' % os.getpid())
+
+        with open(path + '.tmp', 'w') as fp:
+            fp.writelines('%s %d\n' % (stack, count) for stack, count in self.counts.items())
+        os.replace(path + '.tmp', path)
+
+
+def start() -> typing.Optional[Sampler]:
+    """Starts sampling this process, unless sampling is disabled or already running. Call it after forking."""
+    global _sampler
+
+    if RATE <= 0:
+        return None
+
+    with _sampler_lock:
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = Sampler(RATE, DIRECTORY)
+            _sampler.start()
+
+    return _sampler
+
+
+def collect() -> str:
+    """Returns the collapsed stacks sampled by every process sharing the sample directory, merged together, in the
+    `frame;frame;frame count` format flame graph tools read."""
+    counts = collections.Counter()  # type: typing.Counter[str]
+
+    try:
+        files = [os.path.join(DIRECTORY, file) for file in os.listdir(DIRECTORY) if file.endswith('.txt')]
+    except OSError:
+        files = []
+
+    for path in files:
+        try:
+            if os.path.getmtime(path) < time.time() - MAX_AGE:
+                # Left behind by a process which is long gone
+                os.remove(path)
+                continue
+
+            with open(path) as fp:
+                for line in fp:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    counts[stack] += int(count)
+        except (OSError, ValueError):
+            continue
+
+    return ''.join('%s %d\n' % (stack, count) for stack, count in sorted(counts.items()))
+
+
+def collapse(frame, thread_name: str) -> str:
+    """Collapses a stack into a single line of `module:function` frames, outermost first, under the thread's name."""
+    frames = []
+
+    while frame is not None:
+        frames.append('%s:%s' % (frame.f_globals.get('__name__', '?'), frame.f_code.co_name))
+        frame = frame.f_back
+
+    frames.append(thread_name.replace(' ', '_').replace(';', '_'))
+
+    return ';'.join(reversed(frames))
+
+
+def format_stacks() -> str:
+    """Formats the current stack of every thread in the process, for dumping to a log."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    code = []
+
+    for ident, stack in sys._current_frames().items():
+        code.append("\n# Thread: %s(%d)" % (names.get(ident, ""), ident))
+        for filename, lineno, name, line in traceback.extract_stack(stack):
+            code.append('File: "%s", line %d, in %s' % (filename, lineno, name))
+            if line:
+                code.append("  %s" % (line.strip()))
+
+    return "\n".join(code)
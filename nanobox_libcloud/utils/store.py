@@ -0,0 +1,29 @@
+import os
+import threading
+
+import redis
+
+
+_client = None  # type: redis.StrictRedis
+_client_lock = threading.Lock()
+
+
+def client() -> redis.StrictRedis:
+    """Returns the Redis client shared by the whole process, so its connection pool is reused between requests. Values
+    are read back as strings, so they can be used in responses as they are."""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.StrictRedis(host=os.getenv('DATA_REDIS_HOST'), decode_responses=True)
+
+    return _client
+
+
+def use(replacement):
+    """Replaces the shared Redis client, e.g. with an in-memory stand-in for running offline."""
+    global _client
+
+    with _client_lock:
+        _client = replacement
@@ -0,0 +1,16 @@
+"""
+Tests for finding and loading adapters.
+"""
+from unittest import mock
+
+from nanobox_libcloud import adapters
+
+
+def test_disabled_adapters_load_only_for_tasks():
+    with mock.patch.dict(adapters._modules, clear=True), mock.patch.dict(adapters._all_modules, clear=True),\
+            mock.patch.dict('os.environ', {'ENABLED_ADAPTERS': 'vultr'}):
+        adapters.find_adapters()
+
+        assert adapters.adapter_ids() == ['vultr']
+        assert adapters.get_adapter('azure') is None
+        assert adapters.get_adapter('azure', enabled_only=False)._get_id() == 'azure'
@@ -0,0 +1,62 @@
+"""
+Tests for the per-adapter circuit breakers.
+"""
+import time
+from unittest import mock
+
+from libcloud.common.exceptions import BaseHTTPError
+
+from nanobox_libcloud import app
+from nanobox_libcloud.utils import breaker
+
+
+def open_breaker(reset=0.05, trial_timeout=0.05) -> breaker.CircuitBreaker:
+    circuit = breaker.CircuitBreaker('test', failures=1, reset=reset, trial_timeout=trial_timeout)
+    circuit.record(False)
+    time.sleep(reset)
+
+    return circuit
+
+
+def test_only_successful_calls_close_the_breaker():
+    circuit = open_breaker()
+    assert circuit.admit()[0]
+
+    with mock.patch.dict(breaker._breakers, {('vultr', 'query'): circuit}),\
+            app.test_request_context('/vultr/servers/missing'):
+        # A missing server found by the trial says nothing about whether the provider has recovered
+        breaker.record(0.01, BaseHTTPError(404, 'Not found'))
+        assert circuit.retry_after() > 0
+
+        breaker.record(0.01)
+        assert circuit.retry_after() == 0
+
+
+def test_trials_expire():
+    circuit = open_breaker()
+
+    assert circuit.admit()[0]
+    assert not circuit.admit()[0]
+
+    time.sleep(0.05)
+    assert circuit.admit()[0]
+
+
+def test_unsettled_trials_end_with_their_request():
+    circuit = open_breaker(trial_timeout=60)
+
+    allowed, trial = circuit.admit()
+    assert allowed and not circuit.admit()[0]
+
+    circuit.end_trial(trial)
+    assert circuit.admit()[0]
+
+
+def test_settled_trials_are_not_ended_again():
+    circuit = open_breaker(trial_timeout=60)
+
+    _, trial = circuit.admit()
+    circuit.record(False)
+    circuit.end_trial(trial)
+
+    assert not circuit.admit()[0]
@@ -0,0 +1,47 @@
+"""
+Provider call budgets for every adapter's endpoints, from bench/budgets.json, checked against the stub provider drivers.
+
+Each adapter runs the endpoints of `bench.adapters` once, for a fresh account, and each endpoint fails if it calls any
+driver method more often than its budget allows (methods missing from a budget are allowed no calls), so a change adding
+a hidden list_* call to a hot path fails CI. After a change making fewer calls, `python -m bench.budgets --update`
+tightens the budgets.
+"""
+import json
+
+import pytest
+
+from bench import adapters, budgets, stubs
+from nanobox_libcloud import app
+
+with open(budgets.BUDGETS) as fp:
+    BUDGETS = json.load(fp)
+
+
+@pytest.fixture(scope='module')
+def run():
+    """Returns the results of running an adapter's endpoints, running them only once per adapter."""
+    results = {}
+
+    def run(adapter_id):
+        if adapter_id not in results:
+            with stubs.installed(latency=0):
+                results[adapter_id] = adapters.run(app.test_client(), adapter_id)
+
+        return results[adapter_id]
+
+    return run
+
+
+@pytest.mark.parametrize('adapter_id, endpoint', [(adapter_id, endpoint) for adapter_id in sorted(BUDGETS)
+                                                  for endpoint in sorted(BUDGETS[adapter_id])])
+def test_endpoint_within_budget(run, adapter_id, endpoint):
+    results = run(adapter_id)
+    assert endpoint in results, '%s was not run' % (endpoint)
+
+    regressions, _ = budgets.check({endpoint: results[endpoint]}, {endpoint: BUDGETS[adapter_id][endpoint]})
+    assert regressions == []
+
+
+@pytest.mark.parametrize('adapter_id', sorted(stubs.DRIVERS))
+def test_every_endpoint_has_a_budget(run, adapter_id):
+    assert sorted(run(adapter_id)) == sorted(BUDGETS.get(adapter_id, {}))
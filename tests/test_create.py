@@ -0,0 +1,57 @@
+"""
+Tests for idempotent server creation.
+"""
+from unittest import mock
+
+import pytest
+from libcloud.common.exceptions import BaseHTTPError
+
+from bench import adapters, stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters import get_adapter
+from nanobox_libcloud.utils import store
+
+
+@pytest.fixture
+def create():
+    """Returns a function creating the same server as the benchmarks, with the stub drivers, after the requests leading
+    up to it, such as creating its key."""
+    client = app.test_client()
+
+    with stubs.installed():
+        stubs.reset()
+        headers = adapters.credentials('vultr')
+        *requests, (_, _, path, server) = adapters.endpoints('vultr')
+
+        for _, method, request_path, body in requests:
+            client.open(request_path, method=method, json=body, headers=headers)
+
+        yield lambda: client.post(path, json=server, headers=headers)
+
+
+def test_repeats_get_the_same_server(create):
+    first, repeat = create(), create()
+
+    assert first.status_code == repeat.status_code == 201
+    assert first.get_json() == repeat.get_json()
+
+
+def test_destroyed_servers_are_created_again(create):
+    server_id = create().get_json()['id']
+
+    # Destroyed at the provider, rather than cancelled through the API, after it was done being ordered
+    nodes, = [account['nodes'] for account in stubs.VultrStub._accounts.values() if server_id in account['nodes']]
+    del nodes[server_id]
+    assert store.client().delete('%s:server:%s:status' % (get_adapter('vultr').id, server_id))
+
+    repeat = create()
+    assert repeat.status_code == 201
+    assert repeat.get_json()['id'] != server_id
+
+
+@pytest.mark.parametrize('status, held', [(500, True), (429, True), (422, False)])
+def test_failed_creations_hold_their_claim_unless_rejected(create, status, held):
+    with mock.patch.object(stubs.VultrStub, 'create_node', side_effect=BaseHTTPError(status, 'Refused')):
+        assert create().status_code == status
+
+    assert (create().status_code == 409) == held
@@ -0,0 +1,32 @@
+"""
+Replays the recorded provider traffic in bench/fixtures, failing if any endpoint answers differently from the recording.
+"""
+import copy
+import glob
+import json
+import os
+
+import pytest
+
+from bench import fixtures
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(fixtures.FIXTURES, '*.json'))))
+def test_recorded_fixtures_replay(path):
+    with open(path) as fp:
+        fixture = json.load(fp)
+
+    _, failures = fixtures.check(fixture)
+
+    assert failures == []
+
+
+def test_replay_fails_on_any_difference():
+    # Recorded against the stand-in API, which only checks the record and replay machinery themselves
+    fixture, results = fixtures.capture('vultr', {}, stand_in=True)
+    assert all(status < 400 for _, _, _, _, status, _, _ in results)
+    assert fixtures.check(fixture)[1] == []
+
+    changed = copy.deepcopy(fixture)
+    changed['steps'][0]['response'][0]['name'] += ' (renamed)'
+    assert fixtures.check(changed)[1] == ['catalog answered 200, recorded 200 (response differs)']
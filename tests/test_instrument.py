@@ -0,0 +1,22 @@
+"""
+Tests for the instrumentation of provider calls.
+"""
+from bench import stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.utils import instrument
+
+
+def test_calls_through_returned_servers_are_counted():
+    with stubs.offline(), app.test_request_context():
+        driver = instrument.DriverProxy(stubs.VultrStub('account'), 'vultr', 'account')
+        created = driver.create_node(name='app-1')
+        listed, = driver.list_nodes()
+
+        assert created.driver is driver and listed.driver is driver
+
+        listed.reboot()
+        created.destroy()
+
+        methods = instrument.accounting().methods
+        assert {name: calls for name, (calls, _) in methods.items()} == {
+            'create_node': 1, 'list_nodes': 1, 'reboot_node': 1, 'destroy_node': 1}
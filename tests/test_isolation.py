@@ -0,0 +1,126 @@
+"""
+Concurrency stress tests for the isolation of adapter state between requests.
+
+Many requests for different accounts run through the app at the same time, as a threaded gunicorn worker would, against
+an in-process fake provider that answers with data tagged by the requesting account. Any response containing another
+account's data means adapter state leaked between requests.
+"""
+import random
+import threading
+import time
+from unittest import mock
+
+import pytest
+from libcloud.compute.base import Node, NodeLocation, NodeSize
+from libcloud.compute.types import NodeState
+
+from bench import stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.adapters import get_adapter, get_adapter_class
+from nanobox_libcloud.utils import cache
+
+THREADS = 32
+ROUNDS = 5
+
+
+class FakeDriver(object):
+    """
+    Minimal stand-in for a libcloud driver, whose results are tagged with the credentials it was created with.
+    """
+
+    def __init__(self, key=None, secret=None, **kwargs):
+        self.key = key
+
+    def _pause(self):
+        time.sleep(random.uniform(0, 0.005))
+
+    def list_key_pairs(self):
+        self._pause()
+        return []
+
+    def list_locations(self):
+        self._pause()
+        return [NodeLocation(str(i), 'Region %d' % i, 'US', self) for i in range(3)]
+
+    def list_sizes(self, location=None):
+        self._pause()
+        return [NodeSize('%d' % i, 'size-%d-%s' % (i, self.key), 1024 * (i + 1), 20 * (i + 1), 1000, 5.0 * (i + 1),
+                         self, extra={'plan_type': ('SSD', 'DEDICATED')[i % 2], 'available_locations': ['0', '1', '2'],
+                                      'vcpu_count': i + 1, 'cpus': i + 1})
+                for i in range(4)]
+
+    def list_nodes(self, project_id=None):
+        self._pause()
+        return [Node('srv-1', 'srv-1', NodeState.RUNNING, [project_id or self.key], [], self)]
+
+
+@pytest.fixture
+def fake_provider():
+    with stubs.offline(),\
+            mock.patch.object(get_adapter_class('vultr'), '_get_driver_class', lambda self: FakeDriver),\
+            mock.patch.object(get_adapter_class('packet'), '_get_driver_class', lambda self: FakeDriver):
+        yield
+
+
+def run_accounts(check) -> list:
+    """Runs `check(account, errors)` for ROUNDS rounds in each of THREADS threads at once, one account per thread,
+    returning the errors they found."""
+    errors = []
+    barrier = threading.Barrier(THREADS)
+
+    def worker(account):
+        barrier.wait()
+
+        for _ in range(ROUNDS):
+            check(account, errors)
+
+    threads = [threading.Thread(target=worker, args=('acct%d' % i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return errors
+
+
+def test_adapters_keep_their_own_account(fake_provider):
+    def check(account, errors):
+        adapter = get_adapter('vultr')
+        adapter._get_user_driver(**adapter._get_request_credentials({'Auth-Api-Key': account}))
+        time.sleep(random.uniform(0, 0.005))
+
+        if adapter._get_user_driver().key != account:
+            errors.append('adapter for %s has a driver for %s' % (account, adapter._get_user_driver().key))
+        if adapter._account != cache.account_id('vultr', {'key': account}):
+            errors.append('adapter for %s is tagged with another account' % (account))
+
+    assert run_accounts(check) == []
+
+
+def test_catalogs_are_isolated(fake_provider):
+    def check(account, errors):
+        response = app.test_client().get('/vultr/catalog', headers={'Auth-Api-Key': account})
+        if response.status_code >= 400:
+            return errors.append('catalog for %s answered %d' % (account, response.status_code))
+
+        for region in response.get_json():
+            for plan in region['plans']:
+                for spec in plan['specs']:
+                    if not spec['name'].endswith('-' + account):
+                        errors.append('catalog for %s contained %s' % (account, spec['name']))
+
+    assert run_accounts(check) == []
+
+
+def test_server_queries_are_isolated(fake_provider):
+    def check(account, errors):
+        response = app.test_client().get('/packet/servers/srv-1',
+                                         headers={'Auth-Api-Key': 'key', 'Auth-Project-Id': account})
+        if response.status_code >= 400:
+            return errors.append('server query for %s answered %d' % (account, response.status_code))
+
+        ip = response.get_json()['external_ip']
+        if ip != account:
+            errors.append('server query for %s answered with project %s' % (account, ip))
+
+    assert run_accounts(check) == []
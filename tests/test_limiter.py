@@ -0,0 +1,43 @@
+"""
+Tests for the provider call rate limiter.
+"""
+from unittest import mock
+
+import pytest
+from libcloud.common.exceptions import BaseHTTPError, RateLimitReachedError
+from libcloud.common.types import ServiceUnavailableError
+
+from bench import stubs
+from nanobox_libcloud import app
+from nanobox_libcloud.utils import instrument, limiter
+
+
+def test_refused_calls_are_counted():
+    with stubs.offline(), app.test_request_context(), mock.patch.dict(limiter.LIMITS, {'vultr': (0.01, 1.0)}),\
+            mock.patch.object(limiter, 'MAX_WAIT_SECONDS', 0), mock.patch.object(limiter, 'throttled') as throttled:
+        driver = instrument.DriverProxy(stubs.VultrStub('refused'), 'vultr', 'refused')
+        driver.list_nodes()
+
+        with pytest.raises(RateLimitReachedError):
+            driver.list_nodes()
+
+        account = instrument.accounting()
+        assert account.refused == 1
+        assert account.methods['list_nodes'][0] == 1
+        assert ('X-Provider-Refused', '1') in account.headers()
+
+        # Refusing a call isn't the provider throttling it
+        throttled.assert_not_called()
+
+
+@pytest.mark.parametrize('err, throttle', [
+    (RateLimitReachedError(), True),
+    (BaseHTTPError(429, 'Too Many Requests'), True),
+    (BaseHTTPError(503, 'Service Unavailable', headers={'Retry-After': '5'}), True),
+    (BaseHTTPError(503, 'Service Unavailable'), False),
+    (ServiceUnavailableError('Rate limit reached - please try your request again later.'), True),
+    (ServiceUnavailableError(), False),
+    (BaseHTTPError(500, 'Internal Server Error'), False),
+])
+def test_only_rate_limit_refusals_are_throttles(err, throttle):
+    assert limiter.is_throttle(err) == throttle
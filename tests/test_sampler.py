@@ -0,0 +1,22 @@
+"""
+Tests for the background stack sampler.
+"""
+import time
+from unittest import mock
+
+from nanobox_libcloud.utils import sampler
+
+
+def test_sampler_survives_failed_flushes(tmp_path, caplog):
+    # The sample directory can't be created where a file already is
+    blocked = tmp_path / 'stacks'
+    blocked.write_text('')
+
+    with mock.patch.object(sampler, 'FLUSH_INTERVAL', 0.05):
+        thread = sampler.Sampler(100, str(blocked))
+        thread.start()
+        time.sleep(0.3)
+
+    assert thread.is_alive()
+    assert thread.counts
+    assert 'stack sampling failed' in caplog.text
@@ -0,0 +1,40 @@
+"""
+Tests for the cross-provider search endpoint.
+"""
+import sys
+from unittest import mock
+
+import pytest
+
+from bench import stubs
+from nanobox_libcloud import adapters, app
+from nanobox_libcloud.utils import cache
+
+
+@pytest.fixture
+def client():
+    with mock.patch.dict('os.environ', {'VULTR_API_KEY': 'generic'}), mock.patch.dict(adapters._instances, clear=True),\
+            stubs.installed():
+        yield app.test_client()
+
+
+def test_every_worker_searches_the_same_catalogs(client):
+    assert client.get('/vultr/catalog').status_code == 200
+    built = client.get('/search?adapters=vultr&limit=5').get_json()
+
+    # Another worker has neither the catalogs nor the adapter modules this one has loaded
+    cache.catalogs.clear()
+    with mock.patch.dict(adapters.AdapterBase.registry, clear=True), mock.patch.dict(sys.modules):
+        for module in adapters._modules.values():
+            sys.modules.pop('nanobox_libcloud.adapters.' + module, None)
+
+        searched = client.get('/search?adapters=vultr&limit=5').get_json()
+
+    assert len(built['results']) == 5
+    assert searched == built
+    assert searched['missing'] == [adapter_id for adapter_id in adapters.adapter_ids() if adapter_id != 'vultr']
+
+
+@pytest.mark.parametrize('query', ['limit=inf', 'limit=nan', 'max_price=-inf', 'min_ram=abc'])
+def test_invalid_queries_are_rejected(client, query):
+    assert client.get('/search?' + query).status_code == 400